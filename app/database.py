@@ -1,19 +1,205 @@
 import os
+import time
+import logging
+import threading
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 print("DATABASE_URL YANG DIGUNAKAN:", DATABASE_URL)
 
+def _to_sync_url(url: str) -> str:
+    """
+    Mengubah URL PostgreSQL menjadi URL dengan driver psycopg2 secara eksplisit. Tanpa nama
+    driver, versi SQLAlchemy yang lebih baru bisa memilih psycopg 3, sedangkan requirements
+    memasang psycopg2.
+    """
+    scheme, _, rest = url.partition('://')
+    if scheme in ('postgres', 'postgresql', 'postgresql+asyncpg'):
+        return f"postgresql+psycopg2://{rest}"
+    return url
+
 # Make sure to use the synchronous PostgreSQL driver
-# If your DATABASE_URL starts with postgresql+asyncpg://, change it to postgresql://
-if DATABASE_URL and DATABASE_URL.startswith('postgresql+asyncpg://'):
-    DATABASE_URL = DATABASE_URL.replace('postgresql+asyncpg://', 'postgresql://')
+DATABASE_URL = _to_sync_url(DATABASE_URL) if DATABASE_URL else DATABASE_URL
+
+def _to_async_url(url: str) -> str:
+    """
+    Mengubah URL PostgreSQL sinkron menjadi URL dengan driver asyncpg
+    """
+    scheme, _, rest = url.partition('://')
+    if scheme in ('postgres', 'postgresql') or scheme.startswith('postgresql+'):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+ASYNC_DATABASE_URL = _to_async_url(DATABASE_URL) if DATABASE_URL else DATABASE_URL
+
+# Pengaturan pool koneksi (berlaku untuk masing-masing engine, sync dan async)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_MIN_SIZE = min(int(os.getenv("DB_POOL_MIN_SIZE", "1")), DB_POOL_SIZE)
+
+POOL_SETTINGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+class PoolStats:
+    """
+    Statistik kumulatif sebuah pool koneksi, diisi oleh event pool SQLAlchemy
+    dan oleh pengukuran waktu tunggu saat checkout
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            acquired = self.checkouts or 1
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / acquired, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+class _TimedPoolMixin:
+    """
+    Mengukur lama menunggu koneksi dari pool (termasuk saat pool penuh)
+    """
+    stats: PoolStats
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+def _register_pool_events(target, stats: PoolStats):
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    @event.listens_for(target, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.increment("checkouts")
+
+    @event.listens_for(target, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.increment("checkins")
+
+    @event.listens_for(target, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
 
 # Create the engine without attempting connection at startup
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_SETTINGS)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine (asyncpg) untuk route async agar query tidak memblokir event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, **POOL_SETTINGS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+_register_pool_events(engine, TimedQueuePool.stats)
+_register_pool_events(async_engine.sync_engine, TimedAsyncAdaptedQueuePool.stats)
+
+async def get_async_db():
+    """
+    Dependency untuk mendapatkan sesi database async
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _pool_status(pool, stats: PoolStats) -> dict:
+    checked_out = pool.checkedout()
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        # overflow() bernilai negatif selama pool belum mencapai pool_size
+        "overflow": max(pool.overflow(), 0),
+        "saturated": checked_out >= pool.size() + DB_MAX_OVERFLOW,
+        **stats.snapshot(),
+    }
+
+def get_pool_stats() -> dict:
+    """
+    Status pool koneksi saat ini untuk engine sync dan async
+    """
+    return {
+        "sync": _pool_status(engine.pool, TimedQueuePool.stats),
+        "async": _pool_status(async_engine.sync_engine.pool, TimedAsyncAdaptedQueuePool.stats),
+        "settings": {**POOL_SETTINGS, "pool_min_size": DB_POOL_MIN_SIZE},
+    }
+
+def _warm_up_sync_pool():
+    connections = [engine.connect() for _ in range(DB_POOL_MIN_SIZE)]
+    for connection in connections:
+        connection.close()
+
+async def _warm_up_async_pool():
+    connections = [await async_engine.connect() for _ in range(DB_POOL_MIN_SIZE)]
+    for connection in connections:
+        await connection.close()
+
+async def warm_up_pools():
+    """
+    Membuka koneksi minimum (DB_POOL_MIN_SIZE) di kedua pool saat startup.
+    Kegagalan hanya dicatat agar aplikasi tetap bisa berjalan tanpa database.
+    """
+    if DB_POOL_MIN_SIZE <= 0:
+        return
+    try:
+        await run_in_threadpool(_warm_up_sync_pool)
+        await _warm_up_async_pool()
+        logger.info(f"Pool koneksi database siap dengan {DB_POOL_MIN_SIZE} koneksi awal")
+    except Exception as e:
+        logger.warning(f"Gagal melakukan warm-up pool koneksi database: {str(e)}")
@@ -0,0 +1,290 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.tokens import token_service, InvalidTokenError
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "local" (per proses) atau "redis" (dibagi semua worker, butuh paket redis)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Pakai X-Forwarded-For; aktifkan hanya di belakang proxy tepercaya
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# Jumlah proxy tepercaya di depan aplikasi. Setiap proxy menambahkan alamat di ujung kanan
+# X-Forwarded-For, sedangkan entri di kirinya bisa diisi bebas oleh klien
+RATE_LIMIT_TRUSTED_HOPS = max(int(os.getenv("RATE_LIMIT_TRUSTED_HOPS", "1")), 1)
+RATE_LIMIT_SHARDS = 64
+RATE_LIMIT_MAX_KEYS_PER_SHARD = int(os.getenv("RATE_LIMIT_MAX_KEYS_PER_SHARD", "20000"))
+RATE_LIMIT_SWEEP_SECONDS = 30.0
+
+class Budget(NamedTuple):
+    capacity: int
+    per_seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+def _budget(name: str, default: str) -> Budget:
+    """
+    Budget dari env RATE_LIMIT_<GRUP> berformat "jumlah/detik", misalnya "10/60"
+    """
+    capacity, _, per_seconds = os.getenv(f"RATE_LIMIT_{name.upper()}", default).partition("/")
+    return Budget(int(capacity), float(per_seconds or 1))
+
+# Budget per grup route: burst sebesar capacity, lalu terisi ulang merata selama per_seconds
+RATE_LIMIT_BUDGETS: Dict[str, Budget] = {
+    "auth": _budget("auth", "10/60"),
+    "product_read": _budget("product_read", "300/60"),
+    "product_write": _budget("product_write", "30/60"),
+    "upload": _budget("upload", "10/60"),
+}
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """
+    Grup budget untuk sebuah request, atau None bila tidak dibatasi (metrics, static, root)
+    """
+    if method == "OPTIONS":
+        return None
+    if path.startswith("/auth/"):
+        return "auth"
+    if path == "/products" or path.startswith("/products/"):
+        if method in ("GET", "HEAD"):
+            return "product_read"
+        # create, update dan import membawa file multipart
+        if method in ("POST", "PUT"):
+            return "upload"
+        return "product_write"
+    return None
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+def _forwarded_client(headers: Headers, trusted_hops: int) -> Optional[str]:
+    """
+    Alamat klien menurut proxy tepercaya terjauh: entri ke-`trusted_hops` dari kanan
+    X-Forwarded-For (semua header digabung sesuai urutan), atau None bila header kosong
+    """
+    entries = [
+        entry.strip()
+        for value in headers.getlist("x-forwarded-for")
+        for entry in value.split(",")
+        if entry.strip()
+    ]
+    if not entries:
+        return None
+    return entries[-min(trusted_hops, len(entries))]
+
+def _take(tokens: float, updated: float, budget: Budget, now: float) -> Tuple[Decision, float]:
+    tokens = min(budget.capacity, tokens + (now - updated) * budget.rate)
+    if tokens >= 1:
+        return Decision(True, tokens - 1, 0.0), tokens - 1
+    return Decision(False, tokens, (1 - tokens) / budget.rate), tokens
+
+class LocalBucketStore:
+    """
+    Token bucket di memori proses, dibagi ke beberapa shard dengan lock masing-masing.
+
+    Setiap key hanya menyimpan tuple (token, waktu update, waktu penuh). Bucket yang sudah
+    penuh kembali setara dengan bucket baru, sehingga bisa dibuang; setiap shard menyapu
+    entri seperti itu secara berkala, dan membuang entri yang paling lama tidak dipakai bila
+    melebihi kapasitas, sehingga bucket klien yang sedang aktif tidak ikut ter-reset.
+    """
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_keys_per_shard: int = RATE_LIMIT_MAX_KEYS_PER_SHARD):
+        self._buckets: List["OrderedDict[str, Tuple[float, float, float]]"] = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._swept_at = [0.0] * shards
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def _sweep(self, shard: int, now: float):
+        buckets = self._buckets[shard]
+        for key in [key for key, (_, _, full_at) in buckets.items() if full_at <= now]:
+            del buckets[key]
+        overflow = len(buckets) - self.max_keys_per_shard
+        for _ in range(max(overflow, 0)):
+            buckets.popitem(last=False)
+        self._swept_at[shard] = now
+
+    async def take(self, key: str, budget: Budget) -> Decision:
+        now = time.monotonic()
+        shard = hash(key) % len(self._buckets)
+        with self._locks[shard]:
+            buckets = self._buckets[shard]
+            if now - self._swept_at[shard] >= RATE_LIMIT_SWEEP_SECONDS or len(buckets) > self.max_keys_per_shard:
+                self._sweep(shard, now)
+            tokens, updated, _ = buckets.get(key) or (budget.capacity, now, now)
+            decision, tokens = _take(tokens, updated, budget, now)
+            buckets[key] = (tokens, now, now + (budget.capacity - tokens) / budget.rate)
+            buckets.move_to_end(key)
+        return decision
+
+    def size(self) -> int:
+        return sum(len(buckets) for buckets in self._buckets)
+
+# Bucket yang sama dengan LocalBucketStore, dihitung atomik di Redis memakai jam server Redis
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBucketStore:
+    """
+    Token bucket bersama untuk beberapa worker/instance. Bila Redis tidak bisa dihubungi,
+    keputusan jatuh ke LocalBucketStore agar API tetap melayani.
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "rate_limit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis membutuhkan paket redis (pip install redis)") from e
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE)
+        self._prefix = prefix
+        self._fallback = LocalBucketStore()
+
+    async def take(self, key: str, budget: Budget) -> Decision:
+        try:
+            allowed, tokens = await self._script(keys=[self._prefix + key], args=[budget.capacity, budget.rate])
+        except Exception as e:
+            logger.warning(f"Rate limit Redis tidak tersedia, memakai bucket lokal: {str(e)}")
+            return await self._fallback.take(key, budget)
+        tokens = float(tokens)
+        if allowed:
+            return Decision(True, tokens, 0.0)
+        return Decision(False, tokens, (1 - tokens) / budget.rate)
+
+    def size(self) -> int:
+        return self._fallback.size()
+
+def create_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "redis":
+        return RedisBucketStore()
+    return LocalBucketStore()
+
+class RateLimiter:
+    """
+    Token bucket per grup route.
+
+    Key bucket adalah id user dari access token yang valid (verifikasinya di-cache
+    token_service), atau alamat IP klien. Grup auth selalu memakai IP karena login belum
+    membawa token.
+    """
+
+    def __init__(self, store=None, budgets: Optional[Dict[str, Budget]] = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.store = store or create_store()
+        self.budgets = budgets or RATE_LIMIT_BUDGETS
+        self.enabled = enabled
+        self._counters = {"allowed": 0, "limited": 0}
+
+    def _identity(self, group: str, scope: Scope) -> str:
+        headers = Headers(scope=scope)
+        if group != "auth":
+            scheme, _, token = headers.get("authorization", "").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    return f"user:{token_service.verify(token)['sub']}"
+                except InvalidTokenError:
+                    pass
+        if RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = _forwarded_client(headers, RATE_LIMIT_TRUSTED_HOPS)
+            if forwarded:
+                return f"ip:{forwarded}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def check(self, scope: Scope) -> Optional[Tuple[Budget, Decision]]:
+        """
+        Keputusan untuk request HTTP, atau None bila request tidak dibatasi
+        """
+        group = route_group(scope["method"], scope["path"])
+        budget = self.budgets.get(group) if group else None
+        if not self.enabled or budget is None:
+            return None
+        decision = await self.store.take(f"{group}:{self._identity(group, scope)}", budget)
+        self._counters["allowed" if decision.allowed else "limited"] += 1
+        return budget, decision
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.store).__name__,
+            "keys": self.store.size(),
+            "budgets": {group: f"{budget.capacity}/{budget.per_seconds:g}s" for group, budget in self.budgets.items()},
+            **self._counters,
+        }
+
+rate_limiter = RateLimiter()
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI yang menjawab 429 dengan Retry-After untuk request di atas budget,
+    sebelum menyentuh route dan database. Respons lain membawa header X-RateLimit-*.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        result = await self.limiter.check(scope) if scope["type"] == "http" else None
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        budget, decision = result
+        limit_headers = [
+            (b"x-ratelimit-limit", str(budget.capacity).encode()),
+            (b"x-ratelimit-remaining", str(int(decision.remaining)).encode()),
+        ]
+
+        if not decision.allowed:
+            body = orjson.dumps({"detail": "Terlalu banyak permintaan, silakan coba lagi nanti"})
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": limit_headers + [
+                    (b"retry-after", str(math.ceil(decision.retry_after)).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + limit_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,199 @@
+import time
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Batas bucket histogram; cukup rapat agar p50/p95/p99 bisa diestimasi dari bucket
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.035, 0.05, 0.075,
+    0.1, 0.15, 0.25, 0.35, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (
+    128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+# Method di luar daftar ini dicatat sebagai "other"; method berasal dari klien, jadi tanpa
+# batas ini setiap method acak menambah series baru
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+
+_SeriesKey = Tuple[str, str, str]
+
+class _Series:
+    __slots__ = ("count", "latency_sum", "size_sum", "latency_buckets", "size_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.size_sum = 0
+        # Jumlah per bucket (tidak kumulatif); elemen terakhir untuk nilai di atas batas tertinggi
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.size_buckets = [0] * (len(SIZE_BUCKETS) + 1)
+
+def _route_template(scope: Scope) -> str:
+    """
+    Template path dari route yang cocok (misalnya /products/{id_serial}), agar jumlah
+    series tidak bertambah per id atau koordinat
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        # Sub-app yang di-mount (misalnya /static) tidak mengisi route
+        root_path = scope.get("root_path")
+        return f"{root_path}/{{path}}" if root_path else "unmatched"
+    # Sebagian versi FastAPI menyimpan path route tanpa prefix router; prefix diambil dari
+    # sisa path request di depan bagian yang cocok dengan route
+    try:
+        matched = route.path_format.format(**scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return path
+    request_path = scope["path"]
+    if not request_path.endswith(matched):
+        return path
+    return request_path[:len(request_path) - len(matched)] + path
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _estimate_quantile(buckets: List[int], bounds: Tuple[float, ...], quantile: float) -> Optional[float]:
+    """
+    Estimasi quantile dari histogram dengan interpolasi linear di dalam bucket,
+    sama seperti histogram_quantile di Prometheus
+    """
+    total = sum(buckets)
+    if total == 0:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if cumulative + count >= rank and count:
+            if index == len(bounds):
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0.0
+            return lower + (bounds[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+class RequestMetrics:
+    """
+    Jumlah request, histogram latensi dan histogram ukuran respons per
+    (method, template route, status).
+
+    Semua pencatatan terjadi di event loop (middleware ASGI), jadi counter diperbarui
+    tanpa lock; pembacaan juga dilakukan dari event loop lewat route async.
+    """
+
+    def __init__(self):
+        self._series: Dict[_SeriesKey, _Series] = {}
+        self.in_progress = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int):
+        key = (method if method in KNOWN_METHODS else "other", route, str(status))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        series.count += 1
+        series.latency_sum += seconds
+        series.size_sum += size
+        series.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.size_buckets[bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+
+    def _histogram_lines(self, name: str, labels: str, buckets: List[int], bounds: Tuple[float, ...], total: float, count: int) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(bounds, buckets):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {total:g}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+    def render_prometheus(self) -> str:
+        """
+        Semua series dalam format teks Prometheus (version 0.0.4)
+        """
+        series = sorted(self._series.items())
+        counts, latencies, sizes = [], [], []
+        for (method, route, status), values in series:
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            counts.append(f"http_requests_total{{{labels}}} {values.count}")
+            latencies += self._histogram_lines(
+                "http_request_duration_seconds", labels, values.latency_buckets, LATENCY_BUCKETS, values.latency_sum, values.count
+            )
+            sizes += self._histogram_lines(
+                "http_response_size_bytes", labels, values.size_buckets, SIZE_BUCKETS, values.size_sum, values.count
+            )
+
+        lines = [
+            "# HELP http_requests_total Jumlah request HTTP per method, route dan status.",
+            "# TYPE http_requests_total counter",
+            *counts,
+            "# HELP http_request_duration_seconds Latensi request HTTP dalam detik.",
+            "# TYPE http_request_duration_seconds histogram",
+            *latencies,
+            "# HELP http_response_size_bytes Ukuran body respons HTTP dalam byte.",
+            "# TYPE http_response_size_bytes histogram",
+            *sizes,
+            "# HELP http_requests_in_progress Request HTTP yang sedang diproses.",
+            "# TYPE http_requests_in_progress gauge",
+            f"http_requests_in_progress {self.in_progress}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def latency_summary(self) -> List[Dict[str, object]]:
+        """
+        Estimasi p50/p95/p99 (ms) per method dan route, digabung dari semua status
+        """
+        merged: Dict[Tuple[str, str], _Series] = {}
+        for (method, route, _), values in list(self._series.items()):
+            target = merged.setdefault((method, route), _Series())
+            target.count += values.count
+            target.latency_sum += values.latency_sum
+            target.latency_buckets = [a + b for a, b in zip(target.latency_buckets, values.latency_buckets)]
+
+        summary = []
+        for (method, route), values in sorted(merged.items()):
+            item = {"method": method, "route": route, "count": values.count, "mean_ms": round(values.latency_sum / values.count * 1000, 2)}
+            for quantile in QUANTILES:
+                estimate = _estimate_quantile(values.latency_buckets, LATENCY_BUCKETS, quantile)
+                item[f"p{int(quantile * 100)}_ms"] = round(estimate * 1000, 2)
+            summary.append(item)
+        return summary
+
+request_metrics = RequestMetrics()
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI yang mencatat setiap request HTTP ke request_metrics setelah
+    respons selesai dikirim
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_progress -= 1
+            # Router mengisi scope["route"] pada dict scope yang sama saat request cocok
+            self.metrics.observe(scope["method"], _route_template(scope), status_code, time.perf_counter() - started, size)
@@ -0,0 +1,31 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+def _encode_default(value: Any):
+    """
+    Encoder untuk tipe yang tidak ditangani orjson secara native.
+    Decimal dikonversi seperti jsonable_encoder: int bila tanpa pecahan, selain itu float.
+    datetime.time, datetime dan UUID sudah ditangani orjson (format ISO).
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Tipe {type(value).__name__} tidak dapat di-serialize ke JSON")
+
+class ProductJSONResponse(JSONResponse):
+    """
+    Respons JSON berbasis orjson untuk payload produk.
+    Route mengembalikan instance kelas ini secara langsung agar FastAPI tidak
+    menjalankan jsonable_encoder pada setiap baris produk.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+def dumps_json_line(content: Any) -> bytes:
+    """
+    Satu baris NDJSON dengan aturan encoding yang sama seperti ProductJSONResponse
+    """
+    return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from app.database import get_pool_stats
+from app.services.catalog_cache import catalog_cache
+from app.services.job_queue import job_queue
+from app.static_files import static_files
+from app.services.tokens import token_service, require_metrics_reader
+from app.services.passwords import password_hasher
+from app.rate_limit import rate_limiter
+from app.services.single_flight import single_flight
+from app.request_metrics import request_metrics
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Jumlah request, histogram latensi dan ukuran respons per route dalam format teks Prometheus.
+    Async agar dibaca dari event loop yang sama dengan middleware pencatatnya.
+    """
+    return PlainTextResponse(request_metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/latency", status_code=status.HTTP_200_OK)
+async def get_latency_metrics():
+    """
+    Estimasi p50/p95/p99 latensi (ms) per endpoint dari histogram, untuk perencanaan kapasitas
+    """
+    return {
+        "message": "Berhasil mengambil statistik latensi",
+        "data": request_metrics.latency_summary()
+    }
+
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+def get_db_pool_metrics():
+    """
+    Status pool koneksi database: koneksi terpakai, idle, overflow dan waktu tunggu
+    """
+    return {
+        "message": "Berhasil mengambil statistik pool koneksi",
+        "data": get_pool_stats()
+    }
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+def get_cache_metrics():
+    """
+    Statistik catalog cache: jumlah entri, hit/miss per jenis lookup dan eviction
+    """
+    return {
+        "message": "Berhasil mengambil statistik catalog cache",
+        "data": catalog_cache.stats()
+    }
+
+@router.get("/jobs", status_code=status.HTTP_200_OK)
+def get_job_queue_metrics():
+    """
+    Statistik job queue: jumlah job per status di journal serta job sukses, diulang dan gagal
+    """
+    return {
+        "message": "Berhasil mengambil statistik job queue",
+        "data": job_queue.stats()
+    }
+
+@router.get("/static", status_code=status.HTTP_200_OK)
+def get_static_metrics():
+    """
+    Statistik index file statis: jumlah entri dan hit/miss lookup metadata
+    """
+    return {
+        "message": "Berhasil mengambil statistik index file statis",
+        "data": static_files.stats()
+    }
+
+@router.get("/tokens", status_code=status.HTTP_200_OK, dependencies=[Depends(require_metrics_reader)])
+def get_token_metrics():
+    """
+    Statistik verifikasi access token: kunci aktif, entri cache dan hit/miss/ditolak.
+    Hanya untuk role METRICS_ROLES karena memuat nama kunci.
+    """
+    return {
+        "message": "Berhasil mengambil statistik access token",
+        "data": token_service.stats()
+    }
+
+@router.get("/passwords", status_code=status.HTTP_200_OK, dependencies=[Depends(require_metrics_reader)])
+def get_password_metrics():
+    """
+    Statistik pool hash password: worker, cost bcrypt, jumlah hash/verifikasi dan penolakan.
+    Hanya untuk role METRICS_ROLES.
+    """
+    return {
+        "message": "Berhasil mengambil statistik hash password",
+        "data": password_hasher.stats()
+    }
+
+@router.get("/rate-limit", status_code=status.HTTP_200_OK)
+def get_rate_limit_metrics():
+    """
+    Statistik rate limiter: backend, budget per grup, jumlah key aktif, request lolos dan ditolak
+    """
+    return {
+        "message": "Berhasil mengambil statistik rate limit",
+        "data": rate_limiter.stats()
+    }
+
+@router.get("/single-flight", status_code=status.HTTP_200_OK)
+def get_single_flight_metrics():
+    """
+    Statistik penggabungan request identik per fungsi: jumlah panggilan, eksekusi,
+    panggilan yang menumpang hasil eksekusi lain dan rasionya
+    """
+    return {
+        "message": "Berhasil mengambil statistik single-flight",
+        "data": single_flight.stats()
+    }
@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File, Path, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File, Path, Request, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text  # Tambahkan import text
 from sqlalchemy.exc import SQLAlchemyError
-from app.database import SessionLocal
-from app.services.products import create_product, get_product_by_id, update_product, save_images, check_product_exists, get_all_products, get_products_by_category, get_products_by_kab_kota, delete_product, get_nearby_products, get_top_rated_products_by_location
+from app.database import SessionLocal, get_async_db
+from app.services.products import save_images_async, get_all_products, get_products_by_category, get_products_by_kab_kota
+from app.services.products import get_all_products_page, get_products_by_kab_kota_page, get_products_by_category_page, iter_product_batches, search_products, suggest_products, get_product_facets
+from app.services.products import check_product_exists_async, create_product_async, get_product_by_id_async, update_product_async, delete_product_async, get_nearby_products_async, get_nearby_products_page_async, get_top_rated_products_by_location_async
+from app.services.pagination import MAX_PAGE_LIMIT
+from app.services.catalog_cache import catalog_cache
+from app.services.suggest_index import MAX_SUGGESTIONS
+from app.services.image_store import UploadBudget, ImageTooLargeError
+from app.services.product_import import import_products, detect_format, ImportFormatError
+from app.services.tokens import require_product_writer
+from app.schemas import ProductResponse, ProductListResponse
+from app.responses import ProductJSONResponse, dumps_json_line
+from fastapi.responses import StreamingResponse
 import logging
 import os
+import asyncio
 from typing import List, Optional, Dict
 import traceback
 import json
+import hashlib
+import csv
+import io
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -23,9 +39,33 @@ def get_db():
     finally:
         db.close()
 
+def _make_etag(request: Request, version: str) -> str:
+    """
+    ETag kuat dari versi data katalog ditambah URL request (base_url dan query ikut menentukan isi respons)
+    """
+    key = f"{version}|{request.base_url}|{request.url.path}|{request.url.query}"
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Memeriksa header If-None-Match terhadap ETag saat ini
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def _etag_headers(request: Request, version: str) -> Dict[str, str]:
+    if not version:
+        return {}
+    return {"ETag": _make_etag(request, version), "Cache-Control": "no-cache"}
+
 @router.post("/create", status_code=status.HTTP_201_CREATED)
 async def add_product(
-    user_id: int = Form(...),
     category: str = Form(...),
     place_name: str = Form(...),
     rating: float = Form(...),
@@ -40,30 +80,35 @@ async def add_product(
     kab_kota: str = Form(...),
     detail_images: List[UploadFile] = File(...),
     display_images: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    current_user: Dict = Depends(require_product_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Menambahkan produk baru
     """
     try:
-        logger.info(f"Menerima permintaan tambah produk: {place_name}")
+        logger.info(f"Menerima permintaan tambah produk: {place_name} dari {current_user['username']}")
         
         # Periksa apakah produk sudah ada sebelum menyimpan gambar
-        exists = check_product_exists(db, category, place_name)
+        exists = await check_product_exists_async(db, category, place_name)
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Produk/Tempat sudah ada"
             )
         
-        # Simpan file gambar
-        detail_image_list = save_images(detail_images, "app/asset/detail_image")
-        display_image_list = save_images(display_images, "app/asset/display_image")
+        # Simpan file gambar secara bersamaan tanpa memblokir event loop
+        budget = UploadBudget()
+        detail_image_list, display_image_list = await asyncio.gather(
+            save_images_async(detail_images, budget),
+            save_images_async(display_images, budget)
+        )
 
         # Panggil service untuk menyimpan produk ke database
-        product_id = create_product(
+        product_id = await create_product_async(
             db,
-            user_id=user_id,
+            # Pemilik produk diambil dari token, bukan dari form yang dikirim klien
+            user_id=int(current_user["sub"]),
             category=category,
             place_name=place_name,
             rating=rating,
@@ -98,6 +143,13 @@ async def add_product(
         logger.warning(f"HTTP Exception: {str(e)}")
         raise
 
+    except ImageTooLargeError as e:
+        logger.warning(f"Upload ditolak: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+
     except ValueError as e:
         logger.warning(f"Validasi gagal: {str(e)}")
         raise HTTPException(
@@ -115,25 +167,211 @@ async def add_product(
             }
         )
 
-@router.get("/{id_serial}", status_code=status.HTTP_200_OK)
+@router.post("/import", status_code=status.HTTP_200_OK)
+def import_products_route(
+    file: UploadFile = File(..., description="CSV (dengan header) atau JSONL berisi field ProductCreate"),
+    images: Optional[UploadFile] = File(None, description="Zip berisi gambar yang dirujuk detail_images/display_images"),
+    format: Optional[str] = Form(None, description="'csv' atau 'jsonl' (default dari ekstensi file)"),
+    dry_run: bool = Form(False, description="Validasi dan cek konflik tanpa menyimpan"),
+    current_user: Dict = Depends(require_product_writer),
+    db: Session = Depends(get_db)
+):
+    """
+    Import produk massal. Kolom detail_images dan display_images berisi nama file di dalam zip,
+    dipisahkan '|' (CSV) atau berupa array (JSONL). Baris dimuat dengan COPY ke tabel staging,
+    konflik (category, place_name) dilaporkan per baris dan sisanya disimpan dalam satu transaksi.
+    """
+    try:
+        content = file.file.read()
+        report = import_products(
+            db,
+            content,
+            detect_format(file.filename, format),
+            images.file if images else None,
+            dry_run
+        )
+        return {
+            "message": "Validasi import selesai" if dry_run else "Import produk selesai",
+            "data": report
+        }
+    except ImportFormatError as e:
+        logger.warning(f"File import tidak valid: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ImageTooLargeError as e:
+        logger.warning(f"Zip gambar import ditolak: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Terjadi kesalahan saat import produk: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Terjadi kesalahan dalam sistem",
+                "error": str(e)
+            }
+        )
+
+def _export_ndjson(base_url: str):
+    db = SessionLocal()
+    try:
+        for batch in iter_product_batches(db, base_url):
+            yield b"".join(dumps_json_line(product) for product in batch)
+    finally:
+        db.close()
+
+def _csv_row(product: Dict) -> Dict:
+    row = {key: value for key, value in product.items() if key not in ("detail_images", "display_images")}
+    row["detail_image_urls"] = " ".join(image["file_url"] for image in product["detail_images"])
+    row["display_image_urls"] = " ".join(image["file_url"] for image in product["display_images"])
+    return row
+
+def _export_csv(base_url: str):
+    db = SessionLocal()
+    try:
+        fieldnames = None
+        for batch in iter_product_batches(db, base_url):
+            rows = [_csv_row(product) for product in batch]
+            if not rows:
+                continue
+            buffer = io.StringIO()
+            if fieldnames is None:
+                fieldnames = list(rows[0])
+                csv.DictWriter(buffer, fieldnames=fieldnames).writeheader()
+            csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore").writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_products(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Format ekspor: 'ndjson' atau 'csv'")
+):
+    """
+    Mengekspor seluruh katalog secara streaming untuk data feed partner.
+    Data dibaca lewat server-side cursor per batch sehingga memori tetap datar.
+    """
+    logger.info(f"Menerima permintaan ekspor katalog dalam format {format}")
+    base_url = str(request.base_url)
+
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(base_url),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=products.csv"}
+        )
+
+    return StreamingResponse(
+        _export_ndjson(base_url),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=products.ndjson"}
+    )
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
+def search_products_route(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Kata kunci pencarian"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_LIMIT, description="Jumlah hasil maksimum"),
+    db: Session = Depends(get_db)
+):
+    """
+    Mencari produk berdasarkan place_name, description, location dan kab_kota.
+    Hasil diurutkan berdasarkan relevansi dan tetap ditemukan walau ada salah ketik.
+    """
+    try:
+        base_url = str(request.base_url)
+        products = search_products(db, q, limit, base_url)
+        return ProductJSONResponse({
+            "message": "Pencarian produk berhasil" if products else "Tidak ada produk yang cocok",
+            "data": products
+        })
+    except Exception as e:
+        logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"message": "Terjadi kesalahan dalam sistem", "error": str(e)}
+        )
+
+@router.get("/suggest", status_code=status.HTTP_200_OK)
+def suggest_products_route(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Awalan kata yang sedang diketik"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="Jumlah saran maksimum"),
+    type: Optional[str] = Query(None, pattern="^(place_name|category|kab_kota)$", description="Batasi jenis saran"),
+    db: Session = Depends(get_db)
+):
+    """
+    Saran autocomplete untuk kotak pencarian dari place_name, category dan kab_kota
+    """
+    try:
+        suggestions = suggest_products(db, prefix, limit, type)
+        return ProductJSONResponse({
+            "message": "Saran berhasil diambil" if suggestions else "Tidak ada saran yang cocok",
+            "data": suggestions
+        })
+    except Exception as e:
+        logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"message": "Terjadi kesalahan dalam sistem", "error": str(e)}
+        )
+
+@router.get("/facets", status_code=status.HTTP_200_OK)
+def get_product_facets_route(
+    category: Optional[List[str]] = Query(None, description="Filter category, boleh lebih dari satu"),
+    kab_kota: Optional[List[str]] = Query(None, description="Filter kab_kota, boleh lebih dari satu"),
+    db: Session = Depends(get_db)
+):
+    """
+    Jumlah produk serta rentang harga dan rating per category dan kab_kota.
+    Facet category dibatasi filter kab_kota dan sebaliknya; total memakai kedua filter.
+    """
+    try:
+        facets = get_product_facets(db, category, kab_kota)
+        return ProductJSONResponse({
+            "message": "Berhasil mengambil facet produk",
+            "data": facets
+        })
+    except Exception as e:
+        logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"message": "Terjadi kesalahan dalam sistem", "error": str(e)}
+        )
+
+@router.get("/{id_serial}", status_code=status.HTTP_200_OK, response_model=ProductResponse)
 async def get_product(
     request: Request,  # Pindahkan ke awal
     id_serial: str,
-    db: Session = Depends(get_db),  # Default argument tetap di belakang
+    db: AsyncSession = Depends(get_async_db),  # Default argument tetap di belakang
 ):
     """
-    Mendapatkan detail produk berdasarkan ID
+    Mendapatkan detail produk berdasarkan ID.
+    Mendukung If-None-Match: bila produk tidak berubah, respons 304 tanpa query database.
     """
     try:
         logger.info(f"Menerima permintaan untuk mendapatkan produk dengan ID: {id_serial}")
 
-        base_url = str(request.base_url)  # Ambil base URL dari request
-        product = get_product_by_id(db, id_serial, base_url)
+        version = catalog_cache.product_version(id_serial)
+        if version:
+            etag = _make_etag(request, version)
+            if _is_not_modified(request, etag):
+                return _not_modified_response(etag)
 
-        return {
-            "message": "Produk berhasil ditemukan",
-            "data": product
-        }
+        base_url = str(request.base_url)  # Ambil base URL dari request
+        product = await get_product_by_id_async(db, id_serial, base_url)
+
+        return ProductJSONResponse(
+            {
+                "message": "Produk berhasil ditemukan",
+                "data": product
+            },
+            headers=_etag_headers(request, catalog_cache.product_version(id_serial))
+        )
 
     except ValueError as e:
         logger.warning(f"Produk tidak ditemukan: {str(e)}")
@@ -156,7 +394,6 @@ async def get_product(
 async def update_product_endpoint(
     request: Request,
     id_serial: str = Path(..., description="Product ID"),
-    user_id: int = Form(...),
     category: str = Form(...),
     place_name: str = Form(...),
     rating: float = Form(...),
@@ -173,17 +410,18 @@ async def update_product_endpoint(
     existing_display_images: str = Form(None),  # JSON string of existing images to keep
     detail_images: List[UploadFile] = File(None),  # Now properly optional
     display_images: List[UploadFile] = File(None),  # Now properly optional
-    db: Session = Depends(get_db)
+    current_user: Dict = Depends(require_product_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Memperbarui produk berdasarkan ID Serial dengan fleksibilitas untuk gambar
     """
     try:
         base_url = str(request.base_url)
-        logger.info(f"Menerima permintaan untuk memperbarui produk dengan ID: {id_serial}")
+        logger.info(f"Menerima permintaan untuk memperbarui produk dengan ID: {id_serial} dari {current_user['username']}")
 
         # Dapatkan informasi produk lama
-        old_product = get_product_by_id(db, id_serial, base_url)
+        old_product = await get_product_by_id_async(db, id_serial, base_url)
 
         if not old_product:
             raise HTTPException(
@@ -191,6 +429,9 @@ async def update_product_endpoint(
                 detail=f"Produk dengan ID {id_serial} tidak ditemukan"
             )
 
+        # Batas ukuran upload dibagi untuk gambar detail dan display
+        budget = UploadBudget()
+
         # Mengelola gambar detail
         detail_image_list = []
         old_detail_image_paths_to_remove = []
@@ -251,7 +492,7 @@ async def update_product_endpoint(
             # Pastikan detail_images tidak None dan filter gambar kosong
             valid_detail_images = [img for img in detail_images if img and img.filename]
             if valid_detail_images:
-                new_detail_image_list = save_images(valid_detail_images, "app/asset/detail_image")
+                new_detail_image_list = await save_images_async(valid_detail_images, budget)
                 detail_image_list.extend(new_detail_image_list)
 
         # Mengelola gambar display dengan cara yang sama
@@ -312,7 +553,7 @@ async def update_product_endpoint(
             # Pastikan display_images tidak None dan filter gambar kosong
             valid_display_images = [img for img in display_images if img and img.filename]
             if valid_display_images:
-                new_display_image_list = save_images(valid_display_images, "app/asset/display_image")
+                new_display_image_list = await save_images_async(valid_display_images, budget)
                 display_image_list.extend(new_display_image_list)
 
         # Validasi: tidak perlu error jika user mempertahankan gambar yang ada
@@ -330,10 +571,11 @@ async def update_product_endpoint(
             )
 
         # Perbarui produk
-        success = update_product(
+        success = await update_product_async(
             db,
             id_serial=id_serial,
-            user_id=user_id,
+            # Pemilik produk diambil dari token, bukan dari form yang dikirim klien
+            user_id=int(current_user["sub"]),
             category=category,
             place_name=place_name,
             rating=rating,
@@ -367,6 +609,12 @@ async def update_product_endpoint(
 
     except HTTPException as e:
         raise
+    except ImageTooLargeError as e:
+        logger.warning(f"Upload ditolak: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
         logger.error(traceback.format_exc())  # Tambahkan traceback untuk debugging
@@ -378,21 +626,62 @@ async def update_product_endpoint(
             }
         )
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_all_products_route(request: Request, db: Session = Depends(get_db)):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
+def get_all_products_route(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description="Jumlah produk per halaman (aktifkan pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor halaman berikutnya dari respons sebelumnya"),
+    order: str = Query("id", description="Urutan pagination: 'id' atau 'rating'"),
+    db: Session = Depends(get_db)
+):
     """
     Endpoint untuk mendapatkan semua produk
+
+    Query Parameters:
+    - limit: Jika diisi, hasil dipaginasi dan respons berisi next_cursor
+    - cursor: Nilai next_cursor dari halaman sebelumnya
+    - order: 'id' (default) atau 'rating'
+
+    Mendukung If-None-Match: selama katalog tidak berubah, respons 304 tanpa query database.
     """
     try:
         logger.info("Menerima permintaan untuk mendapatkan semua produk")
 
+        version = catalog_cache.catalog_version()
+        if version:
+            etag = _make_etag(request, version)
+            if _is_not_modified(request, etag):
+                return _not_modified_response(etag)
+
         base_url = str(request.base_url)
+
+        if limit is not None:
+            page = get_all_products_page(db, base_url, limit, cursor, order)
+            return ProductJSONResponse(
+                {
+                    "message": "Berhasil mengambil halaman produk",
+                    "data": page["data"],
+                    "next_cursor": page["next_cursor"]
+                },
+                headers=_etag_headers(request, catalog_cache.catalog_version())
+            )
+
         products = get_all_products(db, base_url)
 
-        return {
-            "message": "Berhasil mengambil semua produk",
-            "data": products
-        }
+        return ProductJSONResponse(
+            {
+                "message": "Berhasil mengambil semua produk",
+                "data": products
+            },
+            headers=_etag_headers(request, catalog_cache.catalog_version())
+        )
+
+    except ValueError as e:
+        logger.warning(f"Parameter pagination tidak valid: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     except Exception as e:
         logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
@@ -404,38 +693,61 @@ def get_all_products_route(request: Request, db: Session = Depends(get_db)):
             }
         )
 
-@router.get("/kab_kota/{kab_kota}/{latitude},{longitude}", status_code=status.HTTP_200_OK)
+@router.get("/kab_kota/{kab_kota}/{latitude},{longitude}", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
 def get_products_by_kab_kota_route(
     request: Request, 
     kab_kota: str, 
     latitude: float, 
     longitude: float, 
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description="Jumlah produk per halaman (aktifkan pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor halaman berikutnya dari respons sebelumnya"),
+    order: str = Query("id", description="Urutan pagination: 'id' atau 'rating'"),
     db: Session = Depends(get_db)
 ):
     """
     Endpoint untuk mendapatkan produk berdasarkan kabupaten/kota dengan jarak dari lokasi pengguna
+
+    Query Parameters:
+    - limit, cursor, order: Pagination berbasis cursor (lihat GET /products/)
     """
     try:
         logger.info(f"Menerima permintaan untuk mendapatkan produk di kabupaten/kota: {kab_kota} dari lokasi ({latitude}, {longitude})")
 
         base_url = str(request.base_url)
-        products = get_products_by_kab_kota(db, kab_kota, latitude, longitude, base_url)
 
-        if not products:
+        next_cursor = None
+        if limit is not None:
+            page = get_products_by_kab_kota_page(db, kab_kota, latitude, longitude, base_url, limit, cursor, order)
+            products, next_cursor = page["data"], page["next_cursor"]
+        else:
+            products = get_products_by_kab_kota(db, kab_kota, latitude, longitude, base_url)
+
+        if not products and not cursor:
             logger.warning(f"Tidak ada produk ditemukan di kabupaten/kota: {kab_kota}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Tidak ada produk ditemukan di kabupaten/kota: {kab_kota}"
             )
 
-        return {
+        response = {
             "message": f"Berhasil mengambil produk di {kab_kota}",
             "data": products
         }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+
+        return ProductJSONResponse(response)
 
     except HTTPException as e:
         raise e  # Meneruskan error 404 jika tidak ditemukan
 
+    except ValueError as e:
+        logger.warning(f"Parameter pagination tidak valid: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
     except Exception as e:
         logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
         raise HTTPException(
@@ -446,7 +758,7 @@ def get_products_by_kab_kota_route(
             }
         )
 
-@router.get("/category/{category}/{latitude},{longitude}", status_code=status.HTTP_200_OK)
+@router.get("/category/{category}/{latitude},{longitude}", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
 def get_products_by_category_route(
     request: Request, 
     category: str, 
@@ -454,6 +766,8 @@ def get_products_by_category_route(
     longitude: float,
     sortby: str = None,
     location: str = None, 
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description="Jumlah produk per halaman (aktifkan pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor halaman berikutnya dari respons sebelumnya"),
     db: Session = Depends(get_db)):
     """
     Endpoint untuk mendapatkan produk berdasarkan kategori dengan jarak dari lokasi pengguna
@@ -461,6 +775,7 @@ def get_products_by_category_route(
     Query Parameters:
     - sortby: 'Distance', 'Price', 'Rating', atau 'Availability'
     - location: Filter berdasarkan kab_kota
+    - limit, cursor: Pagination berbasis cursor. Dengan pagination, sortby hanya mendukung 'Rating'
     """
     try:
         logger.info(f"Menerima permintaan untuk mendapatkan produk dengan kategori: {category} dari lokasi ({latitude}, {longitude})")
@@ -477,19 +792,40 @@ def get_products_by_category_route(
         # Get base URL for building image URLs
         base_url = str(request.base_url)
         
-        # Call service to fetch products with filters
-        products = get_products_by_category(
-            db=db, 
-            category=category, 
-            latitude=latitude, 
-            longitude=longitude,
-            base_url=base_url,
-            sortby=sortby,
-            location=location
-        )
+        next_cursor = None
+        if limit is not None:
+            # Keyset pagination only supports orders backed by a stable key
+            if sortby not in (None, "rating"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Pagination hanya mendukung sortby 'Rating' atau tanpa sortby"
+                )
+            page = get_products_by_category_page(
+                db=db,
+                category=category,
+                latitude=latitude,
+                longitude=longitude,
+                base_url=base_url,
+                limit=limit,
+                cursor=cursor,
+                order="rating" if sortby == "rating" else "id",
+                location=location
+            )
+            products, next_cursor = page["data"], page["next_cursor"]
+        else:
+            # Call service to fetch products with filters
+            products = get_products_by_category(
+                db=db, 
+                category=category, 
+                latitude=latitude, 
+                longitude=longitude,
+                base_url=base_url,
+                sortby=sortby,
+                location=location
+            )
 
         # Handle empty results
-        if not products:
+        if not products and not cursor:
             logger.warning(f"Tidak ada produk ditemukan untuk kategori: {category}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -512,12 +848,22 @@ def get_products_by_category_route(
         if filter_info:
             response["filters_applied"] = filter_info
 
-        return response
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+
+        return ProductJSONResponse(response)
 
     except HTTPException as e:
         # Re-raise HTTP exceptions (like 404)
         raise e
 
+    except ValueError as e:
+        logger.warning(f"Parameter pagination tidak valid: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
     except Exception as e:
         # Log and handle other exceptions
         logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
@@ -532,13 +878,14 @@ def get_products_by_category_route(
 @router.delete("/{id_serial}", status_code=status.HTTP_200_OK)
 async def delete_product_endpoint(
     id_serial: str = Path(..., description="Product ID"),
-    db: Session = Depends(get_db)
+    current_user: Dict = Depends(require_product_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Menghapus produk berdasarkan ID Serial
     """
     try:
-        success = delete_product(db, id_serial)
+        success = await delete_product_async(db, id_serial)
 
         if not success:
             logger.warning(f"Gagal menghapus produk dengan ID: {id_serial}")
@@ -562,16 +909,20 @@ async def delete_product_endpoint(
             detail={"message": "Terjadi kesalahan dalam sistem", "error": str(e)}
         )
 
-@router.get("/nearme/{latitude},{longitude}", status_code=status.HTTP_200_OK)
+@router.get("/nearme/{latitude},{longitude}", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
 async def find_nearby_products(
     request: Request,
     latitude: float,
     longitude: float,
     max_distance: Optional[int] = Query(10, description="Maximum distance in kilometers"),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description="Jumlah produk per halaman (aktifkan pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor halaman berikutnya dari respons sebelumnya"),
+    order: str = Query("id", description="Urutan pagination: 'id' atau 'rating'"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Mendapatkan produk terdekat berdasarkan koordinat pengguna.
+    Gunakan limit, cursor dan order untuk pagination berbasis cursor.
     """
 
     # Validasi input
@@ -596,20 +947,38 @@ async def find_nearby_products(
     try:
         logger.info(f"Menerima permintaan produk dalam radius {max_distance} km dari ({latitude}, {longitude})")
         base_url = str(request.base_url)
-        products = get_nearby_products(db, latitude, longitude, max_distance, base_url)
+
+        next_cursor = None
+        if limit is not None:
+            page = await get_nearby_products_page_async(db, latitude, longitude, max_distance, base_url, limit, cursor, order)
+            products, next_cursor = page["data"], page["next_cursor"]
+        else:
+            products = await get_nearby_products_async(db, latitude, longitude, max_distance, base_url)
 
         # Jika tidak ada produk yang ditemukan, kembalikan error 404
-        if not products:
+        if not products and not cursor:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail={"message": "Tidak ditemukan produk apapun yang terdekat dalam radius tersebut."}
             )
 
-        return {
+        response = {
             "message": "Produk berhasil ditemukan",
             "data": products
         }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+
+        return ProductJSONResponse(response)
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.warning(f"Parameter pagination tidak valid: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e)}
+        )
     except Exception as e:
         logger.error(f"Terjadi kesalahan dalam sistem: {str(e)}")
         raise HTTPException(
@@ -617,12 +986,12 @@ async def find_nearby_products(
             detail={"message": "Terjadi kesalahan dalam sistem", "error": str(e)}
         )
 
-@router.get("/populer/{latitude},{longitude}", status_code=status.HTTP_200_OK)
+@router.get("/populer/{latitude},{longitude}", status_code=status.HTTP_200_OK, response_model=ProductListResponse)
 async def get_popular_products_by_location(
     request: Request,
     latitude: float = Path(..., description="Latitude lokasi pengguna"),
     longitude: float = Path(..., description="Longitude lokasi pengguna"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     category: Optional[str] = Query(None, description="Kategori produk (opsional)"),
     limit: int = Query(10, description="Jumlah produk yang ingin diambil")
 ):
@@ -652,7 +1021,7 @@ async def get_popular_products_by_location(
     try:
         logger.info(f"Memproses permintaan produk populer berdasarkan lokasi [{latitude}, {longitude}]: limit={limit}, category={category or 'Semua'}")
         base_url = str(request.base_url)
-        products = get_top_rated_products_by_location(db, latitude, longitude, category, limit, base_url)
+        products = await get_top_rated_products_by_location_async(db, latitude, longitude, category, limit, base_url)
 
         # Jika tidak ada produk yang ditemukan, kembalikan error 404
         if not products:
@@ -661,10 +1030,10 @@ async def get_popular_products_by_location(
                 detail={"message": "Tidak ditemukan produk populer di sekitar lokasi Anda."}
             )
 
-        return {
+        return ProductJSONResponse({
             "message": "Produk populer di sekitar lokasi Anda berhasil ditemukan",
             "data": products
-        }
+        })
 
     except HTTPException as http_err:
         raise http_err
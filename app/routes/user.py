@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import UserLogin
 from app.schemas import UserRegister
-from app.services.auth import user_login
-from app.services.auth import user_register
+from app.services.auth import user_login_async
+from app.services.auth import user_register_async
+from app.services.passwords import PasswordHasherBusyError
 import logging
 
 # Set up logging
@@ -13,18 +14,10 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Dependency untuk mendapatkan sesi database
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/login", status_code=status.HTTP_200_OK)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     try:
-        user_data = user_login(db, user)
+        user_data = await user_login_async(db, user)
         if not user_data:
             logger.warning(f"Login failed for user: {user.username}")
             raise HTTPException(
@@ -37,6 +30,15 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
             "message": "Login successful",
             "data": user_data
         }
+    except HTTPException:
+        raise
+    except PasswordHasherBusyError:
+        logger.warning(f"Login ditolak karena antrean hash password penuh: {user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang sibuk, silakan coba lagi",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         raise HTTPException(
@@ -48,10 +50,10 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
         )
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(user: UserRegister, db: Session = Depends(get_db)):
+async def register(user: UserRegister, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info(f"Menerima permintaan registrasi untuk: {user.username}")
-        user_data = user_register(db, user)
+        user_data = await user_register_async(db, user)
         
         if user_data == "USERNAME_EXISTS":
             logger.warning(f"Registrasi gagal: Username {user.username} sudah digunakan.")
@@ -68,7 +70,7 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
             )
 
         # Add explicit commit here
-        db.commit()
+        await db.commit()
         
         logger.info(f"Registrasi sukses untuk: {user.username}")
         return {
@@ -77,12 +79,20 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
         }
 
     except HTTPException as e:
-        db.rollback()  # Rollback on error
+        await db.rollback()  # Rollback on error
         logger.warning(f"HTTP Exception: {str(e)}")
         raise
 
+    except PasswordHasherBusyError:
+        logger.warning(f"Registrasi ditolak karena antrean hash password penuh: {user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang sibuk, silakan coba lagi",
+            headers={"Retry-After": "1"}
+        )
+
     except Exception as e:
-        db.rollback()  # Rollback on error
+        await db.rollback()  # Rollback on error
         logger.error(f"Error Tidak Terduga: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
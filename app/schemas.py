@@ -1,14 +1,16 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Dict
+from datetime import time
 
 class UserLogin(BaseModel):
     username: str
     password: str
 
+# Role tidak bisa dipilih saat registrasi; field roles dari klien diabaikan dan
+# akun baru selalu ber-role "user"
 class UserRegister(BaseModel):
     username: str
     password: str
-    roles: str = "user"
 
 class ProductCreate(BaseModel):
     user_id: int
@@ -24,3 +26,45 @@ class ProductCreate(BaseModel):
     latitude: float
     longitude: float
     kab_kota: str
+
+class ProductImage(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[int] = None
+    filename: str
+    filename_path: str
+    file_url: str
+    variants: Optional[Dict[str, Dict[str, str]]] = None
+
+# Endpoint berbasis lokasi menambahkan kolom jarak dan waktu tempuh apa adanya dari stored
+# function; nama kolomnya ditentukan stored function sehingga tidak dideklarasikan di sini
+class ProductOut(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id_serial: str
+    user_id: Optional[int] = None
+    category: str
+    place_name: str
+    rating: float
+    price: float
+    stock: int
+    description: str
+    open_time: time
+    close_time: time
+    location: str
+    latitude: float
+    longitude: float
+    kab_kota: str
+    detail_images: List[ProductImage] = []
+    display_images: List[ProductImage] = []
+
+class ProductResponse(BaseModel):
+    message: str
+    data: ProductOut
+
+class ProductListResponse(BaseModel):
+    message: str
+    data: List[ProductOut]
+    next_cursor: Optional[str] = None
+    filters_applied: Optional[Dict[str, str]] = None
+
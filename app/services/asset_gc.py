@@ -0,0 +1,183 @@
+import os
+import time
+import logging
+import argparse
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.static_files import static_files
+from app.services.image_variants import ASSET_ROOT, VARIANT_ROOT, variant_paths
+from app.services.image_store import BLOB_ROOT, IMAGE_TABLES, count_references
+from app.services.job_queue import job_queue
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Folder gambar asli yang diperiksa (format lama dan storage berbasis hash)
+SOURCE_FOLDERS = (
+    os.path.join(ASSET_ROOT, "detail_image"),
+    os.path.join(ASSET_ROOT, "display_image"),
+    BLOB_ROOT,
+)
+
+# File yang lebih muda dari ini tidak pernah dihapus, karena transaksi yang
+# mereferensikannya mungkin belum commit
+ASSET_GC_GRACE_SECONDS = float(os.getenv("ASSET_GC_GRACE_SECONDS", "3600"))
+# Interval GC terjadwal; 0 menonaktifkan penjadwalan
+ASSET_GC_INTERVAL_SECONDS = float(os.getenv("ASSET_GC_INTERVAL_SECONDS", "86400"))
+# GC terjadwal hanya membuat laporan kecuali diaktifkan secara eksplisit
+ASSET_GC_DELETE = os.getenv("ASSET_GC_DELETE", "false").lower() == "true"
+
+REFERENCE_BATCH_SIZE = 5000
+REPORT_SAMPLE_SIZE = 20
+
+def _normalize(path: str) -> str:
+    return path.replace('\\', '/')
+
+def load_referenced_paths(db: Session) -> Set[str]:
+    """
+    Semua filename_path yang direferensikan detail_image dan display_image, dibaca bertahap
+    """
+    union = " UNION ".join(f"SELECT filename_path FROM {table}" for table in IMAGE_TABLES)
+    result = db.execute(text(union).execution_options(stream_results=True, yield_per=REFERENCE_BATCH_SIZE))
+    return {_normalize(row[0]) for row in result}
+
+def iter_files(folder: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Menelusuri folder secara rekursif dengan os.scandir (stat didapat tanpa syscall tambahan)
+    """
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield _normalize(entry.path), entry.stat(follow_symlinks=False)
+
+def find_orphans(referenced: Set[str], grace_seconds: float = ASSET_GC_GRACE_SECONDS) -> Dict[str, Any]:
+    """
+    Selisih himpunan antara file di disk dan path yang direferensikan database.
+    Varian dianggap yatim bila bukan varian dari gambar yang masih direferensikan.
+    """
+    cutoff = time.time() - grace_seconds
+    expected_variants = {path for source in referenced for path in variant_paths(source)}
+
+    orphans: List[Tuple[str, int]] = []
+    scanned = 0
+    skipped_recent = 0
+    folders = [(folder, referenced) for folder in SOURCE_FOLDERS] + [(VARIANT_ROOT, expected_variants)]
+    for folder, keep in folders:
+        for path, stat in iter_files(folder):
+            scanned += 1
+            if path in keep:
+                continue
+            if stat.st_mtime > cutoff:
+                skipped_recent += 1
+                continue
+            orphans.append((path, stat.st_size))
+
+    return {
+        "scanned_files": scanned,
+        "referenced_paths": len(referenced),
+        "skipped_recent": skipped_recent,
+        "orphans": orphans,
+    }
+
+def collect_garbage(dry_run: bool = True, grace_seconds: float = ASSET_GC_GRACE_SECONDS) -> Dict[str, Any]:
+    """
+    Mencari file gambar yang tidak direferensikan produk mana pun dan menghapusnya bila
+    dry_run False. Sebelum dihapus, setiap kandidat diperiksa ulang ke database.
+    """
+    db = SessionLocal()
+    try:
+        started = time.monotonic()
+        result = find_orphans(load_referenced_paths(db), grace_seconds)
+        orphans = result.pop("orphans")
+
+        deleted = 0
+        if not dry_run:
+            for start in range(0, len(orphans), REFERENCE_BATCH_SIZE):
+                batch = [path for path, _ in orphans[start:start + REFERENCE_BATCH_SIZE]]
+                # Varian tidak punya baris sendiri, jadi hitungannya selalu 0
+                references = count_references(db, batch)
+                unreferenced = [path for path in batch if references.get(path, 0) == 0]
+                for path in unreferenced:
+                    try:
+                        os.remove(path)
+                        static_files.forget(path)
+                        deleted += 1
+                    except FileNotFoundError:
+                        pass
+                    except Exception as e:
+                        logger.error(f"Gagal menghapus file {path}: {str(e)}")
+
+        report = {
+            **result,
+            "dry_run": dry_run,
+            "grace_seconds": grace_seconds,
+            "orphan_files": len(orphans),
+            "orphan_bytes": sum(size for _, size in orphans),
+            "deleted_files": deleted,
+            "sample": [path for path, _ in orphans[:REPORT_SAMPLE_SIZE]],
+            "duration_seconds": round(time.monotonic() - started, 3),
+        }
+        logger.info(
+            f"GC aset: {report['orphan_files']} file yatim ({report['orphan_bytes']} byte) dari "
+            f"{report['scanned_files']} file, {deleted} dihapus{' (dry run)' if dry_run else ''}"
+        )
+        return report
+    finally:
+        db.close()
+
+def run_gc_job(payload: Dict[str, Any]):
+    collect_garbage(dry_run=payload.get("dry_run", True), grace_seconds=payload.get("grace_seconds", ASSET_GC_GRACE_SECONDS))
+
+job_queue.register("asset_gc", run_gc_job)
+
+_scheduler_stop = threading.Event()
+
+def _scheduler_loop(interval_seconds: float):
+    while not _scheduler_stop.wait(interval_seconds):
+        try:
+            job_queue.enqueue_unique("asset_gc", {"dry_run": not ASSET_GC_DELETE})
+        except Exception as e:
+            logger.error(f"Gagal menjadwalkan GC aset: {str(e)}")
+
+def start_scheduler(interval_seconds: float = ASSET_GC_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """
+    Menjadwalkan GC aset secara berkala lewat job queue. Dengan beberapa worker server,
+    enqueue_unique memastikan hanya satu job GC yang menunggu di journal bersama.
+    """
+    if interval_seconds <= 0:
+        return None
+    _scheduler_stop.clear()
+    thread = threading.Thread(target=_scheduler_loop, args=(interval_seconds,), name="asset-gc-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+def stop_scheduler():
+    _scheduler_stop.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Membersihkan file gambar yang tidak direferensikan produk mana pun")
+    parser.add_argument("--delete", action="store_true", help="Benar-benar menghapus file (default hanya laporan dry run)")
+    parser.add_argument("--grace-seconds", type=float, default=ASSET_GC_GRACE_SECONDS, help="Umur minimum file yang boleh dihapus")
+    args = parser.parse_args()
+
+    report = collect_garbage(dry_run=not args.delete, grace_seconds=args.grace_seconds)
+    for key, value in report.items():
+        if key != "sample":
+            print(f"{key}: {value}")
+    for path in report["sample"]:
+        print(f"  {path}")
@@ -1,73 +1,117 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
 from app.schemas import UserLogin
 from app.schemas import UserRegister
+from app.services.tokens import token_service, parse_roles
+from app.services.passwords import password_hasher, is_bcrypt_hash
+from typing import Optional
 import logging
-import psycopg2
+import secrets
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def user_login(db: Session, login_data: UserLogin):
+# Password diverifikasi di aplikasi (bcrypt di thread pool), bukan di stored function,
+# agar CPU hashing tidak membebani server database
+USER_BY_USERNAME = text('SELECT id, username, password, roles FROM "user" WHERE username = :username')
+
+# Stored function lama tetap dipakai untuk password yang belum berformat bcrypt
+LEGACY_LOGIN = text("SELECT * FROM user_login(:username, :password)")
+
+UPGRADE_PASSWORD = text('UPDATE "user" SET password = :password WHERE id = :id AND password = :previous')
+
+# Role akun baru selalu 'user'; role lain hanya diberikan langsung di database
+REGISTER_USER = text("""
+    INSERT INTO "user" (username, password, roles, created_at)
+    SELECT :username, :password, 'user', now()
+    WHERE NOT EXISTS (SELECT 1 FROM "user" WHERE username = :username)
+    RETURNING id, username, roles, created_at
+""")
+
+_dummy_hash: Optional[str] = None
+
+async def _get_dummy_hash() -> str:
+    """
+    Hash bcrypt dengan cost yang sama dengan hash asli, untuk verifikasi username yang
+    tidak ada agar waktu responsnya tidak membedakan username terdaftar
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await password_hasher.hash_async(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+def _login_response(row) -> dict:
+    user = {"id": row.id, "username": row.username, "roles": parse_roles(row.roles)}
+    return {**user, **token_service.issue(user["id"], user["username"], user["roles"])}
+
+def _register_response(result):
+    if result is None:
+        return "USERNAME_EXISTS"
+    return {"id": result[0], "username": result[1], "roles": result[2], "created_at": result[3]}
+
+# Route memakai AsyncSession (asyncpg). Hashing ditunggu lewat Future dari thread pool,
+# sehingga event loop tetap melayani request lain.
+async def user_login_async(db: AsyncSession, login_data: UserLogin):
     try:
-        # Panggil FUNCTION PostgreSQL
-        stored_func = """
-        SELECT * FROM user_login(:username, :password);
-        """
-        
-        params = {
-            "username": login_data.username,
-            "password": login_data.password
-        }
+        params = {"username": login_data.username, "password": login_data.password}
+        row = (await db.execute(USER_BY_USERNAME, {"username": login_data.username})).fetchone()
+        # Akhiri transaksi baca agar koneksi kembali ke pool selama bcrypt berjalan
+        await db.rollback()
+        if row is None:
+            await password_hasher.verify_async(login_data.password, await _get_dummy_hash())
+            logger.info(f"Kredensial tidak valid untuk pengguna: {login_data.username}")
+            return None
+
+        if is_bcrypt_hash(row.password):
+            valid, needs_rehash = await password_hasher.verify_async(login_data.password, row.password)
+        else:
+            logger.info(f"Menjalankan stored function untuk pengguna dengan password format lama: {login_data.username}")
+            valid = (await db.execute(LEGACY_LOGIN, params)).fetchone() is not None
+            needs_rehash = valid
+
+        if not valid:
+            logger.info(f"Kredensial tidak valid untuk pengguna: {login_data.username}")
+            return None
 
-        logger.info(f"Menjalankan stored function untuk pengguna: {login_data.username}")
-        result = db.execute(text(stored_func), params).fetchone()
+        if needs_rehash:
+            new_hash = await password_hasher.hash_async(login_data.password)
+            await db.execute(UPGRADE_PASSWORD, {"id": row.id, "password": new_hash, "previous": row.password})
+            await db.commit()
+            logger.info(f"Hash password diperbarui untuk pengguna: {row.username}")
+
+        logger.info(f"Login berhasil untuk pengguna: {row.username}")
+        return _login_response(row)
 
-        if result:
-            logger.info(f"Login berhasil untuk pengguna: {result[1]}")
-            return {"id": result[0], "username": result[1]}
-        
-        logger.info(f"Kredensial tidak valid untuk pengguna: {login_data.username}")
-        return None
-        
     except Exception as e:
+        await db.rollback()
         logger.error(f"Error database: {str(e)}")
         raise
 
-def user_register(db: Session, register_data: UserRegister):
+async def user_register_async(db: AsyncSession, register_data: UserRegister):
     try:
-        stored_func = """
-        SELECT * FROM user_register(:username, :password, :roles);
-        """
-        
         params = {
             "username": register_data.username,
-            "password": register_data.password,
-            "roles": register_data.roles
+            "password": await password_hasher.hash_async(register_data.password)
         }
 
-        logger.info(f"Menjalankan stored function untuk register: {register_data.username}")
-        result = db.execute(text(stored_func), params).fetchone()
-        
-        # Commit the transaction
-        db.commit()
+        logger.info(f"Menyimpan registrasi: {register_data.username}")
+        result = (await db.execute(REGISTER_USER, params)).fetchone()
+        await db.commit()
 
-        if result:
+        if result is None:
+            logger.warning(f"Username sudah ada: {register_data.username}")
+        else:
             logger.info(f"Registrasi berhasil untuk user: {result[1]}")
-            return {"id": result[0], "username": result[1], "roles": result[2], "created_at": result[3]}
+        return _register_response(result)
 
-        logger.error("Tidak ada data yang dikembalikan dari stored function.")
-        return None
+    except IntegrityError:
+        await db.rollback()
+        logger.warning(f"Username sudah ada: {register_data.username}")
+        return "USERNAME_EXISTS"
 
     except Exception as e:
-        db.rollback()  # Rollback on error
-        error_message = str(e)
-        
-        # Check if this is the specific username exists error
-        if "USERNAME_EXISTS" in error_message:
-            logger.warning(f"Username sudah ada: {register_data.username}")
-            return "USERNAME_EXISTS"
-        
+        await db.rollback()
         logger.error(f"Error database tidak terduga: {str(e)}")
         raise
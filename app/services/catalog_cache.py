@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_MAX_SIZE = int(os.getenv("CATALOG_CACHE_MAX_SIZE", "10000"))
+
+def content_hash(value: Any) -> str:
+    """
+    Hash stabil dari data katalog, dipakai sebagai versi untuk ETag
+    """
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+class CatalogCache:
+    """
+    Cache katalog produk di memori proses, dengan key id_serial.
+
+    Setiap entri menyimpan baris produk (boleh kosong bila baru gambarnya yang diketahui)
+    dan daftar gambar mentah tanpa file_url, karena file_url bergantung pada base_url request.
+    Entri kedaluwarsa setelah TTL dan yang paling lama tidak dipakai dibuang saat cache penuh.
+    Snapshot urutan katalog lengkap hanya valid selama semua entrinya masih ada di cache,
+    karena itu kapasitas dinaikkan mengikuti ukuran katalog yang dimuat.
+    Setiap perubahan menaikkan `generation`, sehingga hasil query yang dimulai sebelum
+    perubahan tidak akan disimpan.
+
+    Versi katalog dan versi produk adalah hash isi data di cache, sehingga sama di semua
+    worker yang memuat data yang sama dan berubah setiap kali data dimuat ulang setelah berubah.
+    """
+
+    def __init__(self, ttl_seconds: float = CATALOG_CACHE_TTL, max_size: int = CATALOG_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._catalog_ids: Optional[List[str]] = None
+        self._catalog_expires_at = 0.0
+        self._catalog_version: Optional[str] = None
+        self._counters = {kind: {"hits": 0, "misses": 0} for kind in ("product", "images", "catalog")}
+        self._evictions = 0
+
+    def _count(self, kind: str, hit: bool):
+        self._counters[kind]["hits" if hit else "misses"] += 1
+
+    def _get_entry(self, id_serial: str, now: float) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(id_serial)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= now:
+            del self._entries[id_serial]
+            return None
+        self._entries.move_to_end(id_serial)
+        return entry
+
+    def _set_entry(self, id_serial: str, entry: Dict[str, Any], now: float):
+        self._entries[id_serial] = (now + self.ttl_seconds, entry)
+        self._entries.move_to_end(id_serial)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+            # Katalog tidak lagi lengkap di memori
+            self._catalog_ids = None
+
+    def get_product(self, id_serial: str) -> Optional[Dict[str, Any]]:
+        """
+        Mengembalikan salinan baris produk beserta gambar mentahnya, atau None
+        """
+        with self._lock:
+            entry = self._get_entry(id_serial, time.monotonic())
+            hit = entry is not None and entry["product"] is not None and entry["images"] is not None
+            self._count("product", hit)
+            if not hit:
+                return None
+            return {"product": dict(entry["product"]), "images": entry["images"]}
+
+    def put_product(self, id_serial: str, product: Dict[str, Any], images: Dict[str, List[Dict[str, Any]]], generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._set_entry(id_serial, {"product": dict(product), "images": images}, time.monotonic())
+
+    def get_images(self, product_ids: List[str]) -> Tuple[Dict[str, Dict[str, List[Dict[str, Any]]]], List[str]]:
+        """
+        Mengembalikan gambar yang ada di cache dan daftar id yang belum ada
+        """
+        found, missing = {}, []
+        with self._lock:
+            now = time.monotonic()
+            for product_id in product_ids:
+                entry = self._get_entry(product_id, now)
+                if entry is not None and entry["images"] is not None:
+                    found[product_id] = entry["images"]
+                else:
+                    missing.append(product_id)
+            self._counters["images"]["hits"] += len(found)
+            self._counters["images"]["misses"] += len(missing)
+        return found, missing
+
+    def put_images(self, images: Dict[str, Dict[str, List[Dict[str, Any]]]], generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            now = time.monotonic()
+            for product_id, product_images in images.items():
+                entry = self._get_entry(product_id, now)
+                product = entry["product"] if entry else None
+                self._set_entry(product_id, {"product": product, "images": product_images}, now)
+
+    def get_catalog(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Mengembalikan salinan seluruh katalog (urutan get_all_products) bila cache lengkap
+        """
+        with self._lock:
+            now = time.monotonic()
+            entries = None
+            if self._catalog_ids is not None and self._catalog_expires_at > now:
+                entries = [self._get_entry(id_serial, now) for id_serial in self._catalog_ids]
+                if any(entry is None for entry in entries):
+                    self._catalog_ids = None
+                    entries = None
+            self._count("catalog", entries is not None)
+            if entries is None:
+                return None
+            return [{"product": dict(entry["product"]), "images": entry["images"]} for entry in entries]
+
+    def load_catalog(self, products: List[Dict[str, Any]], images: Dict[str, Dict[str, List[Dict[str, Any]]]], generation: int):
+        """
+        Menyimpan snapshot katalog lengkap hasil get_all_products
+        """
+        version = content_hash([[product, images[product["id_serial"]]] for product in products])
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(products) > self.max_size:
+                # Index di memori selalu memuat seluruh katalog; cache yang lebih kecil membuat setiap
+                # query index memuat ulang katalog dan membangun ulang semua index. Sisakan ruang
+                # untuk produk baru agar snapshot tidak langsung terbuang.
+                self.max_size = len(products) + max(len(products) // 10, 1)
+                logger.warning(f"Katalog ({len(products)} produk) melebihi kapasitas cache, kapasitas dinaikkan menjadi {self.max_size}")
+            now = time.monotonic()
+            for product in products:
+                self._set_entry(product["id_serial"], {"product": dict(product), "images": images[product["id_serial"]]}, now)
+            self._catalog_ids = [product["id_serial"] for product in products]
+            self._catalog_expires_at = now + self.ttl_seconds
+            self._catalog_version = version
+
+    def is_warm(self) -> bool:
+        with self._lock:
+            return self._catalog_ids is not None and self._catalog_expires_at > time.monotonic()
+
+    def catalog_version(self) -> Optional[str]:
+        """
+        Versi snapshot katalog, atau None bila katalog belum/tidak lagi ada di cache
+        """
+        with self._lock:
+            if self._catalog_ids is None or self._catalog_expires_at <= time.monotonic():
+                return None
+            return self._catalog_version
+
+    def product_version(self, id_serial: str) -> Optional[str]:
+        """
+        Versi satu produk di cache (tanpa menghitung hit/miss), atau None bila tidak ada
+        """
+        with self._lock:
+            entry = self._get_entry(id_serial, time.monotonic())
+            if entry is None or entry["product"] is None or entry["images"] is None:
+                return None
+            if "version" not in entry:
+                entry["version"] = content_hash([entry["product"], entry["images"]])
+            return entry["version"]
+
+    def invalidate(self, id_serial: Optional[str] = None):
+        """
+        Membuang entri produk (atau seluruh cache bila id_serial None) dan snapshot katalog
+        """
+        with self._lock:
+            if id_serial is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(id_serial, None)
+            self._catalog_ids = None
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {}
+            for kind, counter in self._counters.items():
+                total = counter["hits"] + counter["misses"]
+                counters[kind] = {**counter, "hit_ratio": round(counter["hits"] / total, 4) if total else None}
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "catalog_warm": self._catalog_ids is not None and self._catalog_expires_at > time.monotonic(),
+                "generation": self.generation,
+                "evictions": self._evictions,
+                **counters,
+            }
+
+catalog_cache = CatalogCache()
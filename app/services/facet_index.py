@@ -0,0 +1,143 @@
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FACET_FIELDS = ("category", "kab_kota")
+FACET_CACHE_SIZE = 256
+
+_Cell = Tuple[str, str]
+
+def _value(value: Optional[str]) -> str:
+    # Dicocokkan persis seperti route /products/category dan /products/kab_kota: nilai yang
+    # berbeda huruf besar/kecil atau spasi adalah facet terpisah
+    return value or ""
+
+class _CellStats:
+    """
+    Statistik produk dengan kombinasi (category, kab_kota) yang sama. Harga dan rating
+    disimpan terurut agar min/max tetap benar saat produk dihapus atau diubah.
+    """
+
+    __slots__ = ("prices", "ratings")
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.ratings: List[float] = []
+
+    def add(self, price: float, rating: float):
+        bisect.insort(self.prices, price)
+        bisect.insort(self.ratings, rating)
+
+    def discard(self, price: float, rating: float):
+        for values, value in ((self.prices, price), (self.ratings, rating)):
+            index = bisect.bisect_left(values, value)
+            if index < len(values) and values[index] == value:
+                del values[index]
+
+def _empty_summary() -> Dict[str, Any]:
+    return {"count": 0, "price": {"min": None, "max": None}, "rating": {"min": None, "max": None}}
+
+def _merge(summary: Dict[str, Any], stats: _CellStats):
+    summary["count"] += len(stats.prices)
+    for field, values in (("price", stats.prices), ("rating", stats.ratings)):
+        bounds = summary[field]
+        bounds["min"] = values[0] if bounds["min"] is None else min(bounds["min"], values[0])
+        bounds["max"] = values[-1] if bounds["max"] is None else max(bounds["max"], values[-1])
+
+class FacetIndex:
+    """
+    Jumlah produk serta rentang harga dan rating per category dan kab_kota, dirawat
+    inkremental dari hook create/update/delete.
+
+    Statistik disimpan per sel (category, kab_kota), sehingga facet dengan filter gabungan
+    cukup menjumlahkan sel yang lolos filter tanpa menyentuh produk. Facet category memakai
+    filter kab_kota (dan sebaliknya) tetapi tidak filter miliknya sendiri, agar pilihan lain
+    tetap terlihat beserta jumlahnya. Nilai dan filter dicocokkan persis, sama dengan route
+    kategori dan kab_kota. Hasil agregasi di-cache sampai katalog berubah.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cells: Dict[_Cell, _CellStats] = {}
+        self._products: Dict[str, Tuple[_Cell, float, float]] = {}
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.ready = False
+
+    def _remove(self, id_serial: str):
+        previous = self._products.pop(id_serial, None)
+        if previous is None:
+            return
+        cell, price, rating = previous
+        stats = self._cells[cell]
+        stats.discard(price, rating)
+        if not stats.prices:
+            del self._cells[cell]
+
+    def _upsert(self, product: Dict[str, Any]):
+        id_serial = product["id_serial"]
+        self._remove(id_serial)
+        cell = (_value(product.get("category")), _value(product.get("kab_kota")))
+        price = float(product.get("price") or 0)
+        rating = float(product.get("rating") or 0)
+        self._cells.setdefault(cell, _CellStats()).add(price, rating)
+        self._products[id_serial] = (cell, price, rating)
+
+    def build(self, products: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._cells, self._products = {}, {}
+            self._cache.clear()
+            for product in products:
+                self._upsert(product)
+            self.ready = True
+
+    def upsert(self, product: Dict[str, Any]):
+        with self._lock:
+            self._upsert(product)
+            self._cache.clear()
+
+    def remove(self, id_serial: str):
+        with self._lock:
+            self._remove(id_serial)
+            self._cache.clear()
+
+    def facets(self, categories: Optional[List[str]] = None, kab_kotas: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Facet category dan kab_kota serta ringkasan total untuk filter yang diberikan.
+        Beberapa nilai dalam satu filter digabung dengan OR, antar filter dengan AND.
+        """
+        filters = (
+            frozenset(value for value in categories or () if value),
+            frozenset(value for value in kab_kotas or () if value),
+        )
+        with self._lock:
+            cached = self._cache.get(filters)
+            if cached is not None:
+                self._cache.move_to_end(filters)
+                return cached
+
+            total = _empty_summary()
+            buckets: Dict[str, Dict[str, Dict[str, Any]]] = {field: {} for field in FACET_FIELDS}
+            for cell, stats in self._cells.items():
+                passes = [not allowed or key in allowed for key, allowed in zip(cell, filters)]
+                if all(passes):
+                    _merge(total, stats)
+                for position, field in enumerate(FACET_FIELDS):
+                    # Facet sebuah field hanya dibatasi filter field lainnya
+                    if all(passed for other, passed in enumerate(passes) if other != position):
+                        key = cell[position]
+                        _merge(buckets[field].setdefault(key, _empty_summary()), stats)
+
+            result = {"total": total}
+            for field, selected in zip(FACET_FIELDS, filters):
+                ordered = sorted(buckets[field].items(), key=lambda item: (-item[1]["count"], item[0]))
+                result[field] = [
+                    {"value": key, "selected": key in selected, **summary}
+                    for key, summary in ordered
+                ]
+            self._cache[filters] = result
+            while len(self._cache) > FACET_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
+
+facet_index = FacetIndex()
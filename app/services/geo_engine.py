@@ -0,0 +1,359 @@
+import os
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.spatial_index import EARTH_RADIUS_KM
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Toleransi selisih angka engine terhadap hasil stored function saat pemeriksaan kesetaraan
+GEO_DISTANCE_TOLERANCE_KM = float(os.getenv("GEO_DISTANCE_TOLERANCE_KM", "0.05"))
+GEO_RELATIVE_TOLERANCE = float(os.getenv("GEO_RELATIVE_TOLERANCE", "0.01"))
+# Jarak di bawah ini tidak dipakai untuk menurunkan rasio waktu tempuh per km
+_MIN_RATIO_DISTANCE_KM = 0.5
+# Hasil pemeriksaan kesetaraan kedaluwarsa setelah selang ini, sehingga query berikutnya untuk
+# key tersebut kembali dilayani stored function dan dibandingkan ulang
+GEO_PARITY_RESAMPLE_SECONDS = float(os.getenv("GEO_PARITY_RESAMPLE_SECONDS", "300"))
+# Key berisi nilai filter dari request, jadi jumlahnya dibatasi; key terlama dibuang lebih dulu
+GEO_PARITY_MAX_KEYS = int(os.getenv("GEO_PARITY_MAX_KEYS", "4096"))
+_MAX_DECIMAL_DIGITS = 6
+
+def haversine_km_vectorized(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Jarak (km) dari satu titik ke semua titik dalam satu operasi vektor
+    """
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lons - lon)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+class _Snapshot:
+    """
+    Array kontigu yang tidak diubah setelah dibuat; perubahan katalog membuat snapshot baru
+    """
+
+    def __init__(self, records: Dict[str, Dict[str, Any]]):
+        rows = list(records.values())
+        self.ids = np.array([row["id_serial"] for row in rows], dtype=object)
+        self.lat = np.ascontiguousarray([row["latitude"] for row in rows], dtype=np.float64)
+        self.lon = np.ascontiguousarray([row["longitude"] for row in rows], dtype=np.float64)
+        self.rating = np.ascontiguousarray([row["rating"] for row in rows], dtype=np.float64)
+        self.price = np.ascontiguousarray([row["price"] for row in rows], dtype=np.float64)
+        self.stock = np.ascontiguousarray([row["stock"] for row in rows], dtype=np.float64)
+        # Kategori dan kab_kota disimpan sebagai kode integer agar filter cukup satu perbandingan vektor
+        self.category_codes: Dict[str, int] = {}
+        self.kab_kota_codes: Dict[str, int] = {}
+        self.category = np.array(
+            [self.category_codes.setdefault(row["category"], len(self.category_codes)) for row in rows], dtype=np.int32
+        )
+        self.kab_kota = np.array(
+            [self.kab_kota_codes.setdefault(row["kab_kota"], len(self.kab_kota_codes)) for row in rows], dtype=np.int32
+        )
+
+class TopRatedCandidates(NamedTuple):
+    """
+    Kandidat top_rated yang tidak bergantung lokasi, beserta koordinat dan ratingnya
+    """
+    ids: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    rating: np.ndarray
+
+class GeoEngine:
+    """
+    Mesin jarak tervektorisasi untuk endpoint berbasis lokasi.
+
+    Koordinat dan atribut produk disimpan sebagai array NumPy kontigu, sehingga jarak ke
+    semua kandidat dihitung sekaligus dan top-k dipilih dengan argpartition. Field jarak dan
+    waktu tempuh di respons mengikuti stored function lewat GeoParity.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._snapshot: Optional[_Snapshot] = None
+        self.ready = False
+
+    @staticmethod
+    def _record(product: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id_serial": product["id_serial"],
+            "latitude": float(product["latitude"]),
+            "longitude": float(product["longitude"]),
+            "rating": float(product["rating"]),
+            "price": float(product["price"]),
+            "stock": float(product["stock"]),
+            "category": product["category"],
+            "kab_kota": product["kab_kota"],
+        }
+
+    def build(self, products: Iterable[Dict[str, Any]]):
+        records = {product["id_serial"]: self._record(product) for product in products}
+        snapshot = _Snapshot(records)
+        with self._lock:
+            self._records, self._snapshot = records, snapshot
+            self.ready = True
+
+    def upsert(self, product: Dict[str, Any]):
+        with self._lock:
+            self._records[product["id_serial"]] = self._record(product)
+            self._snapshot = None
+
+    def remove(self, id_serial: str):
+        with self._lock:
+            if self._records.pop(id_serial, None) is not None:
+                self._snapshot = None
+
+    def _current(self) -> _Snapshot:
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = _Snapshot(self._records)
+            return self._snapshot
+
+    def _candidates(self, snapshot: _Snapshot, category: Optional[str], kab_kota: Optional[str]) -> np.ndarray:
+        mask = np.ones(len(snapshot.ids), dtype=bool)
+        if category:
+            mask &= snapshot.category == snapshot.category_codes.get(category, -1)
+        if kab_kota:
+            mask &= snapshot.kab_kota == snapshot.kab_kota_codes.get(kab_kota, -1)
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def _results(snapshot: _Snapshot, positions: np.ndarray, distances: np.ndarray) -> List[Tuple[str, float]]:
+        return [(snapshot.ids[position], float(distance)) for position, distance in zip(positions, distances)]
+
+    def search(
+        self,
+        lat: float,
+        lon: float,
+        category: Optional[str] = None,
+        kab_kota: Optional[str] = None,
+        sortby: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Produk yang cocok dengan filter (nilai persis, seperti stored function) sebagai (id_serial, jarak_km).
+        sortby: 'distance' (default), 'price', 'rating' atau 'availability'; seri diurutkan jarak.
+        """
+        snapshot = self._current()
+        positions = self._candidates(snapshot, category, kab_kota)
+        distances = haversine_km_vectorized(lat, lon, snapshot.lat[positions], snapshot.lon[positions])
+
+        # np.lexsort memakai kunci terakhir sebagai kunci utama
+        if sortby == "price":
+            order = np.lexsort((distances, snapshot.price[positions]))
+        elif sortby == "rating":
+            order = np.lexsort((distances, -snapshot.rating[positions]))
+        elif sortby == "availability":
+            order = np.lexsort((distances, -snapshot.stock[positions]))
+        else:
+            order = np.argsort(distances, kind="stable")
+        return self._results(snapshot, positions[order], distances[order])
+
+    def top_rated_candidates(self, category: Optional[str], limit: int) -> TopRatedCandidates:
+        """
+        Produk yang bisa masuk top_rated dari lokasi mana pun: semua produk dengan rating >=
+        rating ke-`limit`, termasuk yang seri. Jarak hanya menentukan urutan di antara mereka.
+        """
+        snapshot = self._current()
+        positions = self._candidates(snapshot, category, None)
+        if limit <= 0:
+            positions = positions[:0]
+
+        ratings = snapshot.rating[positions]
+        if 0 < limit < len(positions):
+            threshold = ratings[np.argpartition(-ratings, limit - 1)[limit - 1]]
+            keep = np.flatnonzero(ratings >= threshold)
+            positions, ratings = positions[keep], ratings[keep]
+        return TopRatedCandidates(snapshot.ids[positions], snapshot.lat[positions], snapshot.lon[positions], ratings)
+
+    @staticmethod
+    def rank_top_rated(candidates: TopRatedCandidates, lat: float, lon: float, limit: int) -> List[Tuple[str, float]]:
+        """
+        `limit` kandidat dengan rating tertinggi (seri diurutkan jarak terdekat) sebagai (id_serial, jarak_km)
+        """
+        if limit <= 0 or len(candidates.ids) == 0:
+            return []
+        distances = haversine_km_vectorized(lat, lon, candidates.lat, candidates.lon)
+        order = np.lexsort((distances, -candidates.rating))[:limit]
+        return [(candidates.ids[position], float(distances[position])) for position in order]
+
+    def top_rated(self, lat: float, lon: float, category: Optional[str], limit: int) -> List[Tuple[str, float]]:
+        """
+        `limit` produk dengan rating tertinggi (seri diurutkan jarak terdekat)
+        """
+        return self.rank_top_rated(self.top_rated_candidates(category, limit), lat, lon, limit)
+
+geo_engine = GeoEngine()
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def _decimal_digits(value: Any) -> Optional[int]:
+    """
+    Jumlah angka di belakang koma pada nilai dari stored function, atau None bila tidak dibulatkan
+    """
+    if isinstance(value, Decimal):
+        digits = max(-value.as_tuple().exponent, 0)
+    elif isinstance(value, float):
+        digits = len(repr(value).partition(".")[2]) if "e" not in repr(value) else _MAX_DECIMAL_DIGITS + 1
+    else:
+        digits = 0
+    return digits if digits <= _MAX_DECIMAL_DIGITS else None
+
+def _close(expected: float, actual: float, absolute: float) -> bool:
+    return abs(expected - actual) <= max(absolute, GEO_RELATIVE_TOLERANCE * abs(expected))
+
+class _Figure(NamedTuple):
+    column: str
+    # Nilai kolom per km jarak (1 untuk kolom jarak itu sendiri)
+    per_km: float
+    digits: Optional[int]
+    decimal: bool
+
+    def value(self, distance_km: float):
+        value = distance_km * self.per_km
+        if self.digits is not None:
+            value = round(value, self.digits)
+        if self.decimal:
+            return Decimal(str(value))
+        return int(value) if self.digits == 0 else value
+
+class DistanceFields(NamedTuple):
+    """
+    Bentuk baris stored function yang terbukti bisa direproduksi engine:
+    urutan kolom, dan kolom angka yang sebanding dengan jarak (jarak, waktu tempuh)
+    """
+    columns: Tuple[str, ...]
+    figures: Tuple[_Figure, ...]
+
+    def row(self, product: Dict[str, Any], distance_km: float) -> Dict[str, Any]:
+        computed = {figure.column: figure.value(distance_km) for figure in self.figures}
+        return {column: computed[column] if column in computed else product[column] for column in self.columns}
+
+def _learn_figure(column: str, stored_rows: List[Dict[str, Any]], distances: List[float]) -> Optional[_Figure]:
+    """
+    Kolom angka yang nilainya sebanding dengan jarak di semua baris, beserta rasio per km
+    """
+    values = [row[column] for row in stored_rows]
+    if not all(_is_number(value) for value in values):
+        return None
+    ratios = [float(value) / distance for value, distance in zip(values, distances) if distance >= _MIN_RATIO_DISTANCE_KM]
+    per_km = float(np.median(ratios)) if ratios else 1.0
+    digits = [_decimal_digits(value) for value in values]
+    figure = _Figure(column, per_km, None if None in digits else max(digits), isinstance(values[0], Decimal))
+    # Toleransi absolut mengikuti satuan kolom (misalnya menit per km) dan pembulatannya
+    absolute = GEO_DISTANCE_TOLERANCE_KM * max(abs(per_km), 1e-9) + (0.5 * 10 ** -figure.digits if figure.digits is not None else 0)
+    if all(_close(float(value), distance * per_km, absolute) for value, distance in zip(values, distances)):
+        return figure
+    return None
+
+class GeoParity:
+    """
+    Engine hanya menggantikan stored function untuk sebuah query setelah terbukti
+    menghasilkan baris yang sama.
+
+    Hasil stored function untuk setiap key dibandingkan dengan hasil engine: urutan id harus
+    sama, dan setiap kolom di luar kolom produk harus sebanding dengan jarak engine dalam
+    toleransi (misalnya jarak dalam km dan waktu tempuh dalam menit). Bila cocok, nama,
+    urutan, rasio dan pembulatan kolom tersebut disimpan dan dipakai untuk membentuk respons
+    dari engine. Bila tidak cocok, key itu dilayani stored function.
+
+    Hasil pemeriksaan berlaku selama `resample_seconds`; setelah itu key kembali ke stored
+    function sampai sampel baru dibandingkan, sehingga perubahan stored function di database
+    tidak tertutup oleh hasil pemeriksaan lama.
+    """
+
+    def __init__(
+        self,
+        resample_seconds: float = GEO_PARITY_RESAMPLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        max_keys: int = GEO_PARITY_MAX_KEYS
+    ):
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+        self._results: Dict[Hashable, Tuple[Optional[DistanceFields], float]] = {}
+        self._counters = {"verified": 0, "mismatched": 0, "resampled": 0}
+        self.resample_seconds = resample_seconds
+        self._clock = clock
+
+    def _current(self, key: Hashable) -> Optional[Tuple[Optional[DistanceFields], float]]:
+        result = self._results.get(key)
+        if result is None or self._clock() - result[1] >= self.resample_seconds:
+            return None
+        return result
+
+    def fields(self, key: Hashable) -> Optional[DistanceFields]:
+        with self._lock:
+            result = self._current(key)
+            return result[0] if result is not None else None
+
+    def pending(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._current(key) is None
+
+    def check(
+        self,
+        key: Hashable,
+        stored_rows: List[Dict[str, Any]],
+        matches: List[Tuple[str, float]],
+        product_columns: Iterable[str]
+    ) -> Optional[DistanceFields]:
+        """
+        Membandingkan baris stored function dengan hasil engine (id_serial, jarak_km) untuk key
+        """
+        if not any(distance >= _MIN_RATIO_DISTANCE_KM for _, distance in matches):
+            # Hasil kosong atau terlalu dekat tidak cukup untuk membandingkan angka; tunggu query berikutnya
+            return None
+        fields = self._compare(stored_rows, matches, set(product_columns))
+        with self._lock:
+            if self._results.pop(key, None) is not None:
+                self._counters["resampled"] += 1
+            self._results[key] = (fields, self._clock())
+            while len(self._results) > self.max_keys:
+                del self._results[next(iter(self._results))]
+            self._counters["mismatched" if fields is None else "verified"] += 1
+        if fields is None:
+            logger.warning(f"Hasil engine jarak berbeda dengan stored function untuk {key}, tetap memakai stored function")
+        else:
+            logger.info(f"Hasil engine jarak sama dengan stored function untuk {key}")
+        return fields
+
+    @staticmethod
+    def _compare(stored_rows: List[Dict[str, Any]], matches: List[Tuple[str, float]], product_columns: set) -> Optional[DistanceFields]:
+        if [row["id_serial"] for row in stored_rows] != [id_serial for id_serial, _ in matches]:
+            return None
+        columns = tuple(stored_rows[0])
+        if any(tuple(row) != columns for row in stored_rows):
+            return None
+        distances = [distance for _, distance in matches]
+        figures = []
+        for column in columns:
+            if column in product_columns:
+                continue
+            figure = _learn_figure(column, stored_rows, distances)
+            if figure is None:
+                return None
+            figures.append(figure)
+        return DistanceFields(columns, tuple(figures))
+
+    def reset(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "keys": {repr(key): fields is not None for key, (fields, _) in self._results.items()},
+            }
+
+geo_parity = GeoParity()
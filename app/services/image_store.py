@@ -0,0 +1,230 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+from typing import Any, BinaryIO, Dict, Iterable, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.static_files import static_files
+from app.services.image_variants import ASSET_ROOT, variant_paths, variant_index
+from app.services.job_queue import job_queue
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Blob disimpan berdasarkan hash isi: app/asset/sha256/ab/cd/abcd...<ext>
+BLOB_ROOT = os.path.join(ASSET_ROOT, "sha256")
+CHUNK_SIZE = 1024 * 1024
+
+# Blob yang baru ditulis atau dipakai ulang tidak dihapus dalam jendela ini, karena upload
+# lain yang sedang berjalan mungkin akan mereferensikannya sebelum transaksinya commit.
+# Blob seperti ini dibersihkan belakangan oleh garbage collector aset.
+BLOB_GRACE_SECONDS = float(os.getenv("IMAGE_BLOB_GRACE_SECONDS", "300"))
+
+# Batas ukuran upload gambar
+MAX_IMAGE_FILE_BYTES = int(os.getenv("MAX_IMAGE_FILE_BYTES", str(10 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(50 * 1024 * 1024)))
+
+# Tabel yang menyimpan referensi ke file gambar
+IMAGE_TABLES = ("detail_image", "display_image")
+
+def blob_path(digest: str, extension: str) -> str:
+    return f"{BLOB_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+def is_blob_path(filename_path: str) -> bool:
+    return filename_path.replace('\\', '/').startswith(BLOB_ROOT + '/')
+
+class ImageTooLargeError(Exception):
+    """
+    Ukuran file gambar atau total upload dalam satu request melebihi batas
+    """
+
+class UploadBudget:
+    """
+    Sisa kuota byte upload untuk satu request, dibagi oleh semua file yang ditulis bersamaan
+    """
+
+    def __init__(self, max_file_bytes: int = MAX_IMAGE_FILE_BYTES, max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.used_bytes = 0
+
+    def consume(self, filename: str, file_bytes: int, chunk_bytes: int):
+        if file_bytes > self.max_file_bytes:
+            raise ImageTooLargeError(
+                f"Gambar {filename} melebihi batas {self.max_file_bytes / (1024 * 1024):g} MB per file"
+            )
+        self.used_bytes += chunk_bytes
+        if self.used_bytes > self.max_request_bytes:
+            raise ImageTooLargeError(
+                f"Total gambar melebihi batas {self.max_request_bytes / (1024 * 1024):g} MB per request"
+            )
+
+def _new_temp_path() -> str:
+    os.makedirs(BLOB_ROOT, exist_ok=True)
+    return os.path.join(BLOB_ROOT, f".upload_{uuid.uuid4().hex}.tmp")
+
+def _discard_temp(temp_path: str):
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+def _finalize_blob(temp_path: str, digest: str, extension: str) -> Tuple[str, bool]:
+    """
+    Memindahkan file sementara ke path blob secara atomik, atau membuangnya bila isi sudah ada
+    """
+    path = blob_path(digest, extension)
+    if os.path.exists(path):
+        # Perbarui mtime agar blob yang dipakai ulang ikut terlindungi grace period
+        os.utime(path)
+        _discard_temp(temp_path)
+        return path, False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temp_path, path)
+    return path, True
+
+def store_blob(source: BinaryIO, extension: str) -> Tuple[str, bool]:
+    """
+    Menyalin isi file ke storage berbasis hash sambil menghitung sha256 secara streaming.
+    Mengembalikan (path, created); created False berarti isi yang sama sudah tersimpan.
+    """
+    temp_path = _new_temp_path()
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, "wb") as buffer:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+        return _finalize_blob(temp_path, digest.hexdigest(), extension)
+    except Exception:
+        _discard_temp(temp_path)
+        raise
+
+def _write_chunk(buffer: BinaryIO, digest: Any, chunk: bytes):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+async def store_upload_async(upload, extension: str, budget: UploadBudget) -> Tuple[str, bool]:
+    """
+    Versi non-blocking store_blob untuk UploadFile: setiap chunk dibaca dengan await dan
+    ditulis di threadpool, sehingga event loop tetap melayani request lain. Batas ukuran
+    diperiksa per chunk, jadi upload yang terlalu besar dihentikan sebelum selesai ditulis.
+    """
+    temp_path = await run_in_threadpool(_new_temp_path)
+    digest = hashlib.sha256()
+    file_bytes = 0
+    try:
+        buffer = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_bytes += len(chunk)
+                budget.consume(upload.filename, file_bytes, len(chunk))
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        return await run_in_threadpool(_finalize_blob, temp_path, digest.hexdigest(), extension)
+    except BaseException:
+        await run_in_threadpool(_discard_temp, temp_path)
+        raise
+
+def remove_files(file_paths: Iterable[str]):
+    """
+    Menghapus file gambar beserta variannya tanpa memeriksa referensi.
+    Path kosong atau None dilewati.
+    """
+    file_paths = [file_path for file_path in dict.fromkeys(file_paths) if file_path]
+    for path in [path for file_path in file_paths for path in [file_path, *variant_paths(file_path)]]:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+                logger.info(f"File {path} berhasil dihapus")
+            static_files.forget(path)
+        except Exception as e:
+            logger.error(f"Gagal menghapus file {path}: {str(e)}")
+    for file_path in file_paths:
+        variant_index.forget(file_path)
+
+def count_references(db: Session, file_paths: Iterable[str]) -> Dict[str, int]:
+    """
+    Jumlah baris detail_image dan display_image yang mereferensikan setiap path
+    """
+    paths = list(dict.fromkeys(file_paths))
+    if not paths:
+        return {}
+
+    counts = " + ".join(
+        f"(SELECT count(*) FROM {table} WHERE {table}.filename_path = paths.filename_path)"
+        for table in IMAGE_TABLES
+    )
+    query = text(f"""
+        SELECT paths.filename_path, {counts} AS reference_count
+        FROM unnest(CAST(:paths AS text[])) AS paths(filename_path)
+    """)
+    rows = db.execute(query, {"paths": paths}).fetchall()
+    return {row.filename_path: int(row.reference_count) for row in rows}
+
+def release_images(db: Session, file_paths: Iterable[str]) -> List[str]:
+    """
+    Menghapus file gambar (beserta variannya) yang sudah tidak direferensikan produk mana pun.
+    Blob yang masih dipakai produk lain tetap disimpan.
+    """
+    references = count_references(db, file_paths)
+    now = time.time()
+    removed = []
+    for path, count in references.items():
+        if count > 0:
+            logger.info(f"File {path} masih direferensikan {count} gambar, tidak dihapus")
+            continue
+        try:
+            if is_blob_path(path) and os.path.exists(path) and now - os.path.getmtime(path) < BLOB_GRACE_SECONDS:
+                logger.info(f"File {path} baru dipakai, penghapusan ditunda ke garbage collector")
+                continue
+        except OSError:
+            pass
+        remove_files([path])
+        removed.append(path)
+    return removed
+
+def run_release_job(payload: Dict[str, List[str]]):
+    """
+    Handler job queue untuk release_images dengan session database sendiri
+    """
+    # Journal lama mungkin berisi null dari query penghapusan sebelumnya
+    paths = [path for path in payload["paths"] if path]
+    if not paths:
+        return
+    db = SessionLocal()
+    try:
+        release_images(db, paths)
+    finally:
+        db.close()
+
+def schedule_release(file_paths: Iterable[str]):
+    """
+    Mencatat penghapusan gambar ke job queue; dipanggil setelah transaksi commit
+    """
+    paths = [path for path in dict.fromkeys(file_paths) if path]
+    if not paths:
+        return
+    try:
+        job_queue.enqueue("release_images", {"paths": paths})
+    except Exception as e:
+        # Transaksi sudah commit; file yang tertinggal akan dibersihkan garbage collector
+        logger.error(f"Gagal mencatat penghapusan gambar ke job queue: {str(e)}")
+
+job_queue.register("release_images", run_release_job)
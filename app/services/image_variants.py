@@ -0,0 +1,253 @@
+import os
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.services.job_queue import job_queue
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ASSET_ROOT = "app/asset"
+VARIANT_ROOT = os.path.join(ASSET_ROOT, "variants")
+
+# Nama ukuran -> lebar maksimum (piksel). Gambar yang lebih kecil tidak diperbesar.
+VARIANT_SIZES = {
+    "thumb": 320,
+    "medium": 800,
+    "large": 1600,
+}
+
+# Format -> (format Pillow, ekstensi file, opsi encoder)
+VARIANT_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+}
+
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+# Gambar yang variannya belum lengkap diperiksa ulang ke disk setelah TTL ini, karena varian
+# bisa dibuat oleh proses server lain
+VARIANT_INDEX_TTL = float(os.getenv("VARIANT_INDEX_TTL", "30"))
+VARIANT_INDEX_MAX_SIZE = int(os.getenv("VARIANT_INDEX_MAX_SIZE", "50000"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def _relative_asset_path(filename_path: str) -> str:
+    return filename_path.replace('\\', '/').replace(ASSET_ROOT + '/', '', 1)
+
+def variant_path(filename_path: str, size_name: str, format_name: str) -> str:
+    """
+    Path varian ditentukan sepenuhnya oleh path gambar asli, ukuran dan format,
+    sehingga tidak perlu disimpan terpisah di database
+    """
+    stem = os.path.splitext(_relative_asset_path(filename_path))[0]
+    extension = VARIANT_FORMATS[format_name][1]
+    return f"{VARIANT_ROOT}/{stem}_{size_name}{extension}"
+
+def variant_paths(filename_path: str) -> List[str]:
+    return [
+        variant_path(filename_path, size_name, format_name)
+        for size_name in VARIANT_SIZES
+        for format_name in VARIANT_FORMATS
+    ]
+
+_VariantKey = Tuple[str, str]
+_ALL_VARIANTS: FrozenSet[_VariantKey] = frozenset(
+    (size_name, format_name) for size_name in VARIANT_SIZES for format_name in VARIANT_FORMATS
+)
+
+class VariantIndex:
+    """
+    Varian yang sudah ada di disk untuk setiap gambar asli, agar respons hanya memuat URL
+    varian yang benar-benar bisa diunduh tanpa stat ke disk di setiap request.
+
+    Gambar dengan varian lengkap disimpan sampai dilupakan (varian tidak pernah berubah);
+    yang belum lengkap diperiksa ulang setelah VARIANT_INDEX_TTL. Job pembuat varian
+    mencatat hasilnya langsung lewat mark_generated.
+    """
+
+    def __init__(self, ttl_seconds: float = VARIANT_INDEX_TTL, max_entries: int = VARIANT_INDEX_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, FrozenSet[_VariantKey]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _scan(self, filename_path: str) -> FrozenSet[_VariantKey]:
+        return frozenset(
+            key for key in _ALL_VARIANTS if os.path.exists(variant_path(filename_path, *key))
+        )
+
+    def _store(self, filename_path: str, available: FrozenSet[_VariantKey]):
+        expires_at = float("inf") if available == _ALL_VARIANTS else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[filename_path] = (expires_at, available)
+            self._entries.move_to_end(filename_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def available(self, filename_path: str) -> FrozenSet[_VariantKey]:
+        """
+        (ukuran, format) varian yang ada di disk untuk gambar asli
+        """
+        with self._lock:
+            entry = self._entries.get(filename_path)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(filename_path)
+                return entry[1]
+        available = self._scan(filename_path)
+        self._store(filename_path, available)
+        return available
+
+    def mark_generated(self, filename_path: str):
+        self._store(filename_path, self._scan(filename_path))
+
+    def forget(self, filename_path: str):
+        with self._lock:
+            self._entries.pop(filename_path, None)
+
+variant_index = VariantIndex()
+
+def variant_urls(base_url: str, filename_path: str) -> Dict[str, Dict[str, str]]:
+    """
+    URL varian yang sudah dibuat per ukuran dan format, contoh: {"thumb": {"jpeg": ..., "webp": ...}}.
+    Selama varian belum dibuat, hasilnya kosong dan klien memakai file_url.
+    """
+    available = variant_index.available(filename_path)
+    urls: Dict[str, Dict[str, str]] = {}
+    for size_name in VARIANT_SIZES:
+        for format_name in VARIANT_FORMATS:
+            if (size_name, format_name) in available:
+                path = variant_path(filename_path, size_name, format_name)
+                urls.setdefault(size_name, {})[format_name] = f"{base_url}static/{_relative_asset_path(path)}"
+    return urls
+
+def generate_variants(filename_path: str) -> List[str]:
+    """
+    Membuat semua varian ukuran dan format untuk satu gambar. Varian yang sudah ada dilewati.
+    Dijalankan di process pool karena decode/encode gambar memakan CPU.
+    """
+    targets = {
+        (size_name, format_name): variant_path(filename_path, size_name, format_name)
+        for size_name in VARIANT_SIZES
+        for format_name in VARIANT_FORMATS
+    }
+    pending = {key: path for key, path in targets.items() if not os.path.exists(path)}
+    if not pending:
+        return []
+
+    created = []
+    with Image.open(filename_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        for size_name, width in VARIANT_SIZES.items():
+            resized = None
+            for format_name, (pil_format, _, options) in VARIANT_FORMATS.items():
+                path = pending.get((size_name, format_name))
+                if path is None:
+                    continue
+                if resized is None:
+                    resized = image.copy()
+                    resized.thumbnail((width, width * 4), Image.LANCZOS)
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                resized.save(temp_path, pil_format, **options)
+                os.replace(temp_path, path)
+                created.append(path)
+    return created
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: proses worker tidak mewarisi thread dan event loop dari proses server
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_VARIANT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def run_variant_job(payload: Dict[str, List[str]]):
+    """
+    Handler job queue: membuat varian di process pool dan menunggu hasilnya,
+    sehingga kegagalan diulang oleh job queue
+    """
+    global _executor
+    try:
+        futures = [_get_executor().submit(generate_variants, path) for path in payload["paths"]]
+    except BrokenProcessPool:
+        # Worker mati mendadak; buat pool baru, job akan diulang
+        _executor = None
+        raise
+    for path, future in zip(payload["paths"], futures):
+        created = future.result()
+        variant_index.mark_generated(path)
+        if created:
+            logger.info(f"{len(created)} varian dibuat untuk {path}")
+
+def schedule_variants(filename_paths: Iterable[str]):
+    """
+    Mencatat pembuatan varian ke job queue tanpa menunggu hasilnya
+    """
+    paths = list(filename_paths)
+    if paths:
+        job_queue.enqueue("generate_variants", {"paths": paths})
+
+job_queue.register("generate_variants", run_variant_job)
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def iter_source_images(folders: Iterable[str]) -> Iterable[str]:
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    yield os.path.join(root, name).replace('\\', '/')
+
+def backfill(folders: Iterable[str], workers: int = IMAGE_VARIANT_WORKERS) -> int:
+    """
+    Membuat varian untuk semua gambar yang sudah ada di folder asset
+    """
+    sources = list(iter_source_images(folders))
+    logger.info(f"Backfill varian untuk {len(sources)} gambar dengan {workers} worker")
+
+    created = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for result in executor.map(_safe_generate, sources, chunksize=8):
+            created += len(result)
+    logger.info(f"Backfill selesai: {created} varian dibuat")
+    return created
+
+def _safe_generate(filename_path: str) -> List[str]:
+    try:
+        return generate_variants(filename_path)
+    except Exception as e:
+        logger.error(f"Gagal membuat varian gambar {filename_path}: {str(e)}")
+        return []
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill varian ukuran dan WebP untuk gambar produk")
+    parser.add_argument(
+        "folders", nargs="*",
+        default=[os.path.join(ASSET_ROOT, "detail_image"), os.path.join(ASSET_ROOT, "display_image")],
+        help="Folder gambar asli (default: app/asset/detail_image dan app/asset/display_image)"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Jumlah proses worker")
+    args = parser.parse_args()
+    backfill(args.folders, args.workers)
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Direktori data lokal proses (journal job, dsb.); bukan direktori kerja agar tidak mengotori repo
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data"))
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(DATA_DIR, "job_queue.sqlite3"))
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+# Job berstatus running lebih lama dari ini dianggap milik worker yang mati dan diulang
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+JOB_POLL_SECONDS = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_run_at REAL NOT NULL,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, next_run_at);
+"""
+
+class JobQueue:
+    """
+    Antrian job di dalam proses dengan journal SQLite yang tahan restart.
+
+    Job dicatat ke journal sebelum dijalankan, lalu diambil worker thread dengan UPDATE
+    atomik sehingga beberapa worker (atau beberapa proses yang berbagi file journal) tidak
+    mengerjakan job yang sama. Job yang gagal diulang dengan backoff eksponensial sampai
+    JOB_MAX_ATTEMPTS, lalu ditandai failed. Job yang selesai dihapus dari journal.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, workers: int = JOB_QUEUE_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._counters = {"enqueued": 0, "succeeded": 0, "retried": 0, "failed": 0}
+        self._counters_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        with self._init_lock:
+            if not self._initialized:
+                connection.executescript(_SCHEMA)
+                self._initialized = True
+        return connection
+
+    def _count(self, name: str):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], None]):
+        """
+        Mendaftarkan fungsi yang menjalankan job dengan jenis `kind`
+        """
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay_seconds: float = 0) -> int:
+        """
+        Mencatat job ke journal dan membangunkan worker. Aman dipanggil dari thread mana pun.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO jobs (kind, payload, next_run_at, created_at) VALUES (?, ?, ?, ?)",
+            (kind, json.dumps(payload), now + delay_seconds, now)
+        )
+        self._count("enqueued")
+        with self._wakeup:
+            self._wakeup.notify()
+        return cursor.lastrowid
+
+    def enqueue_unique(self, kind: str, payload: Dict[str, Any]) -> Optional[int]:
+        """
+        Seperti enqueue, tetapi tidak menambah job bila job dengan jenis yang sama masih
+        pending atau running (misalnya job terjadwal dari beberapa proses server)
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            INSERT INTO jobs (kind, payload, next_run_at, created_at)
+            SELECT ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE kind = ? AND status IN ('pending', 'running'))
+            """,
+            (kind, json.dumps(payload), now, now, kind)
+        )
+        if cursor.rowcount == 0:
+            return None
+        self._count("enqueued")
+        with self._wakeup:
+            self._wakeup.notify()
+        return cursor.lastrowid
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        return self._connection().execute(
+            """
+            UPDATE jobs SET status = 'running', locked_at = ?, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (status = 'pending' AND next_run_at <= ?)
+                   OR (status = 'running' AND locked_at <= ?)
+                ORDER BY next_run_at, id LIMIT 1
+            )
+            RETURNING id, kind, payload, attempts
+            """,
+            (now, now, now - JOB_STALE_SECONDS)
+        ).fetchone()
+
+    def _finish(self, job: sqlite3.Row, error: Optional[Exception]):
+        connection = self._connection()
+        if error is None:
+            connection.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+            self._count("succeeded")
+        elif job["attempts"] >= JOB_MAX_ATTEMPTS:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', locked_at = NULL, last_error = ? WHERE id = ?",
+                (str(error), job["id"])
+            )
+            self._count("failed")
+            logger.error(f"Job {job['kind']} #{job['id']} gagal permanen setelah {job['attempts']} percobaan: {str(error)}")
+        else:
+            delay = JOB_RETRY_BASE_SECONDS * (2 ** (job["attempts"] - 1))
+            connection.execute(
+                "UPDATE jobs SET status = 'pending', locked_at = NULL, last_error = ?, next_run_at = ? WHERE id = ?",
+                (str(error), time.time() + delay, job["id"])
+            )
+            self._count("retried")
+            logger.warning(f"Job {job['kind']} #{job['id']} gagal, diulang dalam {delay:g} detik: {str(error)}")
+
+    def run_pending(self) -> int:
+        """
+        Menjalankan semua job yang sudah jatuh tempo di thread pemanggil
+        """
+        processed = 0
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                return processed
+            handler = self._handlers.get(job["kind"])
+            error = None
+            try:
+                if handler is None:
+                    raise LookupError(f"Tidak ada handler untuk job {job['kind']}")
+                handler(json.loads(job["payload"]))
+            except Exception as e:
+                error = e
+            self._finish(job, error)
+            processed += 1
+        return processed
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_pending()
+            except Exception as e:
+                logger.error(f"Worker job queue error: {str(e)}")
+                processed = 0
+            if processed == 0:
+                with self._wakeup:
+                    self._wakeup.wait(JOB_POLL_SECONDS)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-queue-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job queue berjalan dengan {self.workers} worker ({self.path})")
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connection().execute("SELECT status, count(*) AS total FROM jobs GROUP BY status").fetchall()
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            "workers": len(self._threads),
+            "journal": self.path,
+            "jobs": {row["status"]: row["total"] for row in rows},
+            **counters,
+        }
+
+job_queue = JobQueue()
@@ -0,0 +1,95 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Urutan keyset yang didukung: nama urutan -> kolom kunci
+KEYSET_ORDERS = {
+    "id": ("id_serial",),
+    "rating": ("rating", "id_serial"),
+}
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+def encode_cursor(order: str, row: Dict[str, Any]) -> str:
+    """
+    Membuat cursor dari nilai kunci baris terakhir pada halaman
+    """
+    keys = [row[column] for column in KEYSET_ORDERS[order]]
+    payload = json.dumps({"o": order, "k": keys}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(order: str, cursor: str) -> List[Any]:
+    """
+    Membaca cursor dan mengembalikan nilai kunci keyset
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = payload["k"]
+    except Exception:
+        raise ValueError("Cursor tidak valid")
+
+    if payload.get("o") != order or len(keys) != len(KEYSET_ORDERS[order]):
+        raise ValueError(f"Cursor tidak sesuai dengan urutan '{order}'")
+    return keys
+
+def build_keyset_query(source_sql: str, order: str, limit: int, cursor: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Membungkus query sumber (stored function) dengan filter keyset, ORDER BY dan LIMIT.
+    Mengambil limit + 1 baris untuk mengetahui apakah masih ada halaman berikutnya.
+    """
+    if order not in KEYSET_ORDERS:
+        raise ValueError(f"Urutan tidak valid: {order}. Gunakan salah satu dari: {', '.join(KEYSET_ORDERS)}")
+
+    params: Dict[str, Any] = {"page_limit": limit + 1}
+    where = ""
+    if cursor:
+        keys = decode_cursor(order, cursor)
+        if order == "rating":
+            params["after_rating"], params["after_id"] = float(keys[0]), str(keys[1])
+            where = ("WHERE page.rating < :after_rating "
+                     "OR (page.rating = :after_rating AND page.id_serial COLLATE \"C\" > :after_id)")
+        else:
+            params["after_id"] = str(keys[0])
+            where = "WHERE page.id_serial COLLATE \"C\" > :after_id"
+
+    # Collation "C" membuat urutan id_serial sama dengan paginate_in_memory (urutan codepoint)
+    id_order = 'page.id_serial COLLATE "C"'
+    order_by = f"page.rating DESC, {id_order}" if order == "rating" else id_order
+    query = f"SELECT * FROM ({source_sql}) AS page {where} ORDER BY {order_by} LIMIT :page_limit"
+    return query, params
+
+def split_page(rows: List[Dict[str, Any]], order: str, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Memotong hasil menjadi satu halaman dan membuat next_cursor bila masih ada data
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(order, page[-1])
+
+def paginate_in_memory(
+    rows: List[Dict[str, Any]],
+    order: str,
+    limit: int,
+    cursor: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Keyset pagination yang sama dengan build_keyset_query, untuk data yang sudah ada di memori
+    """
+    if order not in KEYSET_ORDERS:
+        raise ValueError(f"Urutan tidak valid: {order}. Gunakan salah satu dari: {', '.join(KEYSET_ORDERS)}")
+
+    if order == "rating":
+        sort_key = lambda row: (-float(row["rating"]), str(row["id_serial"]))
+    else:
+        sort_key = lambda row: (str(row["id_serial"]),)
+
+    if cursor:
+        keys = decode_cursor(order, cursor)
+        after = (-float(keys[0]), str(keys[1])) if order == "rating" else (str(keys[0]),)
+        rows = [row for row in rows if sort_key(row) > after]
+
+    page = sorted(rows, key=sort_key)[:limit + 1]
+    return split_page(page, order, limit)
@@ -0,0 +1,110 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+import bcrypt
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt melepas GIL, jadi satu thread per core cukup untuk memakai semua CPU tanpa oversubscribe
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Permintaan yang menunggu pool di atas batas ini langsung ditolak, agar lonjakan login
+# tidak menumpuk antrean yang waktu tunggunya melewati timeout klien
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 32)))
+# bcrypt hanya memakai 72 byte pertama; crypt() di PostgreSQL memotong dengan cara yang sama
+BCRYPT_MAX_BYTES = 72
+
+T = TypeVar("T")
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+def is_bcrypt_hash(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(("$2a$", "$2b$", "$2y$")) and len(value) == 60
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+def _verify(password: str, hashed: str, rounds: int) -> Tuple[bool, bool]:
+    if not bcrypt.checkpw(_secret(password), hashed.encode("ascii")):
+        return False, False
+    # Hash dengan cost lebih rendah dari konfigurasi perlu di-hash ulang setelah login berhasil
+    return True, int(hashed.split("$")[2]) < rounds
+
+class PasswordHasher:
+    """
+    Hash dan verifikasi password bcrypt di thread pool berukuran tetap.
+
+    Event loop hanya menunggu Future; jumlah hash yang berjalan bersamaan dibatasi jumlah
+    worker dan antreannya dibatasi PASSWORD_HASH_MAX_PENDING (PasswordHasherBusyError
+    bila penuh).
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, rounds: int = BCRYPT_ROUNDS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._counters = {"hashed": 0, "verified": 0, "rejected_busy": 0}
+        self._counters_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _count(self, name: str):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _submit(self, counter: str, function: Callable[..., T], *args) -> "Future[T]":
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected_busy")
+            raise PasswordHasherBusyError("Antrean hash password penuh")
+        try:
+            future = self._get_executor().submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._count(counter)
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit("hashed", _hash, password, self.rounds).result()
+
+    def verify(self, password: str, hashed: str) -> Tuple[bool, bool]:
+        """
+        (cocok, perlu_rehash) untuk password terhadap hash bcrypt
+        """
+        return self._submit("verified", _verify, password, hashed, self.rounds).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit("hashed", _hash, password, self.rounds))
+
+    async def verify_async(self, password: str, hashed: str) -> Tuple[bool, bool]:
+        return await asyncio.wrap_future(self._submit("verified", _verify, password, hashed, self.rounds))
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def stats(self):
+        with self._counters_lock:
+            return {"workers": self.workers, "rounds": self.rounds, "max_pending": self.max_pending, **self._counters}
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,389 @@
+import io
+import os
+import csv
+import json
+import time
+import zipfile
+import logging
+import argparse
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from app.schemas import ProductCreate
+from app.services.image_store import store_blob, UploadBudget, MAX_IMAGE_FILE_BYTES
+from app.services.image_variants import schedule_variants
+from app.services.products import parse_time, on_catalog_changed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAX_IMPORT_ROWS = int(os.getenv("MAX_IMPORT_ROWS", "10000"))
+# Batas total ukuran gambar (setelah diekstrak) yang disimpan dari satu zip import
+MAX_IMPORT_ARCHIVE_BYTES = int(os.getenv("MAX_IMPORT_ARCHIVE_BYTES", str(500 * 1024 * 1024)))
+IMAGE_SEPARATOR = "|"
+IMAGE_FIELDS = ("detail_images", "display_images")
+PRODUCT_FIELDS = list(ProductCreate.model_fields)
+
+# Kolom staging, urutannya sama dengan parameter insert_product
+STAGING_COLUMNS = PRODUCT_FIELDS + list(IMAGE_FIELDS)
+
+_product_list_adapter = TypeAdapter(List[ProductCreate])
+
+class ImportFormatError(ValueError):
+    """
+    File import tidak bisa dibaca (format salah, terlalu banyak baris, zip rusak)
+    """
+
+def parse_rows(content: bytes, file_format: str) -> List[Dict[str, Any]]:
+    """
+    Membaca baris CSV (dengan header) atau JSONL menjadi dictionary
+    """
+    try:
+        text_content = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("File import harus berformat UTF-8")
+
+    if file_format == "csv":
+        rows = list(csv.DictReader(io.StringIO(text_content)))
+    elif file_format == "jsonl":
+        rows = []
+        for line_number, line in enumerate(text_content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ImportFormatError(f"JSON tidak valid pada baris {line_number}: {str(e)}")
+    else:
+        raise ImportFormatError(f"Format tidak didukung: {file_format}. Gunakan 'csv' atau 'jsonl'")
+
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ImportFormatError(f"Jumlah baris ({len(rows)}) melebihi batas {MAX_IMPORT_ROWS}")
+    return rows
+
+def _image_names(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(name).strip() for name in value if str(name).strip()]
+    return [name.strip() for name in str(value).split(IMAGE_SEPARATOR) if name.strip()]
+
+def validate_rows(rows: List[Dict[str, Any]]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, List[str]]]:
+    """
+    Validasi semua baris dalam satu pemanggilan pydantic-core, lalu pemeriksaan
+    yang tidak dicakup ProductCreate (format jam dan nama gambar).
+    Mengembalikan (baris valid per indeks, daftar error per indeks).
+    """
+    errors: Dict[int, List[str]] = {}
+    try:
+        _product_list_adapter.validate_python(rows)
+    except ValidationError as e:
+        for error in e.errors():
+            index = error["loc"][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(index, []).append(f"{field}: {error['msg']}")
+
+    valid_indexes = [index for index in range(len(rows)) if index not in errors]
+    products = _product_list_adapter.validate_python([rows[index] for index in valid_indexes])
+
+    valid: Dict[int, Dict[str, Any]] = {}
+    for index, product in zip(valid_indexes, products):
+        row = product.model_dump()
+        row_errors = []
+        for field in ("open_time", "close_time"):
+            try:
+                row[field] = parse_time(row[field])
+            except ValueError as e:
+                row_errors.append(f"{field}: {str(e)}")
+        for field in IMAGE_FIELDS:
+            row[field] = _image_names(rows[index].get(field))
+            if not row[field]:
+                row_errors.append(f"{field}: minimal satu gambar")
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            valid[index] = row
+    return valid, errors
+
+class _BudgetedReader:
+    """
+    Membaca member zip sambil menghitung byte yang benar-benar diekstrak ke UploadBudget,
+    karena ukuran di header zip tidak bisa dipercaya
+    """
+
+    def __init__(self, source: BinaryIO, name: str, budget: UploadBudget):
+        self._source = source
+        self._name = name
+        self._budget = budget
+        self.read_bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._source.read(size)
+        self.read_bytes += len(chunk)
+        self._budget.consume(self._name, self.read_bytes, len(chunk))
+        return chunk
+
+def store_archive_images(
+    archive: Optional[BinaryIO],
+    rows: Dict[int, Dict[str, Any]],
+    errors: Dict[int, List[str]],
+    store: bool = True,
+    budget: Optional[UploadBudget] = None
+) -> List[str]:
+    """
+    Menyimpan gambar yang dirujuk baris valid dari zip ke storage berbasis hash, lalu
+    mengganti nama gambar di baris dengan {"filename", "filename_path"}. Setiap file di zip
+    hanya disimpan sekali walau dirujuk banyak baris. Dengan store False hanya memeriksa
+    bahwa semua gambar ada di zip dan ukurannya dalam batas.
+
+    Gambar yang ukurannya (menurut header zip) melebihi batas per file membuat barisnya
+    invalid; total di atas batas per zip menolak seluruh import. Byte yang benar-benar
+    diekstrak juga dihitung ke budget, sehingga ImageTooLargeError menghentikan zip yang
+    header-nya memalsukan ukuran.
+    """
+    budget = budget or UploadBudget(MAX_IMAGE_FILE_BYTES, MAX_IMPORT_ARCHIVE_BYTES)
+    stored: Dict[str, str] = {}
+    created_paths: List[str] = []
+    try:
+        zip_file = zipfile.ZipFile(archive) if archive is not None else None
+    except zipfile.BadZipFile:
+        raise ImportFormatError("File gambar harus berupa zip yang valid")
+
+    try:
+        members = {info.filename: info for info in zip_file.infolist()} if zip_file else {}
+        for index in list(rows):
+            row = rows[index]
+            names = [name for field in IMAGE_FIELDS for name in row[field]]
+            missing = [name for name in names if name not in members]
+            if missing:
+                errors[index] = [f"Gambar tidak ada di zip: {', '.join(missing)}"]
+                del rows[index]
+                continue
+            too_large = [name for name in names if members[name].file_size > budget.max_file_bytes]
+            if too_large:
+                errors[index] = [
+                    f"Gambar melebihi batas {budget.max_file_bytes / (1024 * 1024):g} MB per file: {', '.join(too_large)}"
+                ]
+                del rows[index]
+
+        referenced = {name for row in rows.values() for field in IMAGE_FIELDS for name in row[field]}
+        total_bytes = sum(members[name].file_size for name in referenced)
+        if total_bytes > budget.max_request_bytes:
+            raise ImportFormatError(
+                f"Total gambar di zip ({total_bytes / (1024 * 1024):.1f} MB) melebihi batas "
+                f"{budget.max_request_bytes / (1024 * 1024):g} MB"
+            )
+        if not store:
+            return created_paths
+
+        for row in rows.values():
+            for field in IMAGE_FIELDS:
+                images = []
+                for name in row[field]:
+                    if name not in stored:
+                        with zip_file.open(name) as source:
+                            stored[name], created = store_blob(_BudgetedReader(source, name, budget), os.path.splitext(name)[1])
+                        if created:
+                            created_paths.append(stored[name])
+                    images.append({"filename": os.path.basename(name), "filename_path": stored[name]})
+                row[field] = images
+    finally:
+        if zip_file:
+            zip_file.close()
+    return created_paths
+
+def _insert_product_argument_types(db: Session) -> List[str]:
+    """
+    Tipe parameter insert_product, agar kolom staging bisa di-CAST sesuai tanda tangan fungsi
+    """
+    row = db.execute(text("""
+        SELECT array(SELECT format_type(argument_type, NULL) FROM unnest(proargtypes) AS argument_type)
+        FROM pg_proc
+        WHERE proname = 'insert_product' AND pronargs = :argument_count
+        LIMIT 1
+    """), {"argument_count": len(STAGING_COLUMNS)}).scalar()
+    if not row:
+        raise RuntimeError("Fungsi insert_product tidak ditemukan")
+    return list(row)
+
+def _copy_to_staging(db: Session, rows: Dict[int, Dict[str, Any]]):
+    db.execute(text("""
+        CREATE TEMP TABLE import_staging (
+            row_number integer PRIMARY KEY,
+            user_id integer, category text, place_name text, rating double precision,
+            price numeric, stock integer, description text, open_time time, close_time time,
+            location text, latitude numeric, longitude numeric, kab_kota text,
+            detail_images text, display_images text
+        ) ON COMMIT DROP
+    """))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for index, row in rows.items():
+        writer.writerow([index + 1] + [
+            json.dumps(row[column], default=str) if column in IMAGE_FIELDS else row[column]
+            for column in STAGING_COLUMNS
+        ])
+    buffer.seek(0)
+
+    copy_from_stdin(db, f"COPY import_staging (row_number, {', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def copy_from_stdin(db: Session, statement: str, buffer: io.StringIO):
+    """
+    Menjalankan COPY ... FROM STDIN lewat koneksi DBAPI milik session, di dalam transaksi
+    yang sama. Mendukung psycopg2 (copy_expert) dan psycopg 3 (cursor.copy).
+    """
+    driver_connection = db.connection().connection.driver_connection
+    cursor = driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(statement, buffer)
+        elif hasattr(cursor, "copy"):
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            raise RuntimeError(f"Driver database {type(driver_connection).__module__} tidak mendukung COPY FROM STDIN")
+    finally:
+        cursor.close()
+
+def merge_staging(db: Session, rows: Dict[int, Dict[str, Any]], dry_run: bool) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    COPY baris valid ke tabel staging, mendeteksi konflik (category, place_name) dengan
+    produk yang ada dan sesama baris import, lalu memanggil insert_product untuk sisanya
+    dalam satu statement. Mengembalikan (id produk per indeks, konflik per indeks).
+    """
+    _copy_to_staging(db, rows)
+
+    conflicts: Dict[int, str] = {}
+    duplicate_rows = db.execute(text("""
+        SELECT row_number FROM (
+            SELECT row_number,
+                   row_number() OVER (PARTITION BY category, place_name ORDER BY row_number) AS occurrence
+            FROM import_staging
+        ) AS ranked
+        WHERE occurrence > 1
+    """)).scalars().all()
+    for row_number in duplicate_rows:
+        conflicts[row_number - 1] = "Duplikat (category, place_name) di dalam file import"
+
+    existing_rows = db.execute(text(
+        "SELECT row_number FROM import_staging WHERE check_product_exists(category, place_name)"
+    )).scalars().all()
+    for row_number in existing_rows:
+        conflicts[row_number - 1] = "Produk/Tempat sudah ada"
+
+    if dry_run or len(conflicts) == len(rows):
+        return {}, conflicts
+
+    argument_types = _insert_product_argument_types(db)
+    arguments = ", ".join(
+        f"CAST(staging.{column} AS {argument_type})"
+        for column, argument_type in zip(STAGING_COLUMNS, argument_types)
+    )
+    result = db.execute(text(f"""
+        SELECT staging.row_number, insert_product({arguments}) AS id_serial
+        FROM import_staging AS staging
+        WHERE NOT (staging.row_number = ANY(CAST(:conflicts AS integer[])))
+        ORDER BY staging.row_number
+    """), {"conflicts": [index + 1 for index in conflicts]})
+    inserted = {row.row_number - 1: row.id_serial for row in result}
+    return inserted, conflicts
+
+def import_products(
+    db: Session,
+    content: bytes,
+    file_format: str,
+    images_archive: Optional[BinaryIO] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Import produk massal dari CSV/JSONL beserta zip gambar, dengan laporan per baris
+    """
+    started = time.monotonic()
+    raw_rows = parse_rows(content, file_format)
+    valid, errors = validate_rows(raw_rows)
+    logger.info(f"Import: {len(raw_rows)} baris dibaca, {len(valid)} valid")
+
+    created_paths = store_archive_images(images_archive, valid, errors, store=not dry_run)
+
+    inserted: Dict[int, str] = {}
+    conflicts: Dict[int, str] = {}
+    try:
+        if valid:
+            inserted, conflicts = merge_staging(db, valid, dry_run)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        # Blob yang sudah tersimpan akan dibersihkan garbage collector aset
+        logger.error(f"Import gagal, semua baris dibatalkan: {str(e)}")
+        raise
+
+    for index, id_serial in inserted.items():
+        on_catalog_changed(id_serial, {"id_serial": id_serial, **valid[index]})
+    if created_paths:
+        try:
+            schedule_variants(created_paths)
+        except Exception as e:
+            logger.error(f"Gagal menjadwalkan pembuatan varian gambar: {str(e)}")
+
+    results = []
+    for index, raw in enumerate(raw_rows):
+        outcome = {"row": index + 1, "place_name": raw.get("place_name")}
+        if index in errors:
+            outcome.update(status="invalid", errors=errors[index])
+        elif index in conflicts:
+            outcome.update(status="conflict", errors=[conflicts[index]])
+        elif index in inserted:
+            outcome.update(status="inserted", product_id=inserted[index])
+        else:
+            outcome.update(status="valid" if dry_run else "skipped")
+        results.append(outcome)
+
+    duration = time.monotonic() - started
+    summary = {"total": len(raw_rows), "dry_run": dry_run}
+    for outcome in results:
+        summary[outcome["status"]] = summary.get(outcome["status"], 0) + 1
+    summary["duration_seconds"] = round(duration, 3)
+    summary["rows_per_second"] = round(len(raw_rows) / duration, 1) if duration > 0 else None
+    logger.info(f"Import selesai: {summary}")
+    return {"summary": summary, "rows": results}
+
+def detect_format(filename: str, file_format: Optional[str] = None) -> str:
+    if file_format:
+        return file_format.lower()
+    extension = os.path.splitext(filename or "")[1].lower()
+    return "jsonl" if extension in (".jsonl", ".ndjson") else "csv"
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import produk massal dari CSV atau JSONL")
+    parser.add_argument("file", help="File CSV (dengan header) atau JSONL")
+    parser.add_argument("--images", help="Zip berisi gambar yang dirujuk kolom detail_images/display_images")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format file (default dari ekstensi)")
+    parser.add_argument("--dry-run", action="store_true", help="Validasi dan cek konflik tanpa menyimpan")
+    parser.add_argument("--report", help="Simpan laporan per baris ke file JSON")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as source:
+        content = source.read()
+    archive = open(args.images, "rb") if args.images else None
+    db = SessionLocal()
+    try:
+        report = import_products(db, content, detect_format(args.file, args.format), archive, args.dry_run)
+    finally:
+        db.close()
+        if archive:
+            archive.close()
+
+    print(json.dumps(report["summary"], indent=2))
+    if args.report:
+        with open(args.report, "w") as output:
+            json.dump(report, output, indent=2, default=str)
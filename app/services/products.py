@@ -1,18 +1,201 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
-import uuid
 import json
-import shutil
+import functools
 import os
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, time
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Hashable, Callable
+from starlette.concurrency import run_in_threadpool
+from app.services.pagination import build_keyset_query, split_page, paginate_in_memory
+from app.services.catalog_cache import catalog_cache
+from app.services.spatial_index import spatial_index
+from app.services.geo_engine import geo_engine, geo_parity, DistanceFields, TopRatedCandidates
+from app.services.search_index import search_index
+from app.services.suggest_index import suggest_index
+from app.services.facet_index import facet_index
+from app.services.single_flight import single_flight, coalesce, coalesce_async
+from app.services.image_variants import variant_urls, schedule_variants
+from app.services.image_store import store_blob, store_upload_async, schedule_release, UploadBudget
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Stored function untuk setiap jenis gambar produk
+IMAGE_SOURCES = {
+    "detail_images": "get_detail_images",
+    "display_images": "get_display_images",
+}
+
+def build_file_url(base_url: str, filename_path: str) -> str:
+    """
+    Membangun URL publik untuk file di folder app/asset
+    """
+    relative_path = filename_path.replace('app/asset/', '').replace('\\', '/')
+    return f"{base_url}static/{relative_path}"
+
+def fetch_product_images(
+    db: Session,
+    product_ids: List[str],
+    cache_results: bool = True
+) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Mengambil gambar detail dan display untuk banyak produk sekaligus.
+    Gambar yang sudah ada di catalog cache tidak di-query ulang; sisanya diambil
+    dengan satu query per jenis gambar, berapapun jumlah produknya, dan disimpan
+    ke cache kecuali cache_results=False.
+    """
+    generation = catalog_cache.generation
+    images, missing = catalog_cache.get_images(list(dict.fromkeys(product_ids)))
+    if not missing:
+        return images
+
+    fetched = {product_id: {kind: [] for kind in IMAGE_SOURCES} for product_id in missing}
+    for kind, function_name in IMAGE_SOURCES.items():
+        query = text(f"""
+            SELECT ids.id_serial AS hydrate_product_id, img.*
+            FROM unnest(CAST(:ids AS text[])) AS ids(id_serial)
+            CROSS JOIN LATERAL {function_name}(ids.id_serial) AS img
+        """)
+        for row in db.execute(query, {"ids": missing}).fetchall():
+            image = dict(row._mapping)
+            product_id = image.pop("hydrate_product_id")
+            fetched[product_id][kind].append(image)
+
+    if cache_results:
+        catalog_cache.put_images(fetched, generation)
+    images.update(fetched)
+    return images
+
+def attach_product_images(
+    products: List[Dict[str, Any]],
+    images: Dict[str, Dict[str, List[Dict[str, Any]]]],
+    base_url: str
+) -> List[Dict[str, Any]]:
+    """
+    Menambahkan detail_images dan display_images (beserta file_url dan URL varian) ke setiap produk.
+    Varian dibuat di background setelah upload; hanya varian yang sudah ada yang dicantumkan,
+    dan file_url tetap menjadi fallback.
+    """
+    for product in products:
+        for kind, rows in images[product["id_serial"]].items():
+            product[kind] = [
+                {
+                    **image,
+                    "file_url": build_file_url(base_url, image["filename_path"]),
+                    "variants": variant_urls(base_url, image["filename_path"]),
+                }
+                for image in rows
+            ]
+    return products
+
+def hydrate_product_images(
+    db: Session,
+    products: List[Dict[str, Any]],
+    base_url: str,
+    cache_results: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Mengambil dan menambahkan gambar untuk semua produk dalam satu tahap
+    """
+    images = fetch_product_images(db, [product["id_serial"] for product in products], cache_results)
+    return attach_product_images(products, images, base_url)
+
+def load_catalog(db: Session) -> List[Dict[str, Any]]:
+    """
+    Mengembalikan seluruh katalog mentah ({"product", "images"}, gambar tanpa file_url)
+    dengan urutan get_all_products. Dilayani dari catalog cache bila hangat.
+    """
+    catalog = catalog_cache.get_catalog()
+    if catalog is not None:
+        return catalog
+
+    return _install_catalog(*_fetch_catalog(db))
+
+def _fetch_catalog(db: Session) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, List[Dict[str, Any]]]], int]:
+    """
+    Tahap database dari load_catalog: baris get_all_products beserta gambarnya
+    """
+    generation = catalog_cache.generation
+    results = db.execute(text("SELECT * FROM get_all_products()")).fetchall()
+    products = [dict(row._mapping) for row in results]
+    images = fetch_product_images(db, [product["id_serial"] for product in products])
+    return products, images, generation
+
+def _install_catalog(
+    products: List[Dict[str, Any]],
+    images: Dict[str, Dict[str, List[Dict[str, Any]]]],
+    generation: int
+) -> List[Dict[str, Any]]:
+    """
+    Tahap CPU dari load_catalog: mengisi catalog cache dan membangun ulang semua index
+    """
+    catalog_cache.load_catalog(products, images, generation)
+    build_catalog_indexes(products)
+    return [{"product": product, "images": images[product["id_serial"]]} for product in products]
+
+def get_catalog_entries(db: Session, product_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Mengambil entri katalog ({"product", "images"}) untuk id tertentu sesuai urutan id.
+    Bila ada yang tidak ada di cache, katalog dimuat ulang sekali.
+    """
+    entries = {product_id: catalog_cache.get_product(product_id) for product_id in product_ids}
+    if any(entry is None for entry in entries.values()):
+        entries = {entry["product"]["id_serial"]: entry for entry in load_catalog(db)}
+    return [entries[product_id] for product_id in product_ids if entries.get(product_id)]
+
+def build_catalog_indexes(products: List[Dict[str, Any]]):
+    """
+    Membangun ulang index di memori dari seluruh katalog
+    """
+    spatial_index.build(
+        (product["id_serial"], product["latitude"], product["longitude"]) for product in products
+    )
+    geo_engine.build(products)
+    # Kesetaraan engine dengan stored function diperiksa ulang untuk katalog baru
+    geo_parity.reset()
+    search_index.build(products)
+    suggest_index.build(products)
+    facet_index.build(products)
+
+def on_catalog_changed(id_serial: str, product: Optional[Dict[str, Any]] = None):
+    """
+    Dipanggil setelah commit create/update/delete produk.
+    `product` berisi field produk terbaru, atau None bila produk dihapus.
+    """
+    catalog_cache.invalidate(id_serial)
+    single_flight.bump()
+    if product is None:
+        spatial_index.remove(id_serial)
+        geo_engine.remove(id_serial)
+        search_index.remove(id_serial)
+        suggest_index.remove(id_serial)
+        facet_index.remove(id_serial)
+    else:
+        spatial_index.upsert(id_serial, product["latitude"], product["longitude"])
+        geo_engine.upsert(product)
+        search_index.upsert(product)
+        suggest_index.upsert(product)
+        facet_index.upsert(product)
+
+def _after_commit(deferred: Optional[List[Callable[[], None]]], function: Callable, *args):
+    """
+    Menjalankan efek samping setelah commit, atau menitipkannya ke `deferred` agar pemanggil
+    async bisa menjalankannya di thread pool, bukan di thread event loop
+    """
+    if deferred is None:
+        function(*args)
+    else:
+        deferred.append(functools.partial(function, *args))
+
+def _run_deferred(deferred: List[Callable[[], None]]):
+    for function in deferred:
+        function()
+
 def check_product_exists(db: Session, category: str, place_name: str) -> bool:
     """
     Memeriksa apakah produk dengan kategori dan nama tempat tertentu sudah ada
@@ -25,29 +208,56 @@ def check_product_exists(db: Session, category: str, place_name: str) -> bool:
         logger.error(f"Error saat memeriksa keberadaan produk: {str(e)}")
         raise
 
-def save_images(image_files, folder: str) -> List[Dict[str, str]]:
+def save_images(image_files) -> List[Dict[str, str]]:
     """
-    Menyimpan file gambar ke dalam folder yang ditentukan dan mengembalikan daftar informasi gambar.
+    Menyimpan file gambar ke storage berbasis hash isi dan mengembalikan daftar informasi gambar.
+    Gambar dengan isi yang sama hanya disimpan sekali dan dipakai bersama oleh semua produk.
     """
-    # Pastikan folder ada
-    os.makedirs(folder, exist_ok=True)
-    
     image_list = []
+    created_paths = []
     for image in image_files:
-        timestamp = datetime.utcnow().timestamp()
-        unique_code = uuid.uuid4().hex[:8]
         file_extension = os.path.splitext(image.filename)[1]
-        unique_filename = f"{timestamp}_{unique_code}{file_extension}"  # Format file unik
-        filepath = os.path.join(folder, unique_filename)
         try:
-            with open(filepath, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
+            filepath, created = store_blob(image.file, file_extension)
             image_list.append({"filename": image.filename, "filename_path": filepath})
+            if created:
+                created_paths.append(filepath)
         except Exception as e:
             logger.error(f"Gagal menyimpan gambar {image.filename}: {str(e)}")
             raise
+
+    # Thumbnail dan varian responsif dibuat di background agar request tidak menunggu
+    try:
+        schedule_variants(created_paths)
+    except Exception as e:
+        logger.error(f"Gagal menjadwalkan pembuatan varian gambar: {str(e)}")
     return image_list
 
+async def save_images_async(image_files, budget: Optional[UploadBudget] = None) -> List[Dict[str, str]]:
+    """
+    Versi async save_images: semua file ditulis bersamaan tanpa memblokir event loop,
+    dengan batas ukuran per file dan per request dari `budget`
+    """
+    budget = budget or UploadBudget()
+    results = await asyncio.gather(
+        *(store_upload_async(image, os.path.splitext(image.filename)[1], budget) for image in image_files),
+        return_exceptions=True
+    )
+    for image, result in zip(image_files, results):
+        if isinstance(result, BaseException):
+            # Blob yang sudah tertulis dari file lain akan dibersihkan garbage collector
+            logger.error(f"Gagal menyimpan gambar {image.filename}: {str(result)}")
+            raise result
+
+    try:
+        await run_in_threadpool(schedule_variants, [path for path, created in results if created])
+    except Exception as e:
+        logger.error(f"Gagal menjadwalkan pembuatan varian gambar: {str(e)}")
+    return [
+        {"filename": image.filename, "filename_path": path}
+        for image, (path, _) in zip(image_files, results)
+    ]
+
 def create_product(
     db: Session, 
     user_id: int, 
@@ -64,7 +274,8 @@ def create_product(
     longitude: float,
     kab_kota: str,  # Tambahan kolom
     detail_images: List[Dict[str, str]],
-    display_images: List[Dict[str, str]]
+    display_images: List[Dict[str, str]],
+    deferred: Optional[List[Callable[[], None]]] = None
 ) -> str:
     """
     Membuat produk baru di dalam database.
@@ -113,6 +324,20 @@ def create_product(
 
         if product_id:
             db.commit()
+            _after_commit(deferred, on_catalog_changed, product_id, {
+                "id_serial": product_id,
+                "user_id": user_id,
+                "category": category,
+                "place_name": place_name,
+                "rating": rating,
+                "price": price,
+                "stock": stock,
+                "description": description,
+                "location": location,
+                "latitude": latitude,
+                "longitude": longitude,
+                "kab_kota": kab_kota
+            })
             logger.info(f"Produk berhasil ditambahkan dengan ID: {product_id}")
             return product_id
         else:
@@ -140,6 +365,13 @@ def get_product_by_id(db: Session, id_serial: str, base_url: str) -> Dict[str, A
     try:
         logger.info(f"Mengambil data produk dengan ID Serial: {id_serial}")
 
+        # Layani dari catalog cache bila tersedia
+        cached = catalog_cache.get_product(id_serial)
+        if cached:
+            return attach_product_images([cached["product"]], {id_serial: cached["images"]}, base_url)[0]
+
+        generation = catalog_cache.generation
+
         # Dapatkan data produk
         product_query = text("SELECT * FROM get_product_by_id(:id_serial)")
         product_result = db.execute(product_query, {"id_serial": id_serial}).fetchone()
@@ -151,34 +383,11 @@ def get_product_by_id(db: Session, id_serial: str, base_url: str) -> Dict[str, A
         # Konversi ke dictionary dengan aman
         product_dict = dict(product_result._mapping)
 
-        # Dapatkan gambar detail
-        detail_images_query = text("SELECT * FROM get_detail_images(:id_serial)")
-        detail_images_result = db.execute(detail_images_query, {"id_serial": id_serial}).fetchall()
-        detail_images = [
-            {
-                **dict(row._mapping),
-                "file_url": f"{base_url}static/{row.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-            }
-            for row in detail_images_result
-        ]
-
-        # Dapatkan gambar display
-        display_images_query = text("SELECT * FROM get_display_images(:id_serial)")
-        display_images_result = db.execute(display_images_query, {"id_serial": id_serial}).fetchall()
-        display_images = [
-            {
-                **dict(row._mapping),
-                "file_url": f"{base_url}static/{row.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-            }
-            for row in display_images_result
-        ]
-
+        # Dapatkan gambar detail dan display
+        images = fetch_product_images(db, [id_serial])
+        catalog_cache.put_product(id_serial, product_dict, images[id_serial], generation)
 
-        # Gabungkan data
-        product_dict["detail_images"] = detail_images
-        product_dict["display_images"] = display_images
-
-        return product_dict
+        return attach_product_images([product_dict], images, base_url)[0]
 
     except ValueError as e:
         logger.warning(f"Produk tidak ditemukan: {str(e)}")
@@ -187,18 +396,6 @@ def get_product_by_id(db: Session, id_serial: str, base_url: str) -> Dict[str, A
         logger.error(f"Terjadi kesalahan saat mengambil data produk: {str(e)}")
         raise
 
-def remove_old_images(file_paths):
-    """
-    Menghapus file gambar lama
-    """
-    for path in file_paths:
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-                logger.info(f"File {path} berhasil dihapus")
-        except Exception as e:
-            logger.error(f"Gagal menghapus file {path}: {str(e)}")
-
 def update_product(
     db: Session,
     id_serial: str,
@@ -218,18 +415,12 @@ def update_product(
     detail_images: List[Dict[str, str]],
     display_images: List[Dict[str, str]],
     old_detail_images: List[str] = None,
-    old_display_images: List[str] = None
+    old_display_images: List[str] = None,
+    deferred: Optional[List[Callable[[], None]]] = None
 ) -> bool:
     try:
         logger.info(f"Memulai proses update produk dengan ID: {id_serial}")
         
-        # Hapus hanya gambar yang ditentukan untuk dihapus
-        if old_detail_images:
-            remove_old_images(old_detail_images)
-        
-        if old_display_images:
-            remove_old_images(old_display_images)
-        
         # Pastikan detail_images dan display_images bukan None sebelum konversi ke JSON
         safe_detail_images = detail_images if detail_images else []
         safe_display_images = display_images if display_images else []
@@ -268,6 +459,22 @@ def update_product(
         
         if success:
             db.commit()
+            _after_commit(deferred, on_catalog_changed, id_serial, {
+                "id_serial": id_serial,
+                "user_id": user_id,
+                "category": category,
+                "place_name": place_name,
+                "rating": rating,
+                "price": price,
+                "stock": stock,
+                "description": description,
+                "location": location,
+                "latitude": latitude,
+                "longitude": longitude,
+                "kab_kota": kab_kota
+            })
+            # Hapus gambar lama di background setelah commit, hanya bila tidak dipakai gambar lain
+            _after_commit(deferred, schedule_release, (old_detail_images or []) + (old_display_images or []))
             return True
         else:
             db.rollback()
@@ -282,39 +489,21 @@ def update_product(
         logger.error(f"Error dalam update_product: {str(e)}")
         raise
 
+@coalesce("get_all_products")
 def get_all_products(db: Session, base_url: str) -> List[Dict[str, Any]]:
     """
     Mendapatkan semua produk
     """
     logger.info("Mengambil semua data produk")
-    
-    query = text("SELECT * FROM get_all_products()")
-    results = db.execute(query).fetchall()
-
-    products = []
-    for row in results:
-        product_dict = dict(row._mapping)
-
-        # Ambil gambar detail
-        detail_query = text("SELECT * FROM get_detail_images(:id_serial)")
-        detail_results = db.execute(detail_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["detail_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in detail_results
-        ]
-
-        # Ambil gambar display
-        display_query = text("SELECT * FROM get_display_images(:id_serial)")
-        display_results = db.execute(display_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["display_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in display_results
-        ]
-
-        products.append(product_dict)
 
-    return products
+    # Katalog beserta gambarnya, dari cache bila hangat
+    catalog = load_catalog(db)
 
+    products = [entry["product"] for entry in catalog]
+    images = {entry["product"]["id_serial"]: entry["images"] for entry in catalog}
+    return attach_product_images(products, images, base_url)
+
+@coalesce("get_products_by_kab_kota")
 def get_products_by_kab_kota(
     db: Session, 
     kab_kota: str, 
@@ -334,30 +523,12 @@ def get_products_by_kab_kota(
         "user_long": longitude
     }).fetchall()
 
-    products = []
-    for row in results:
-        product_dict = dict(row._mapping)
-
-        # Ambil gambar detail
-        detail_query = text("SELECT * FROM get_detail_images(:id_serial)")
-        detail_results = db.execute(detail_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["detail_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in detail_results
-        ]
+    products = [dict(row._mapping) for row in results]
 
-        # Ambil gambar display
-        display_query = text("SELECT * FROM get_display_images(:id_serial)")
-        display_results = db.execute(display_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["display_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in display_results
-        ]
-
-        products.append(product_dict)
-
-    return products
+    # Ambil gambar detail dan display untuk semua produk sekaligus
+    return hydrate_product_images(db, products, base_url)
 
+@coalesce("get_products_by_category")
 def get_products_by_category(
     db: Session, 
     category: str,
@@ -376,6 +547,14 @@ def get_products_by_category(
     if location:
         logger.info(f"Filter lokasi: {location}")
 
+    # Hitung jarak secara tervektorisasi bila engine sudah terbukti sama dengan stored function
+    parity_key = _category_parity_key(category, sortby, location)
+    fields = geo_parity.fields(parity_key) if geo_engine.ready else None
+    if fields is not None:
+        matches = geo_engine.search(latitude, longitude, category=category, kab_kota=location, sortby=sortby)
+        products, images = _products_with_distance(db, fields, matches)
+        return attach_product_images(products, images, base_url)
+
     # Execute stored procedure with parameters
     params = {
         "category": category, 
@@ -388,38 +567,24 @@ def get_products_by_category(
     query = text("SELECT * FROM get_products_by_category(:category, :user_lat, :user_long, :p_sortby, :p_location)")
     results = db.execute(query, params).fetchall()
 
-    products = []
-    for row in results:
-        product_dict = dict(row._mapping)
+    products = [dict(row._mapping) for row in results]
+    _check_geo_parity(
+        db, parity_key, products,
+        lambda: geo_engine.search(latitude, longitude, category=category, kab_kota=location, sortby=sortby)
+    )
 
-        # Ambil gambar detail
-        detail_query = text("SELECT * FROM get_detail_images(:id_serial)")
-        detail_results = db.execute(detail_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["detail_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in detail_results
-        ]
-
-        # Ambil gambar display
-        display_query = text("SELECT * FROM get_display_images(:id_serial)")
-        display_results = db.execute(display_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-        product_dict["display_images"] = [
-            {**dict(img._mapping), "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"}
-            for img in display_results
-        ]
-
-        products.append(product_dict)
-
-    return products
+    # Ambil gambar detail dan display untuk semua produk sekaligus
+    return hydrate_product_images(db, products, base_url)
 
-def delete_product(db: Session, id_serial: str) -> bool:
+def delete_product(db: Session, id_serial: str, deferred: Optional[List[Callable[[], None]]] = None) -> bool:
     try:
         logger.info(f"Memulai proses penghapusan produk dengan ID: {id_serial}")
 
-        # Ambil data gambar sebelum dihapus
+        # Ambil data gambar sebelum dihapus. Tanpa FILTER, LEFT JOIN menghasilkan [null] untuk
+        # produk tanpa gambar, dan kedua join menggandakan path sebanyak baris join lainnya
         query_get_images = text("""
-            SELECT jsonb_agg(detail_image.filename_path) AS detail_images,
-                   jsonb_agg(display_image.filename_path) AS display_images
+            SELECT jsonb_agg(DISTINCT detail_image.filename_path) FILTER (WHERE detail_image.filename_path IS NOT NULL) AS detail_images,
+                   jsonb_agg(DISTINCT display_image.filename_path) FILTER (WHERE display_image.filename_path IS NOT NULL) AS display_images
             FROM products
             LEFT JOIN detail_image ON products.id_serial = detail_image.product_id
             LEFT JOIN display_image ON products.id_serial = display_image.product_id
@@ -440,8 +605,9 @@ def delete_product(db: Session, id_serial: str) -> bool:
         
         if success:
             db.commit()
-            remove_old_images(detail_images)  # Menggunakan remove_old_images untuk menghapus file
-            remove_old_images(display_images)  # Menggunakan remove_old_images untuk menghapus file
+            _after_commit(deferred, on_catalog_changed, id_serial)
+            # Penghapusan file dikerjakan job queue; blob yang masih dipakai produk lain tidak ikut dihapus
+            _after_commit(deferred, schedule_release, [path for path in detail_images + display_images if path])
             return True
         else:
             db.rollback()
@@ -462,47 +628,147 @@ def get_nearby_products(db: Session, user_lat: float, user_long: float, max_dist
     """
     try:
         logger.info(f"Mengambil produk dalam radius {max_distance_km} km dari lokasi ({user_lat}, {user_long})")
+
+        # Gunakan index spasial di memori bila sudah dibangun dan terbukti sama dengan stored function
+        fields = geo_parity.fields(NEARBY_PARITY_KEY) if spatial_index.ready else None
+        if fields is not None:
+            products, images = _nearby_from_index(db, fields, user_lat, user_long, max_distance_km)
+            return attach_product_images(products, images, base_url)
         
         query = text("SELECT * FROM get_nearby_products(:user_lat, :user_long, :max_distance_km)")
         result = db.execute(query, {"user_lat": user_lat, "user_long": user_long, "max_distance_km": max_distance_km}).fetchall()
         
-        products = []
-        for row in result:
-            product_dict = dict(row._mapping)
-            
-            # Mengambil gambar detail
-            detail_images_query = text("SELECT * FROM get_detail_images(:id_serial)")
-            detail_images_result = db.execute(detail_images_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-            detail_images = [
-                {
-                    **dict(img._mapping),
-                    "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-                }
-                for img in detail_images_result
-            ]
-            
-            # Mengambil gambar display
-            display_images_query = text("SELECT * FROM get_display_images(:id_serial)")
-            display_images_result = db.execute(display_images_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-            display_images = [
-                {
-                    **dict(img._mapping),
-                    "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-                }
-                for img in display_images_result
-            ]
-            
-            # Menambahkan gambar ke data produk
-            product_dict["detail_images"] = detail_images
-            product_dict["display_images"] = display_images
-            
-            products.append(product_dict)
-        
-        return products
+        products = [dict(row._mapping) for row in result]
+        if spatial_index.ready:
+            _check_geo_parity(db, NEARBY_PARITY_KEY, products, lambda: _radius_matches(user_lat, user_long, max_distance_km))
+
+        # Ambil gambar detail dan display untuk semua produk sekaligus
+        return hydrate_product_images(db, products, base_url)
     except Exception as e:
         logger.error(f"Terjadi kesalahan saat mengambil produk terdekat: {str(e)}")
         raise
 
+NEARBY_PARITY_KEY = ("get_nearby_products",)
+
+def _category_parity_key(category: str, sortby: Optional[str], location: Optional[str]) -> Hashable:
+    """
+    Engine mencocokkan category dan p_location secara persis, sedangkan perilaku stored
+    function untuk sebuah nilai hanya diketahui setelah dibandingkan. Karena itu setiap nilai
+    category dan lokasi diperiksa sendiri; kategori yang belum terbukti tetap dilayani
+    stored function.
+    """
+    return ("get_products_by_category", category, sortby, location)
+
+def _check_geo_parity(db: Session, key: Hashable, stored_products: List[Dict[str, Any]], engine_matches):
+    """
+    Membandingkan hasil stored function dengan hasil engine, sebelum gambar ditambahkan.
+    `engine_matches` dipanggil hanya bila key belum diperiksa atau hasil pemeriksaannya kedaluwarsa.
+    """
+    if not stored_products or not geo_parity.pending(key):
+        return
+    entries = get_catalog_entries(db, [stored_products[0]["id_serial"]])
+    if entries:
+        geo_parity.check(key, stored_products, engine_matches(), entries[0]["product"].keys())
+
+def _products_with_distance(db: Session, fields: DistanceFields, matches: List[Tuple[str, float]]):
+    """
+    Mengubah hasil engine (id_serial, jarak_km) menjadi produk dari catalog cache dengan bentuk
+    baris stored function (termasuk kolom jarak dan waktu tempuhnya), serta gambar mentahnya
+    """
+    entries = get_catalog_entries(db, [id_serial for id_serial, _ in matches])
+    return _rows_with_distance(fields, {entry["product"]["id_serial"]: entry for entry in entries}, matches)
+
+def _rows_with_distance(fields: DistanceFields, entries: Dict[str, Dict[str, Any]], matches: List[Tuple[str, float]]):
+    """
+    Baris baru per pemanggil dari entri katalog yang sudah diambil; entri itu sendiri tidak diubah
+    """
+    products, images = [], {}
+    for id_serial, distance in matches:
+        entry = entries.get(id_serial)
+        if entry is None:
+            continue
+        products.append(fields.row(entry["product"], distance))
+        images[id_serial] = entry["images"]
+    return products, images
+
+def _radius_matches(user_lat: float, user_long: float, max_distance_km: float) -> List[Tuple[str, float]]:
+    return [(id_serial, distance) for distance, id_serial in spatial_index.radius(user_lat, user_long, max_distance_km)]
+
+def _nearby_from_index(db: Session, fields: DistanceFields, user_lat: float, user_long: float, max_distance_km: float):
+    """
+    Produk dalam radius dari index spasial, terurut dari yang terdekat
+    """
+    return _products_with_distance(db, fields, _radius_matches(user_lat, user_long, max_distance_km))
+
+@coalesce("search_products")
+def search_products(db: Session, query: str, limit: int, base_url: str) -> List[Dict[str, Any]]:
+    """
+    Pencarian teks dengan toleransi salah ketik atas place_name, description, location dan kab_kota,
+    terurut relevansi. Setiap produk berisi field score.
+    """
+    logger.info(f"Mencari produk dengan query: {query}")
+
+    # Index dibangun saat katalog dimuat
+    if not search_index.ready:
+        load_catalog(db)
+
+    matches = search_index.search(query, limit)
+    scores = dict(matches)
+    entries = get_catalog_entries(db, [id_serial for id_serial, _ in matches])
+
+    products, images = [], {}
+    for entry in entries:
+        product = entry["product"]
+        product["score"] = round(scores[product["id_serial"]], 4)
+        products.append(product)
+        images[product["id_serial"]] = entry["images"]
+    return attach_product_images(products, images, base_url)
+
+def suggest_products(db: Session, prefix: str, limit: int, suggestion_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Saran autocomplete place_name, category dan kab_kota berdasarkan awalan kata,
+    terurut bobot rating
+    """
+    # Index dibangun saat katalog dimuat
+    if not suggest_index.ready:
+        load_catalog(db)
+
+    return suggest_index.suggest(prefix, limit, suggestion_type)
+
+def get_product_facets(db: Session, categories: Optional[List[str]] = None, kab_kotas: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Jumlah produk serta rentang harga dan rating per category dan kab_kota dengan filter gabungan
+    """
+    logger.info(f"Mengambil facet produk dengan filter category: {categories}, kab_kota: {kab_kotas}")
+
+    # Index dibangun saat katalog dimuat
+    if not facet_index.ready:
+        load_catalog(db)
+
+    return facet_index.facets(categories, kab_kotas)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+def iter_product_batches(db: Session, base_url: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Mengalirkan seluruh katalog per batch lewat server-side cursor, lengkap dengan gambar.
+    Kolom dan urutannya sama dengan get_all_products (GET /products/). Gambar yang belum
+    ada di catalog cache tidak disimpan ke cache, sehingga hanya satu batch yang berada
+    di memori pada satu waktu.
+    """
+    logger.info(f"Memulai ekspor katalog dengan batch {batch_size}")
+
+    query = text("SELECT * FROM get_all_products()").execution_options(
+        stream_results=True, yield_per=batch_size
+    )
+    result = db.execute(query)
+    try:
+        for partition in result.partitions():
+            products = [dict(row._mapping) for row in partition]
+            yield hydrate_product_images(db, products, base_url, cache_results=False)
+    finally:
+        result.close()
+
 def get_top_rated_products_by_location(
     db: Session, 
     user_lat: float, 
@@ -517,6 +783,12 @@ def get_top_rated_products_by_location(
     """
     try:
         logger.info(f"Mengambil {limit} produk terbaik dekat lokasi [{user_lat}, {user_long}] dengan kategori: {category or 'Semua'}")
+
+        parity_key = _top_rated_parity_key(category)
+        fields = geo_parity.fields(parity_key) if geo_engine.ready else None
+        if fields is not None:
+            candidates = get_top_rated_candidates(db, category, limit)
+            return rank_top_rated_candidates(fields, candidates, user_lat, user_long, limit, base_url)
         
         query = text("SELECT * FROM get_top_rated_products_by_location(:user_lat, :user_long, :category, :limit);")
         result = db.execute(query, {
@@ -526,39 +798,289 @@ def get_top_rated_products_by_location(
             "limit": limit
         }).fetchall()
         
-        products = []
-        for row in result:
-            product_dict = dict(row._mapping)
-            
-            # Mengambil gambar detail
-            detail_images_query = text("SELECT * FROM get_detail_images(:id_serial)")
-            detail_images_result = db.execute(detail_images_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-            detail_images = [
-                {
-                    **dict(img._mapping),
-                    "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-                }
-                for img in detail_images_result
-            ]
-            
-            # Mengambil gambar display
-            display_images_query = text("SELECT * FROM get_display_images(:id_serial)")
-            display_images_result = db.execute(display_images_query, {"id_serial": product_dict["id_serial"]}).fetchall()
-            display_images = [
-                {
-                    **dict(img._mapping),
-                    "file_url": f"{base_url}static/{img.filename_path.replace('app/asset/', '').replace('\\', '/')}"
-                }
-                for img in display_images_result
-            ]
-            
-            # Menambahkan gambar ke data produk
-            product_dict["detail_images"] = detail_images
-            product_dict["display_images"] = display_images
-            
-            products.append(product_dict)
-        
-        return products
+        products = [dict(row._mapping) for row in result]
+        if geo_engine.ready:
+            _check_geo_parity(db, parity_key, products, lambda: geo_engine.top_rated(user_lat, user_long, category, limit))
+
+        # Ambil gambar detail dan display untuk semua produk sekaligus
+        return hydrate_product_images(db, products, base_url)
     except Exception as e:
         logger.error(f"Terjadi kesalahan saat mengambil produk populer berdasarkan lokasi: {str(e)}")
         raise e
+
+def _top_rated_parity_key(category: Optional[str]) -> Hashable:
+    return ("get_top_rated_products_by_location", category)
+
+def get_top_rated_candidates(db: Session, category: Optional[str], limit: int) -> Tuple[TopRatedCandidates, Dict[str, Dict[str, Any]]]:
+    """
+    Kandidat top-rated beserta entri katalognya. Urutan top-rated ditentukan rating dan jarak
+    hanya memecah seri, jadi hasil ini sama untuk semua lokasi pengguna.
+    """
+    candidates = geo_engine.top_rated_candidates(category, limit)
+    entries = get_catalog_entries(db, list(candidates.ids))
+    return candidates, {entry["product"]["id_serial"]: entry for entry in entries}
+
+def rank_top_rated_candidates(
+    fields: DistanceFields,
+    candidates: Tuple[TopRatedCandidates, Dict[str, Dict[str, Any]]],
+    user_lat: float,
+    user_long: float,
+    limit: int,
+    base_url: str
+) -> List[Dict[str, Any]]:
+    """
+    Produk top-rated untuk satu lokasi dari kandidat bersama, dengan jarak dan waktu tempuh
+    yang dihitung tepat untuk lokasi tersebut
+    """
+    top_rated, entries = candidates
+    matches = geo_engine.rank_top_rated(top_rated, user_lat, user_long, limit)
+    products, images = _rows_with_distance(fields, entries, matches)
+    return attach_product_images(products, images, base_url)
+
+def _get_products_page(
+    db: Session,
+    source_sql: str,
+    params: Dict[str, Any],
+    base_url: str,
+    limit: int,
+    cursor: Optional[str],
+    order: str
+) -> Dict[str, Any]:
+    """
+    Menjalankan query sumber dengan keyset pagination dan hanya menghidrasi gambar
+    untuk baris pada halaman yang diminta
+    """
+    page_sql, page_params = build_keyset_query(source_sql, order, limit, cursor)
+    results = db.execute(text(page_sql), {**params, **page_params}).fetchall()
+
+    products, next_cursor = split_page([dict(row._mapping) for row in results], order, limit)
+    return {
+        "data": hydrate_product_images(db, products, base_url),
+        "next_cursor": next_cursor
+    }
+
+@coalesce("get_all_products_page")
+def get_all_products_page(
+    db: Session,
+    base_url: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    order: str = "id"
+) -> Dict[str, Any]:
+    """
+    Mendapatkan semua produk per halaman (keyset pagination)
+    """
+    logger.info(f"Mengambil halaman produk: limit={limit}, order={order}")
+
+    # Bila katalog sudah ada di cache, paginasi dilakukan di memori tanpa query
+    if catalog_cache.is_warm():
+        catalog = load_catalog(db)
+        products, next_cursor = paginate_in_memory([entry["product"] for entry in catalog], order, limit, cursor)
+        images = {entry["product"]["id_serial"]: entry["images"] for entry in catalog}
+        return {
+            "data": attach_product_images(products, images, base_url),
+            "next_cursor": next_cursor
+        }
+
+    return _get_products_page(db, "SELECT * FROM get_all_products()", {}, base_url, limit, cursor, order)
+
+@coalesce("get_products_by_kab_kota_page")
+def get_products_by_kab_kota_page(
+    db: Session,
+    kab_kota: str,
+    latitude: float,
+    longitude: float,
+    base_url: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    order: str = "id"
+) -> Dict[str, Any]:
+    """
+    Mendapatkan produk berdasarkan kabupaten/kota per halaman (keyset pagination)
+    """
+    logger.info(f"Mengambil halaman produk di kabupaten/kota: {kab_kota}, limit={limit}, order={order}")
+    return _get_products_page(
+        db,
+        "SELECT * FROM get_products_by_kab_kota(:kab_kota, :user_lat, :user_long)",
+        {"kab_kota": kab_kota, "user_lat": latitude, "user_long": longitude},
+        base_url, limit, cursor, order
+    )
+
+@coalesce("get_products_by_category_page")
+def get_products_by_category_page(
+    db: Session,
+    category: str,
+    latitude: float,
+    longitude: float,
+    base_url: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    order: str = "id",
+    location: str = None
+) -> Dict[str, Any]:
+    """
+    Mendapatkan produk berdasarkan kategori per halaman (keyset pagination).
+    Urutan halaman ditentukan oleh keyset, bukan oleh parameter sortby stored function.
+    """
+    logger.info(f"Mengambil halaman produk kategori: {category}, limit={limit}, order={order}")
+
+    fields = geo_parity.fields(_category_parity_key(category, None, location)) if geo_engine.ready else None
+    if fields is not None:
+        matches = geo_engine.search(latitude, longitude, category=category, kab_kota=location)
+        products, images = _products_with_distance(db, fields, matches)
+        page, next_cursor = paginate_in_memory(products, order, limit, cursor)
+        return {
+            "data": attach_product_images(page, images, base_url),
+            "next_cursor": next_cursor
+        }
+
+    return _get_products_page(
+        db,
+        "SELECT * FROM get_products_by_category(:category, :user_lat, :user_long, :p_sortby, :p_location)",
+        {"category": category, "user_lat": latitude, "user_long": longitude, "p_sortby": None, "p_location": location},
+        base_url, limit, cursor, order
+    )
+
+def get_nearby_products_page(
+    db: Session,
+    user_lat: float,
+    user_long: float,
+    max_distance_km: int,
+    base_url: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    order: str = "id"
+) -> Dict[str, Any]:
+    """
+    Mengambil produk dalam radius tertentu per halaman (keyset pagination)
+    """
+    logger.info(f"Mengambil halaman produk dalam radius {max_distance_km} km: limit={limit}, order={order}")
+
+    fields = geo_parity.fields(NEARBY_PARITY_KEY) if spatial_index.ready else None
+    if fields is not None:
+        products, images = _nearby_from_index(db, fields, user_lat, user_long, max_distance_km)
+        page, next_cursor = paginate_in_memory(products, order, limit, cursor)
+        return {
+            "data": attach_product_images(page, images, base_url),
+            "next_cursor": next_cursor
+        }
+
+    return _get_products_page(
+        db,
+        "SELECT * FROM get_nearby_products(:user_lat, :user_long, :max_distance_km)",
+        {"user_lat": user_lat, "user_long": user_long, "max_distance_km": max_distance_km},
+        base_url, limit, cursor, order
+    )
+
+# Versi async dari service di atas, untuk route async dengan AsyncSession (asyncpg).
+# Logika query tetap satu sumber: fungsi sinkron dijalankan lewat run_sync, sementara
+# I/O ke database berjalan non-blocking di atas driver asyncpg.
+
+def parse_time(value):
+    """
+    Mengubah string jam menjadi datetime.time, karena asyncpg tidak menerima string
+    untuk parameter bertipe TIME
+    """
+    if not isinstance(value, str):
+        return value
+    for time_format in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            continue
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Format jam tidak valid: {value}")
+
+async def check_product_exists_async(db: AsyncSession, category: str, place_name: str) -> bool:
+    return await db.run_sync(check_product_exists, category, place_name)
+
+async def _run_sync_write(db: AsyncSession, function: Callable, *args, **kwargs):
+    """
+    Menjalankan fungsi tulis sinkron lewat run_sync. Hanya I/O driver yang menunggu di
+    event loop; efek samping setelah commit (pembaruan index di memori dan journal SQLite
+    job queue) dijalankan di thread pool.
+    """
+    deferred: List[Callable[[], None]] = []
+    try:
+        return await db.run_sync(function, *args, deferred=deferred, **kwargs)
+    finally:
+        if deferred:
+            await run_in_threadpool(_run_deferred, deferred)
+
+async def create_product_async(db: AsyncSession, **product_data) -> str:
+    product_data["open_time"] = parse_time(product_data["open_time"])
+    product_data["close_time"] = parse_time(product_data["close_time"])
+    return await _run_sync_write(db, create_product, **product_data)
+
+@coalesce_async("get_product_by_id")
+async def get_product_by_id_async(db: AsyncSession, id_serial: str, base_url: str) -> Dict[str, Any]:
+    return await db.run_sync(get_product_by_id, id_serial, base_url)
+
+async def update_product_async(db: AsyncSession, **product_data) -> bool:
+    product_data["open_time"] = parse_time(product_data["open_time"])
+    product_data["close_time"] = parse_time(product_data["close_time"])
+    return await _run_sync_write(db, update_product, **product_data)
+
+async def delete_product_async(db: AsyncSession, id_serial: str) -> bool:
+    return await _run_sync_write(db, delete_product, id_serial)
+
+@coalesce_async("load_catalog")
+async def _warm_catalog_async(db: AsyncSession):
+    """
+    Memuat ulang katalog untuk jalur index di memori: query lewat run_sync, sedangkan
+    pengisian cache dan pembangunan ulang index (CPU) di thread pool
+    """
+    if catalog_cache.is_warm():
+        return
+    products, images, generation = await db.run_sync(_fetch_catalog)
+    await run_in_threadpool(_install_catalog, products, images, generation)
+
+async def _ensure_catalog_async(db: AsyncSession):
+    """
+    Bila index sudah pernah dibangun tetapi snapshot katalog tidak lagi lengkap (misalnya
+    setelah produk berubah), muat ulang sebelum run_sync agar fungsi sinkron tidak
+    memuatnya di thread event loop
+    """
+    if geo_engine.ready and not catalog_cache.is_warm():
+        await _warm_catalog_async(db)
+
+@coalesce_async("get_nearby_products")
+async def get_nearby_products_async(db: AsyncSession, user_lat: float, user_long: float, max_distance_km: int, base_url: str) -> List[Dict[str, Any]]:
+    await _ensure_catalog_async(db)
+    return await db.run_sync(get_nearby_products, user_lat, user_long, max_distance_km, base_url)
+
+@coalesce_async("get_nearby_products_page")
+async def get_nearby_products_page_async(db: AsyncSession, *args, **kwargs) -> Dict[str, Any]:
+    await _ensure_catalog_async(db)
+    return await db.run_sync(get_nearby_products_page, *args, **kwargs)
+
+@coalesce_async("get_top_rated_candidates")
+async def get_top_rated_candidates_async(db: AsyncSession, category: Optional[str], limit: int):
+    await _ensure_catalog_async(db)
+    return await db.run_sync(get_top_rated_candidates, category, limit)
+
+# Stored function menghitung jarak untuk koordinat persis, jadi hanya request dengan
+# koordinat yang sama yang bisa digabung
+@coalesce_async("get_top_rated_products_by_location")
+async def _get_top_rated_products_by_location_async(db: AsyncSession, *args) -> List[Dict[str, Any]]:
+    await _ensure_catalog_async(db)
+    return await db.run_sync(get_top_rated_products_by_location, *args)
+
+async def get_top_rated_products_by_location_async(
+    db: AsyncSession,
+    user_lat: float,
+    user_long: float,
+    category: Optional[str],
+    limit: int,
+    base_url: str
+) -> List[Dict[str, Any]]:
+    fields = geo_parity.fields(_top_rated_parity_key(category)) if geo_engine.ready else None
+    if fields is None:
+        return await _get_top_rated_products_by_location_async(db, user_lat, user_long, category, limit, base_url)
+
+    # Kandidat digabung untuk semua lokasi; jarak dan urutan dihitung per pengguna
+    logger.info(f"Mengambil {limit} produk terbaik dekat lokasi [{user_lat}, {user_long}] dengan kategori: {category or 'Semua'}")
+    candidates = await get_top_rated_candidates_async(db, category, limit)
+    return rank_top_rated_candidates(fields, candidates, user_lat, user_long, limit, base_url)
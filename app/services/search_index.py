@@ -0,0 +1,233 @@
+import re
+import math
+import heapq
+import bisect
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Bobot setiap field saat menghitung relevansi
+SEARCH_FIELDS = {
+    "place_name": 3.0,
+    "kab_kota": 2.0,
+    "location": 1.5,
+    "description": 1.0,
+}
+
+# Kemiripan trigram minimum agar sebuah term dianggap salah ketik dari term query
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_MAX_EXPANSIONS = 5
+PREFIX_MAX_EXPANSIONS = 10
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+def normalize_text(value: Optional[str]) -> str:
+    """
+    Huruf kecil tanpa diakritik, agar 'Café' dan 'cafe' dianggap sama
+    """
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN_PATTERN.findall(normalize_text(value))
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+class SearchIndex:
+    """
+    Inverted index di memori untuk pencarian teks dengan toleransi salah ketik.
+
+    Setiap term menyimpan posting {nomor dokumen: bobot}, dengan bobot = jumlah bobot field
+    tempat term muncul. Relevansi dihitung sebagai bobot x IDF. Term query yang tidak ada
+    di kosakata dicocokkan ke term mirip lewat index trigram kosakata, dan term terakhir
+    juga dicocokkan sebagai prefix agar bisa dipakai saat pengguna masih mengetik.
+
+    Posting juga disimpan sebagai array NumPy per term (dibuat ulang saat term berubah),
+    sehingga skor semua dokumen diakumulasi dengan operasi vektor, bukan loop Python.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._documents: Dict[str, Dict[str, float]] = {}
+        self._doc_ids: List[str] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._trigram_terms: Dict[str, Set[str]] = defaultdict(set)
+        self._vocabulary: List[str] = []
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def _document_terms(product: Dict[str, Any]) -> Dict[str, float]:
+        terms: Dict[str, float] = defaultdict(float)
+        for field, weight in SEARCH_FIELDS.items():
+            for term in set(tokenize(product.get(field))):
+                terms[term] += weight
+        return dict(terms)
+
+    def _doc_number(self, id_serial: str) -> int:
+        number = self._doc_numbers.get(id_serial)
+        if number is None:
+            number = self._doc_numbers[id_serial] = len(self._doc_ids)
+            self._doc_ids.append(id_serial)
+        return number
+
+    def _add_term(self, term: str, number: int, weight: float, keep_sorted: bool = True):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = {}
+            if keep_sorted:
+                bisect.insort(self._vocabulary, term)
+            for gram in trigrams(term):
+                self._trigram_terms[gram].add(term)
+        postings[number] = weight
+        self._arrays.pop(term, None)
+
+    def _remove_document(self, id_serial: str):
+        terms = self._documents.pop(id_serial, None)
+        if not terms:
+            return
+        number = self._doc_numbers[id_serial]
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(number, None)
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    del self._vocabulary[index]
+                for gram in trigrams(term):
+                    members = self._trigram_terms.get(gram)
+                    if members is not None:
+                        members.discard(term)
+                        if not members:
+                            del self._trigram_terms[gram]
+
+    def build(self, products: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._postings, self._arrays, self._documents = {}, {}, {}
+            self._doc_ids, self._doc_numbers = [], {}
+            self._trigram_terms = defaultdict(set)
+            for product in products:
+                self._upsert(product, keep_sorted=False)
+            self._vocabulary = sorted(self._postings)
+            self.ready = True
+
+    def _upsert(self, product: Dict[str, Any], keep_sorted: bool = True):
+        id_serial = product["id_serial"]
+        self._remove_document(id_serial)
+        number = self._doc_number(id_serial)
+        terms = self._document_terms(product)
+        for term, weight in terms.items():
+            self._add_term(term, number, weight, keep_sorted)
+        self._documents[id_serial] = terms
+
+    def upsert(self, product: Dict[str, Any]):
+        with self._lock:
+            self._upsert(product)
+
+    def remove(self, id_serial: str):
+        with self._lock:
+            self._remove_document(id_serial)
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+
+    def _similar_terms(self, term: str) -> List[Tuple[str, float]]:
+        """
+        Term kosakata yang mirip secara trigram (koefisien Dice), dari yang paling mirip
+        """
+        grams = trigrams(term)
+        # Dice >= ambang butuh minimal sekian trigram yang sama; kandidat di bawahnya dilewati
+        shared = Counter(chain.from_iterable(self._trigram_terms.get(gram, ()) for gram in grams))
+        minimum = FUZZY_MIN_SIMILARITY * len(grams) / 2
+
+        scored = []
+        for candidate, count in shared.items():
+            if count < minimum:
+                continue
+            similarity = 2 * count / (len(grams) + len(candidate) + 2)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((candidate, similarity))
+        return heapq.nlargest(FUZZY_MAX_EXPANSIONS, scored, key=lambda item: item[1])
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """
+        Term kosakata berawalan `prefix` (yang terpendek lebih dulu), lewat bisect pada kosakata terurut
+        """
+        start = bisect.bisect_right(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff", lo=start)
+        candidates = self._vocabulary[start:min(end, start + PREFIX_MAX_EXPANSIONS * 5)]
+        return sorted(candidates, key=len)[:PREFIX_MAX_EXPANSIONS]
+
+    def _expand(self, term: str, is_last: bool) -> List[Tuple[str, float]]:
+        """
+        Term kosakata yang dipakai untuk satu term query beserta faktor penaltinya
+        """
+        expansions: Dict[str, float] = {}
+        if term in self._postings:
+            expansions[term] = 1.0
+        elif len(term) >= 3:
+            for candidate, similarity in self._similar_terms(term):
+                expansions[candidate] = similarity * 0.8
+        if is_last and len(term) >= 2:
+            # Pencocokan prefix untuk term yang mungkin belum selesai diketik
+            for candidate in self._prefix_terms(term):
+                expansions.setdefault(candidate, 0.7)
+        return list(expansions.items())
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """
+        Mencari produk yang relevan dengan query sebagai (id_serial, skor) terurut skor tertinggi.
+        Produk yang cocok dengan lebih banyak term query selalu diurutkan lebih dulu.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            total = max(len(self._documents), 1)
+            size = len(self._doc_ids)
+            scores = np.zeros(size)
+            matched = np.zeros(size, dtype=np.int32)
+            for position, term in enumerate(terms):
+                # Skor terbaik per dokumen di antara semua ekspansi term ini
+                best = np.zeros(size)
+                for candidate, factor in self._expand(term, position == len(terms) - 1):
+                    numbers, weights = self._posting_arrays(candidate)
+                    idf = math.log(1 + (total - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                    best[numbers] = np.maximum(best[numbers], weights * (idf * factor))
+                scores += best
+                matched += best > 0
+            doc_ids = self._doc_ids
+
+        candidates = np.flatnonzero(matched)
+        if len(candidates) == 0:
+            return []
+        # Kunci urut: jumlah term yang cocok, lalu skor
+        if len(candidates) > limit:
+            rank = matched[candidates] * (scores[candidates].max() + 1) + scores[candidates]
+            candidates = candidates[np.argpartition(-rank, limit - 1)[:limit]]
+        order = np.lexsort((-scores[candidates], -matched[candidates]))
+        return [(doc_ids[number], float(scores[number])) for number in candidates[order]]
+
+search_index = SearchIndex()
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+class _LeaderCancelled(Exception):
+    """
+    Request pemimpin dibatalkan (misalnya klien terputus) sebelum hasilnya siap
+    """
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Menggabungkan pemanggilan identik yang berjalan bersamaan menjadi satu eksekusi.
+
+    Pemanggil pertama untuk sebuah key (pemimpin) menjalankan fungsi; pemanggil lain dengan
+    key yang sama menunggu dan menerima hasil (atau exception) yang sama. Setelah selesai key
+    dilepas, jadi tidak ada hasil yang di-cache. Hasil dibagi ke semua pemanggil dan tidak
+    boleh diubah.
+
+    do() untuk kode sinkron di thread pool; do_async() untuk coroutine di event loop.
+    Jangan memakai do() dari event loop: penunggu akan memblokir loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, "asyncio.Future"] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # Dinaikkan setiap katalog berubah dan menjadi bagian key, sehingga pemanggilan yang
+        # dimulai setelah commit tidak menunggu eksekusi yang mungkin membaca data lama
+        self.generation = 0
+
+    def bump(self):
+        with self._lock:
+            self.generation += 1
+
+    def _count(self, name: str, shared: bool):
+        counters = self._counters.setdefault(name, {"calls": 0, "executions": 0, "shared": 0})
+        counters["calls"] += 1
+        counters["shared" if shared else "executions"] += 1
+
+    def do(self, name: str, key: Hashable, function: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(name, shared=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, name: str, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            future = self._tasks.get(key)
+            if future is None:
+                break
+            with self._lock:
+                self._count(name, shared=True)
+            try:
+                # shield: pembatalan penunggu tidak membatalkan pemimpin
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # Pemimpin dibatalkan; salah satu penunggu mengambil alih
+                continue
+
+        future = self._tasks[key] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._count(name, shared=False)
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._tasks[key]
+            # Exception yang tidak ditunggu siapa pun tidak perlu dilaporkan event loop
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    **counters,
+                    "in_flight": sum(1 for key in list(self._calls) + list(self._tasks) if key[0] == name),
+                    "coalesce_ratio": round(counters["shared"] / counters["calls"], 4) if counters["calls"] else None,
+                }
+                for name, counters in self._counters.items()
+            }
+
+single_flight = SingleFlight()
+
+def _key(name: str, signature: inspect.Signature, args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+    # Argumen di-bind ke signature agar pemanggilan posisional dan keyword menghasilkan key
+    # yang sama. Parameter pertama (session database) milik pemanggil dan tidak ikut
+    # menentukan hasil, baik dikirim posisional maupun sebagai db=...
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = list(bound.arguments.items())[1:]
+    return (name, single_flight.generation, repr(arguments))
+
+def coalesce(name: str):
+    """
+    Decorator single-flight untuk fungsi service sinkron dengan session sebagai argumen pertama
+    """
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs) -> T:
+            return single_flight.do(name, _key(name, signature, args, kwargs), lambda: function(*args, **kwargs))
+        return wrapper
+    return decorator
+
+def coalesce_async(name: str):
+    """
+    Decorator single-flight untuk fungsi service async dengan session sebagai argumen pertama
+    """
+    def decorator(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs) -> T:
+            return await single_flight.do_async(name, _key(name, signature, args, kwargs), lambda: function(*args, **kwargs))
+        return wrapper
+    return decorator
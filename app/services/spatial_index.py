@@ -0,0 +1,120 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Jarak lingkaran besar (km) antara dua koordinat
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class GridSpatialIndex:
+    """
+    Index spasial berbasis grid lat/lon berukuran tetap (mirip geohash).
+
+    Query radius hanya memeriksa sel yang beririsan dengan kotak pembatas radius,
+    sehingga biayanya sebanding dengan jumlah titik di sekitar, bukan seluruh katalog.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.1):
+        self.cell_size_deg = cell_size_deg
+        self._columns = int(round(360 / cell_size_deg))
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        self._points: Dict[str, Tuple[float, float, Tuple[int, int]]] = {}
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = int(math.floor((lat + 90) / self.cell_size_deg))
+        column = int(math.floor((lon + 180) / self.cell_size_deg)) % self._columns
+        return row, column
+
+    def build(self, points: Iterable[Tuple[str, float, float]]):
+        """
+        Membangun ulang index dari (id_serial, latitude, longitude)
+        """
+        cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        indexed: Dict[str, Tuple[float, float, Tuple[int, int]]] = {}
+        for id_serial, lat, lon in points:
+            lat, lon = float(lat), float(lon)
+            cell = self._cell(lat, lon)
+            cells.setdefault(cell, {})[id_serial] = (lat, lon)
+            indexed[id_serial] = (lat, lon, cell)
+        with self._lock:
+            self._cells, self._points = cells, indexed
+            self.ready = True
+
+    def upsert(self, id_serial: str, lat: float, lon: float):
+        with self._lock:
+            self._remove(id_serial)
+            lat, lon = float(lat), float(lon)
+            cell = self._cell(lat, lon)
+            self._cells.setdefault(cell, {})[id_serial] = (lat, lon)
+            self._points[id_serial] = (lat, lon, cell)
+
+    def remove(self, id_serial: str):
+        with self._lock:
+            self._remove(id_serial)
+
+    def _remove(self, id_serial: str):
+        point = self._points.pop(id_serial, None)
+        if point is None:
+            return
+        cell = point[2]
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(id_serial, None)
+            if not members:
+                del self._cells[cell]
+
+    def radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, str]]:
+        """
+        Semua titik dalam radius_km, sebagai (jarak_km, id_serial) terurut dari yang terdekat
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        min_row, min_column = self._cell(max(lat - lat_span, -90.0), lon - lon_span)
+        max_row, _ = self._cell(min(lat + lat_span, 90.0), lon + lon_span)
+        column_count = min(int(math.ceil(2 * lon_span / self.cell_size_deg)) + 1, self._columns)
+
+        results = []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for offset in range(column_count):
+                    members = self._cells.get((row, (min_column + offset) % self._columns))
+                    if not members:
+                        continue
+                    for id_serial, (point_lat, point_lon) in members.items():
+                        distance = haversine_km(lat, lon, point_lat, point_lon)
+                        if distance <= radius_km:
+                            results.append((distance, id_serial))
+        results.sort()
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius_km: Optional[float] = None) -> List[Tuple[float, str]]:
+        """
+        k titik terdekat, dengan memperbesar radius pencarian secara bertahap
+        """
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        radius_km = self.cell_size_deg * KM_PER_DEGREE
+        while True:
+            radius_km = min(radius_km, limit)
+            results = self.radius(lat, lon, radius_km)
+            # Semua titik dalam radius sudah ditemukan, jadi k teratas pasti benar
+            if len(results) >= k or radius_km >= limit:
+                return results[:k]
+            radius_km *= 2
+
+spatial_index = GridSpatialIndex()
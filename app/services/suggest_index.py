@@ -0,0 +1,296 @@
+import heapq
+import bisect
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.search_index import tokenize
+
+# Field produk yang menjadi sumber saran
+SUGGEST_TYPES = ("place_name", "category", "kab_kota")
+MAX_SUGGESTIONS = 20
+# Prefix sampai panjang ini punya daftar top-k yang dirawat terus; prefix yang lebih
+# panjang rentangnya kecil sehingga cukup dicari dengan bisect lalu di-cache
+PRECOMPUTED_DEPTH = 3
+SUGGEST_CACHE_SIZE = 4096
+
+_Suggestion = Tuple[str, str]
+
+class SuggestIndex:
+    """
+    Index prefix untuk autocomplete place_name, category dan kab_kota.
+
+    Setiap saran punya satu key per awal kata di array terurut, sehingga 'toba' juga
+    menemukan 'Danau Toba'. Bobot saran adalah rating untuk place_name dan jumlah rating
+    produk untuk category dan kab_kota.
+
+    Prefix pendek (rentangnya paling besar) punya daftar top-k yang diperbarui saat produk
+    berubah: kenaikan bobot cukup menyisipkan saran, sedangkan penurunan atau penghapusan
+    menghitung ulang daftar dari gabungan top-k prefix anaknya. Prefix yang lebih panjang
+    dicari dengan bisect dan hasilnya di-cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: List[Tuple[str, _Suggestion]] = []
+        self._display: Dict[_Suggestion, str] = {}
+        self._members: Dict[_Suggestion, Dict[str, float]] = {}
+        self._weights: Dict[_Suggestion, float] = {}
+        self._products: Dict[str, List[_Suggestion]] = {}
+        self._top: Dict[str, List[_Suggestion]] = {}
+        self._children: Dict[str, Set[str]] = defaultdict(set)
+        self._cache: "OrderedDict[Tuple[str, Optional[str]], List[_Suggestion]]" = OrderedDict()
+        self.ready = False
+
+    @staticmethod
+    def _word_keys(normalized: str) -> List[str]:
+        words = normalized.split(" ")
+        return [" ".join(words[index:]) for index in range(len(words))]
+
+    @classmethod
+    def _short_prefixes(cls, normalized: str) -> Set[str]:
+        return {
+            key[:length]
+            for key in cls._word_keys(normalized)
+            for length in range(1, min(PRECOMPUTED_DEPTH, len(key)) + 1)
+        }
+
+    def _rank(self, suggestion: _Suggestion):
+        return (-self._weights[suggestion], len(suggestion[1]), suggestion)
+
+    def _range(self, prefix: str) -> Set[_Suggestion]:
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + "\uffff",), lo=start)
+        return {suggestion for _, suggestion in self._keys[start:end]}
+
+    def _exact(self, key: str) -> Set[_Suggestion]:
+        start = bisect.bisect_left(self._keys, (key,))
+        end = bisect.bisect_left(self._keys, (key + "\x00",), lo=start)
+        return {suggestion for _, suggestion in self._keys[start:end]}
+
+    def _direct(self, prefix: str) -> Set[_Suggestion]:
+        """
+        Saran milik prefix itu sendiri: seluruh rentang di kedalaman maksimum,
+        atau key yang sama persis untuk prefix yang lebih pendek
+        """
+        if len(prefix) >= PRECOMPUTED_DEPTH:
+            return self._range(prefix)
+        return self._exact(prefix)
+
+    def _matches(self, prefix: str) -> Set[_Suggestion]:
+        """
+        Saran yang cocok dengan prefix query. Spasi di akhir berarti kata terakhir sudah
+        lengkap, jadi 'alam ' mencakup key 'alam' itu sendiri selain 'alam ...'
+        """
+        matches = self._range(prefix)
+        if prefix.endswith(" "):
+            matches |= self._exact(prefix[:-1])
+        return matches
+
+    def _set_top(self, prefix: str, suggestions: Iterable[_Suggestion]):
+        top = heapq.nsmallest(MAX_SUGGESTIONS, set(suggestions), key=self._rank)
+        if top:
+            self._top[prefix] = top
+            if len(prefix) > 1:
+                self._children[prefix[:-1]].add(prefix)
+        else:
+            self._top.pop(prefix, None)
+            if len(prefix) > 1:
+                self._children[prefix[:-1]].discard(prefix)
+
+    def _recompute(self, prefix: str):
+        candidates = set(self._direct(prefix))
+        for child in self._children.get(prefix, ()):
+            candidates.update(self._top.get(child, ()))
+        self._set_top(prefix, candidates)
+
+    def _cached_prefixes(self, suggestion: _Suggestion):
+        """
+        Entri cache yang bisa memuat saran ini: awalan setiap key-nya (termasuk key diikuti
+        spasi) dengan filter jenis saran itu sendiri, atau tanpa filter untuk awalan yang
+        tidak punya daftar top-k
+        """
+        for key in self._word_keys(suggestion[1]):
+            for prefix in [key[:length] for length in range(1, len(key) + 1)] + [key + " "]:
+                if len(prefix) <= PRECOMPUTED_DEPTH and not prefix.endswith(" "):
+                    types = (suggestion[0],)
+                else:
+                    types = (None, suggestion[0])
+                for suggestion_type in types:
+                    cache_key = (prefix, suggestion_type)
+                    if cache_key in self._cache:
+                        yield cache_key
+
+    def _raise_weight(self, suggestion: _Suggestion):
+        """
+        Bobot saran naik atau saran baru: sisipkan ke daftar top-k prefix pendek dan ke
+        hasil cache yang cocok, tanpa menghitung ulang
+        """
+        rank = self._rank(suggestion)
+        lists = [(prefix, self._top.get(prefix)) for prefix in self._short_prefixes(suggestion[1])]
+        lists += [(None, self._cache[cache_key]) for cache_key in set(self._cached_prefixes(suggestion))]
+        for prefix, top in lists:
+            if top is None:
+                self._set_top(prefix, [suggestion])
+            elif suggestion in top:
+                top.sort(key=self._rank)
+            elif len(top) < MAX_SUGGESTIONS or rank < self._rank(top[-1]):
+                bisect.insort(top, suggestion, key=self._rank)
+                del top[MAX_SUGGESTIONS:]
+
+    def _lower_weight(self, suggestion: _Suggestion):
+        """
+        Bobot saran turun atau saran dihapus: daftar yang memuatnya mungkin kehilangan
+        saran pengganti dari luar top-k. Daftar top-k dihitung ulang dari prefix terpanjang
+        agar prefix induk memakai daftar anak yang sudah benar; hasil cache dibuang.
+        """
+        for prefix in sorted(self._short_prefixes(suggestion[1]), key=len, reverse=True):
+            if suggestion in self._top.get(prefix, ()):
+                self._recompute(prefix)
+        for cache_key in set(self._cached_prefixes(suggestion)):
+            if suggestion in self._cache[cache_key]:
+                del self._cache[cache_key]
+
+    def _refresh_weight(self, suggestion: _Suggestion):
+        members = self._members[suggestion]
+        if suggestion[0] == "place_name":
+            self._weights[suggestion] = max(members.values())
+        else:
+            self._weights[suggestion] = sum(members.values())
+
+    def _attach(self, suggestion: _Suggestion, display: str, id_serial: str, rating: float, incremental: bool):
+        members = self._members.get(suggestion)
+        if members is None:
+            members = self._members[suggestion] = {}
+            self._display[suggestion] = display
+            self._weights[suggestion] = 0.0
+            for key in self._word_keys(suggestion[1]):
+                if incremental:
+                    bisect.insort(self._keys, (key, suggestion))
+                else:
+                    self._keys.append((key, suggestion))
+        if members.get(id_serial) == rating:
+            return
+        previous = self._weights[suggestion]
+        if suggestion[0] == "place_name":
+            members[id_serial] = rating
+            self._refresh_weight(suggestion)
+        else:
+            self._weights[suggestion] += rating - members.get(id_serial, 0.0)
+            members[id_serial] = rating
+        if incremental:
+            if self._weights[suggestion] >= previous:
+                self._raise_weight(suggestion)
+            else:
+                self._lower_weight(suggestion)
+
+    def _detach(self, suggestion: _Suggestion, id_serial: str):
+        members = self._members.get(suggestion)
+        if members is None or members.pop(id_serial, None) is None:
+            return
+        if members:
+            self._refresh_weight(suggestion)
+            self._lower_weight(suggestion)
+            return
+        for key in self._word_keys(suggestion[1]):
+            index = bisect.bisect_left(self._keys, (key, suggestion))
+            if index < len(self._keys) and self._keys[index] == (key, suggestion):
+                del self._keys[index]
+        self._lower_weight(suggestion)
+        del self._members[suggestion], self._weights[suggestion], self._display[suggestion]
+
+    def _upsert(self, product: Dict[str, Any], incremental: bool = True):
+        id_serial = product["id_serial"]
+        rating = float(product.get("rating") or 0)
+        suggestions: Dict[_Suggestion, str] = {}
+        for suggestion_type in SUGGEST_TYPES:
+            display = (product.get(suggestion_type) or "").strip()
+            normalized = " ".join(tokenize(display))
+            if normalized:
+                suggestions[(suggestion_type, normalized)] = display
+
+        # Saran yang tetap dimiliki produk hanya berubah bobotnya, tidak dilepas lalu dipasang lagi
+        for suggestion in self._products.get(id_serial, ()):
+            if suggestion not in suggestions:
+                self._detach(suggestion, id_serial)
+        for suggestion, display in suggestions.items():
+            self._attach(suggestion, display, id_serial, rating, incremental)
+        self._products[id_serial] = list(suggestions)
+
+    def _remove_product(self, id_serial: str):
+        for suggestion in self._products.pop(id_serial, []):
+            self._detach(suggestion, id_serial)
+
+    def build(self, products: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._keys, self._display, self._members, self._weights, self._products = [], {}, {}, {}, {}
+            self._top, self._children = {}, defaultdict(set)
+            self._cache.clear()
+            for product in products:
+                self._upsert(product, incremental=False)
+            self._keys.sort()
+
+            # Kelompokkan key per prefix terpanjang, lalu susun top-k dari bawah ke atas
+            direct: Dict[str, List[_Suggestion]] = defaultdict(list)
+            for key, suggestion in self._keys:
+                direct[key[:PRECOMPUTED_DEPTH]].append(suggestion)
+            by_length: Dict[int, Set[str]] = defaultdict(set)
+            for prefix in direct:
+                for length in range(1, len(prefix) + 1):
+                    by_length[length].add(prefix[:length])
+            for length in range(PRECOMPUTED_DEPTH, 0, -1):
+                for prefix in by_length[length]:
+                    candidates = set(direct.get(prefix, ()))
+                    for child in self._children.get(prefix, ()):
+                        candidates.update(self._top[child])
+                    self._set_top(prefix, candidates)
+            self.ready = True
+
+    def upsert(self, product: Dict[str, Any]):
+        with self._lock:
+            self._upsert(product)
+
+    def remove(self, id_serial: str):
+        with self._lock:
+            self._remove_product(id_serial)
+
+    def _item(self, suggestion: _Suggestion) -> Dict[str, Any]:
+        return {
+            "text": self._display[suggestion],
+            "type": suggestion[0],
+            "weight": round(self._weights[suggestion], 2),
+            "count": len(self._members[suggestion]),
+        }
+
+    def suggest(self, prefix: str, limit: int = 10, suggestion_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Saran dengan awalan kata `prefix`, terurut bobot tertinggi
+        """
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        normalized = " ".join(tokens)
+        # Spasi di akhir berarti kata terakhir sudah lengkap
+        if prefix[-1:].isspace():
+            normalized += " "
+
+        with self._lock:
+            # Daftar top-k hanya memuat rentang prefix, tanpa key yang sama dengan kata lengkapnya
+            if len(normalized) <= PRECOMPUTED_DEPTH and suggestion_type is None and not normalized.endswith(" "):
+                top = self._top.get(normalized, [])
+            else:
+                cache_key = (normalized, suggestion_type)
+                top = self._cache.get(cache_key)
+                if top is None:
+                    matches = [
+                        suggestion for suggestion in self._matches(normalized)
+                        if suggestion_type is None or suggestion[0] == suggestion_type
+                    ]
+                    top = self._cache[cache_key] = heapq.nsmallest(MAX_SUGGESTIONS, matches, key=self._rank)
+                    while len(self._cache) > SUGGEST_CACHE_SIZE:
+                        self._cache.popitem(last=False)
+                else:
+                    self._cache.move_to_end(cache_key)
+            return [self._item(suggestion) for suggestion in top[:limit]]
+
+suggest_index = SuggestIndex()
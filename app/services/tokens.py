@@ -0,0 +1,203 @@
+import os
+import time
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TOKEN_ALGORITHM = "HS256"
+TOKEN_ISSUER = os.getenv("ACCESS_TOKEN_ISSUER", "wisata-api")
+ACCESS_TOKEN_TTL_SECONDS = int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "3600"))
+TOKEN_CACHE_SIZE = int(os.getenv("ACCESS_TOKEN_CACHE_SIZE", "10000"))
+# Role yang boleh membuat, mengubah, mengimpor dan menghapus produk
+# Role yang boleh membaca statistik internal autentikasi (kunci token, pool hash password)
+METRICS_ROLES = [role.strip() for role in os.getenv("METRICS_ROLES", "admin").split(",") if role.strip()]
+# Hanya untuk pengembangan lokal: izinkan kunci acak per proses bila tidak ada kunci yang diatur
+ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY = os.getenv("ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY", "false").lower() == "true"
+PRODUCT_WRITE_ROLES = [role.strip() for role in os.getenv("PRODUCT_WRITE_ROLES", "admin").split(",") if role.strip()]
+
+class InvalidTokenError(Exception):
+    pass
+
+def parse_roles(roles: Optional[str]) -> List[str]:
+    """
+    Kolom roles di tabel user berisi satu role atau beberapa role dipisah koma
+    """
+    return [role.strip() for role in (roles or "").split(",") if role.strip()]
+
+def _load_keys() -> Tuple[Dict[str, str], str]:
+    """
+    Kunci penandatangan dari ACCESS_TOKEN_KEYS ("kid1:secret1,kid2:secret2") dengan kunci aktif
+    ACCESS_TOKEN_ACTIVE_KID, atau satu kunci dari ACCESS_TOKEN_SECRET.
+
+    Rotasi: tambahkan kunci baru dan jadikan aktif, biarkan kunci lama tetap terdaftar
+    sampai token lama kedaluwarsa (ACCESS_TOKEN_TTL_SECONDS), lalu hapus.
+    """
+    keys = {}
+    for item in os.getenv("ACCESS_TOKEN_KEYS", "").split(","):
+        kid, separator, secret = item.strip().partition(":")
+        if separator and kid and secret:
+            keys[kid] = secret
+    if not keys and os.getenv("ACCESS_TOKEN_SECRET"):
+        keys["default"] = os.getenv("ACCESS_TOKEN_SECRET")
+    if not keys:
+        # Kunci acak per proses membuat token dari worker lain atau sebelum restart ditolak
+        if not ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY:
+            raise ValueError(
+                "ACCESS_TOKEN_KEYS atau ACCESS_TOKEN_SECRET harus diatur "
+                "(atau ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY=true untuk pengembangan lokal)"
+            )
+        logger.warning("ACCESS_TOKEN_KEYS tidak diatur, memakai kunci acak: token tidak berlaku setelah restart atau di proses lain")
+        keys["ephemeral"] = secrets.token_urlsafe(32)
+
+    active_kid = os.getenv("ACCESS_TOKEN_ACTIVE_KID") or next(iter(keys))
+    if active_kid not in keys:
+        raise ValueError(f"ACCESS_TOKEN_ACTIVE_KID {active_kid} tidak ada di ACCESS_TOKEN_KEYS")
+    return keys, active_kid
+
+class TokenService:
+    """
+    Menerbitkan dan memverifikasi access token JWT (HS256) dengan kid di header.
+
+    Token yang sudah diverifikasi disimpan di cache LRU sampai waktu exp-nya, sehingga
+    request berikutnya dengan token yang sama tidak menghitung ulang HMAC maupun
+    menyentuh database.
+    """
+
+    def __init__(self, ttl_seconds: int = ACCESS_TOKEN_TTL_SECONDS, cache_size: int = TOKEN_CACHE_SIZE):
+        self._keys: Optional[Tuple[Dict[str, str], str]] = None
+        self._keys_lock = threading.Lock()
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "rejected": 0}
+
+    def load_keys(self) -> Tuple[Dict[str, str], str]:
+        """
+        Memuat kunci penandatangan sekali. Dipanggil di lifespan agar konfigurasi kunci yang
+        tidak ada menggagalkan startup dengan pesan yang jelas, bukan saat import modul.
+        """
+        with self._keys_lock:
+            if self._keys is None:
+                self._keys = _load_keys()
+            return self._keys
+
+    @property
+    def keys(self) -> Dict[str, str]:
+        return self.load_keys()[0]
+
+    @property
+    def active_kid(self) -> str:
+        return self.load_keys()[1]
+
+    def issue(self, user_id: int, username: str, roles: List[str]) -> Dict[str, Any]:
+        now = int(time.time())
+        claims = {
+            "sub": str(user_id),
+            "username": username,
+            "roles": roles,
+            "iss": TOKEN_ISSUER,
+            "iat": now,
+            "exp": now + self.ttl_seconds,
+        }
+        token = jwt.encode(claims, self.keys[self.active_kid], algorithm=TOKEN_ALGORITHM, headers={"kid": self.active_kid})
+        return {"access_token": token, "token_type": "bearer", "expires_in": self.ttl_seconds}
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            secret = self.keys.get(kid)
+            if secret is None:
+                raise InvalidTokenError("Kunci token tidak dikenal")
+            return jwt.decode(
+                token, secret, algorithms=[TOKEN_ALGORITHM], issuer=TOKEN_ISSUER,
+                options={"require": ["exp", "iat", "sub"]}
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Mengembalikan claims token yang valid, atau InvalidTokenError
+        """
+        now = time.time()
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims is not None:
+                if claims["exp"] > now:
+                    self._cache.move_to_end(token)
+                    self._counters["hits"] += 1
+                    return claims
+                del self._cache[token]
+            self._counters["misses"] += 1
+
+        try:
+            claims = self._decode(token)
+        except InvalidTokenError:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise
+
+        with self._lock:
+            self._cache[token] = claims
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        keys, active_kid = self.load_keys()
+        with self._lock:
+            return {"entries": len(self._cache), "active_kid": active_kid, "kids": sorted(keys), **self._counters}
+
+token_service = TokenService()
+
+_bearer = HTTPBearer(auto_error=False)
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Dict[str, Any]:
+    """
+    Dependency untuk route yang butuh login: claims dari header Authorization: Bearer <token>
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token akses diperlukan",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return token_service.verify(credentials.credentials)
+    except InvalidTokenError as e:
+        logger.warning(f"Token ditolak: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token akses tidak valid atau kedaluwarsa",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+def require_roles(*roles: str) -> Callable[..., Dict[str, Any]]:
+    """
+    Dependency yang hanya meloloskan token dengan salah satu role yang diberikan
+    """
+    allowed = set(roles)
+
+    def dependency(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+        if not allowed.intersection(user.get("roles") or []):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Anda tidak memiliki izin untuk aksi ini"
+            )
+        return user
+
+    return dependency
+
+require_product_writer = require_roles(*PRODUCT_WRITE_ROLES)
+require_metrics_reader = require_roles(*METRICS_ROLES)
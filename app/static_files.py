@@ -0,0 +1,145 @@
+import os
+import stat
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = "app/asset"
+# Semua file di app/asset bernama unik (hash isi, timestamp_uuid, atau varian turunannya),
+# sehingga isinya tidak pernah berubah untuk URL yang sama
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=31536000, immutable")
+STATIC_INDEX_MAX_SIZE = int(os.getenv("STATIC_INDEX_MAX_SIZE", "50000"))
+# File yang dihapus proses lain baru diketahui setelah entri index kedaluwarsa
+STATIC_INDEX_TTL = float(os.getenv("STATIC_INDEX_TTL", "60"))
+
+_Entry = Tuple[float, str, os.stat_result, str]
+
+def _etag(relative_path: str, stat_result: os.stat_result) -> str:
+    name = os.path.splitext(os.path.basename(relative_path))[0]
+    if relative_path.startswith("sha256/") and len(name) == 64:
+        # Nama blob adalah sha256 isinya, jadi bisa langsung menjadi strong ETag
+        return f'"{name}"'
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles untuk app/asset dengan index metadata file di memori.
+
+    Path, stat_result dan ETag setiap file disimpan (LRU, dengan TTL) sehingga request
+    berikutnya tidak perlu stat ke disk. Respons membawa Cache-Control immutable;
+    If-None-Match, Range dan pathsend/sendfile ditangani FileResponse.
+    """
+
+    def __init__(self, *args, max_entries: int = STATIC_INDEX_MAX_SIZE, ttl_seconds: float = STATIC_INDEX_TTL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._index: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def _get(self, path: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._index.get(path)
+            if entry is None or entry[0] <= time.monotonic():
+                self._counters["misses"] += 1
+                return None
+            self._index.move_to_end(path)
+            self._counters["hits"] += 1
+            return entry
+
+    def _put(self, path: str, full_path: str, stat_result: os.stat_result, now: Optional[float] = None) -> _Entry:
+        entry = ((now or time.monotonic()) + self.ttl_seconds, full_path, stat_result, _etag(path, stat_result))
+        with self._lock:
+            self._index[path] = entry
+            self._index.move_to_end(path)
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+        return entry
+
+    def forget(self, filename_path: str):
+        """
+        Membuang entri index untuk file yang dihapus (path relatif atau path app/asset/...)
+        """
+        relative_path = filename_path.replace('\\', '/').replace(STATIC_ROOT + '/', '', 1)
+        with self._lock:
+            self._index.pop(relative_path, None)
+
+    def preload(self) -> int:
+        """
+        Mengisi index dari isi folder saat startup, sampai kapasitas maksimum
+        """
+        root = os.path.realpath(self.directory)
+        now = time.monotonic()
+        loaded = 0
+        stack = [root]
+        while stack and loaded < self.max_entries:
+            try:
+                entries = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(".tmp"):
+                        relative_path = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                        self._put(relative_path, entry.path, entry.stat(follow_symlinks=False), now)
+                        loaded += 1
+                        if loaded >= self.max_entries:
+                            break
+        logger.info(f"Index file statis dimuat: {loaded} file")
+        return loaded
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+
+        entry = self._get(path)
+        if entry is None:
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except (OSError, ValueError):
+                raise HTTPException(status_code=404)
+            if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+                raise HTTPException(status_code=404)
+            entry = self._put(path, full_path, stat_result)
+
+        _, full_path, stat_result, etag = entry
+        return self.file_response(full_path, stat_result, scope, etag=etag)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200, etag: Optional[str] = None) -> Response:
+        headers = {"cache-control": STATIC_CACHE_CONTROL}
+        if etag:
+            headers["etag"] = etag
+        response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._index),
+                "max_entries": self.max_entries,
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / total, 4) if total else None,
+            }
+
+static_files = CachedStaticFiles(directory=STATIC_ROOT)
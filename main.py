@@ -1,17 +1,68 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware  # Tambahkan import ini
 import os
+import logging
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 import urllib.request
-from app.routes import user, products
+from app.routes import user, products, metrics
+from app.database import warm_up_pools, async_engine, engine, SessionLocal
+from app.services.products import load_catalog
+from app.services.image_variants import shutdown_executor
+from app.services.job_queue import job_queue
+from app.services.passwords import password_hasher
+from app.services.tokens import token_service
+from app.services import asset_gc
+from app.static_files import static_files
+from app.rate_limit import RateLimitMiddleware
+from app.request_metrics import RequestMetricsMiddleware
+
+logger = logging.getLogger(__name__)
+
+def warm_up_catalog():
+    """
+    Memuat katalog produk beserta gambarnya ke catalog cache
+    """
+    db = SessionLocal()
+    try:
+        catalog = load_catalog(db)
+        logger.info(f"Catalog cache siap dengan {len(catalog)} produk")
+    except Exception as e:
+        logger.warning(f"Gagal memuat katalog saat startup: {str(e)}")
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Gagal startup bila ACCESS_TOKEN_KEYS/ACCESS_TOKEN_SECRET belum diatur
+    token_service.load_keys()
+    # Buka koneksi minimum di pool sebelum menerima request
+    await warm_up_pools()
+    await run_in_threadpool(warm_up_catalog)
+    await run_in_threadpool(static_files.preload)
+    # Worker untuk pekerjaan setelah commit (hapus file, buat varian gambar)
+    job_queue.start()
+    asset_gc.start_scheduler()
+    yield
+    asset_gc.stop_scheduler()
+    await run_in_threadpool(job_queue.stop)
+    shutdown_executor()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    engine.dispose()
 
 app = FastAPI(
     title="FastAPI Authentication Aplikasi Wisata Bank Sumut",
     description="API untuk Data Wisata dengan PostgreSQL",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Batasi laju request per grup route sebelum menyentuh route dan database.
+# Ditambahkan sebelum CORS sehingga berada di dalamnya: respons 429 tetap membawa header CORS.
+app.add_middleware(RateLimitMiddleware)
+
 # Tambahkan middleware CORS setelah inisialisasi app
 app.add_middleware(
     CORSMiddleware,
@@ -21,12 +72,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Middleware terluar: latensi yang dicatat mencakup CORS dan rate limit
+app.add_middleware(RequestMetricsMiddleware)
+
 # Menyajikan folder assets sebagai file statis
-app.mount("/static", StaticFiles(directory="app/asset"), name="static")
+app.mount("/static", static_files, name="static")
 
 # Daftarkan router
 app.include_router(user.router, prefix="/auth", tags=["Authentication"])
 app.include_router(products.router, prefix="/products", tags=["Products"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
 # Root Endpoint
 @app.get("/")
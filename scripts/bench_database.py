@@ -0,0 +1,78 @@
+import time
+import asyncio
+import logging
+import argparse
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal, AsyncSessionLocal, get_pool_stats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+async def _run_requests(handler, requests: int, concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request():
+        async with slots:
+            await handler()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    return time.perf_counter() - started
+
+async def benchmark_concurrency(query: str, requests: int, concurrency: int):
+    """
+    Membandingkan throughput route async yang menjalankan query yang sama ke database lewat
+    SessionLocal di dalam async def (memblokir event loop), SessionLocal di thread pool, dan
+    AsyncSessionLocal (menunggu tanpa memblokir, dibatasi ukuran pool)
+    """
+    statement = text(query)
+
+    def sync_query():
+        with SessionLocal() as db:
+            db.execute(statement).fetchall()
+
+    async def blocking_query():
+        sync_query()
+
+    async def threadpool_query():
+        await run_in_threadpool(sync_query)
+
+    async def async_query():
+        async with AsyncSessionLocal() as db:
+            (await db.execute(statement)).fetchall()
+
+    # Satu query per jalur sebelum diukur agar pembukaan koneksi pertama tidak ikut dihitung
+    sync_query()
+    await async_query()
+
+    for name, handler, pool in (
+        ("sync di event loop", blocking_query, "sync"),
+        ("sync di thread pool", threadpool_query, "sync"),
+        ("async", async_query, "async"),
+    ):
+        before = get_pool_stats()[pool]
+        elapsed = await _run_requests(handler, requests, concurrency)
+        after = get_pool_stats()[pool]
+        # Statistik pool kumulatif; selisihnya adalah waktu tunggu koneksi selama run ini
+        wait = after["wait_seconds_total"] - before["wait_seconds_total"]
+        checkouts = max(after["checkouts"] - before["checkouts"], 1)
+        logger.info(
+            f"{name}: {requests} request (konkurensi {concurrency}) dalam {elapsed:.2f} detik = "
+            f"{requests / elapsed:.1f} request/detik, rata-rata tunggu pool {wait / checkouts * 1000:.1f} ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark throughput query sync vs async terhadap database di DATABASE_URL"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Jumlah request")
+    parser.add_argument("--concurrency", type=int, default=50, help="Request yang berjalan bersamaan")
+    parser.add_argument(
+        "--query", default="SELECT * FROM get_all_products()",
+        help="Query yang dijalankan setiap request, misalnya 'SELECT pg_sleep(0.05)'"
+    )
+    args = parser.parse_args()
+    asyncio.run(benchmark_concurrency(args.query, args.requests, args.concurrency))
@@ -0,0 +1,37 @@
+import os
+import time
+import logging
+import argparse
+
+from app.services.passwords import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PasswordHasher, _hash, _verify
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def benchmark(logins: int, rounds: int, workers: int):
+    """
+    Mengukur verifikasi password (login) per detik dan per core dengan pool yang sama
+    """
+    hasher = PasswordHasher(workers=workers, rounds=rounds, max_pending=logins)
+    hashed = _hash("benchmark-password", rounds)
+    started = time.perf_counter()
+    futures = [hasher._submit("verified", _verify, "benchmark-password", hashed, rounds) for _ in range(logins)]
+    assert all(future.result()[0] for future in futures)
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    rate = logins / elapsed
+    cores = min(workers, os.cpu_count() or 1)
+    logger.info(
+        f"bcrypt cost {rounds}, {workers} worker: {logins} login dalam {elapsed:.2f} detik = "
+        f"{rate:.1f} login/detik, {rate / cores:.1f} login/detik/core"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark verifikasi password bcrypt di thread pool")
+    parser.add_argument("--logins", type=int, default=100, help="Jumlah verifikasi")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[BCRYPT_ROUNDS], help="Cost bcrypt yang diukur")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS, help="Jumlah thread worker")
+    args = parser.parse_args()
+    for rounds in args.rounds:
+        benchmark(args.logins, rounds, args.workers)
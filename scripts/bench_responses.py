@@ -0,0 +1,56 @@
+import time
+import logging
+import argparse
+from datetime import time as time_of_day
+from decimal import Decimal
+from typing import Any, Dict, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.responses import ProductJSONResponse
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _synthetic_products(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id_serial": f"P{number:06d}", "user_id": 1, "category": "Alam", "place_name": f"Tempat Wisata {number}",
+            "rating": 4.5, "price": Decimal("25000.00"), "stock": 10, "description": "Deskripsi tempat wisata " * 4,
+            "open_time": time_of_day(8, 0), "close_time": time_of_day(17, 30), "location": "Jl. Contoh No. 1",
+            "latitude": Decimal("-6.914744"), "longitude": Decimal("107.609810"), "kab_kota": "Bandung",
+            "detail_images": [{"id": number, "filename": "a.jpg", "filename_path": "app/asset/detail_image/a.jpg", "file_url": "http://localhost/static/detail_image/a.jpg"}],
+            "display_images": [],
+        }
+        for number in range(count)
+    ]
+
+def benchmark(sizes: List[int], repeat: int):
+    """
+    Membandingkan waktu serialisasi daftar produk: jsonable_encoder + JSONResponse (jalur
+    default FastAPI) dengan ProductJSONResponse
+    """
+    for size in sizes:
+        content = {"message": "Berhasil mengambil semua produk", "data": _synthetic_products(size)}
+        assert orjson.loads(ProductJSONResponse(content).body) == orjson.loads(JSONResponse(jsonable_encoder(content)).body)
+
+        timings = {}
+        for name, render in (
+            ("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(content))),
+            ("ProductJSONResponse", lambda: ProductJSONResponse(content)),
+        ):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                render()
+            timings[name] = (time.perf_counter() - started) / repeat * 1000
+            logger.info(f"{size} produk, {name}: {timings[name]:.2f} ms")
+        logger.info(f"{size} produk: {timings['jsonable_encoder + JSONResponse'] / timings['ProductJSONResponse']:.1f}x lebih cepat")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark serialisasi payload produk")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Jumlah produk per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Pengulangan per ukuran")
+    args = parser.parse_args()
+    benchmark(args.sizes, args.repeat)
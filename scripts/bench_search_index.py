@@ -0,0 +1,57 @@
+import time
+import random
+import logging
+import argparse
+from typing import Any, Dict, List
+
+from app.services.search_index import SearchIndex
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WORDS = [
+    "danau", "pantai", "air", "terjun", "bukit", "gunung", "taman", "kebun", "museum", "pemandian",
+    "hutan", "pinus", "goa", "sungai", "pulau", "desa", "wisata", "batu", "indah", "sejuk",
+]
+KAB_KOTA = ["Medan", "Toba", "Samosir", "Karo", "Deli Serdang", "Simalungun", "Nias", "Sibolga"]
+QUERIES = ["danau toba", "air terjun sejuk", "pantia indah", "gunung sibayak", "museum medan", "pemand", "huttan pinus"]
+
+def _synthetic_products(count: int) -> List[Dict[str, Any]]:
+    generator = random.Random(7)
+    return [
+        {
+            "id_serial": f"P{number:06d}",
+            "place_name": " ".join(generator.sample(WORDS, 2)) + f" {number}",
+            "kab_kota": generator.choice(KAB_KOTA),
+            "location": f"Jl. {generator.choice(WORDS).title()} No. {generator.randrange(1, 200)}",
+            "description": " ".join(generator.choices(WORDS, k=12)),
+        }
+        for number in range(count)
+    ]
+
+def benchmark(products: int, repeat: int, limit: int):
+    """
+    Waktu build index dan latensi query (termasuk salah ketik dan prefix) pada katalog sintetis
+    """
+    catalog = _synthetic_products(products)
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.build(catalog)
+    logger.info(f"build {products} produk: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(query, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        logger.info(f"'{query}': p50 {timings[len(timings) // 2]:.2f} ms, maks {timings[-1]:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark latensi pencarian teks di index inverted")
+    parser.add_argument("--products", type=int, default=100_000, help="Jumlah produk sintetis")
+    parser.add_argument("--repeat", type=int, default=20, help="Pengulangan per query")
+    parser.add_argument("--limit", type=int, default=20, help="Jumlah hasil per query")
+    args = parser.parse_args()
+    benchmark(args.products, args.repeat, args.limit)
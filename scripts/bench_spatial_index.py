@@ -0,0 +1,55 @@
+import time
+import random
+import logging
+import argparse
+from typing import List, Tuple
+
+from app.services.spatial_index import GridSpatialIndex, haversine_km
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def benchmark(points: int, queries: int, radius_km: float, k: int):
+    """
+    Membandingkan query radius dan k terdekat di index grid dengan pemindaian seluruh titik
+    """
+    generator = random.Random(42)
+    # Titik sintetis tersebar di sekitar wilayah Indonesia
+    coordinates = [(f"P{number}", generator.uniform(-11, 6), generator.uniform(95, 141)) for number in range(points)]
+    centers = [(generator.uniform(-11, 6), generator.uniform(95, 141)) for _ in range(queries)]
+
+    started = time.perf_counter()
+    index = GridSpatialIndex()
+    index.build(coordinates)
+    logger.info(f"build {points} titik: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def brute_force(lat: float, lon: float) -> List[Tuple[float, str]]:
+        distances = [(haversine_km(lat, lon, point_lat, point_lon), id_serial) for id_serial, point_lat, point_lon in coordinates]
+        distances.sort()
+        return distances
+
+    for name, indexed, scanned in (
+        (f"radius {radius_km:g} km", lambda lat, lon: index.radius(lat, lon, radius_km),
+         lambda lat, lon: [item for item in brute_force(lat, lon) if item[0] <= radius_km]),
+        (f"{k} terdekat", lambda lat, lon: index.nearest(lat, lon, k), lambda lat, lon: brute_force(lat, lon)[:k]),
+    ):
+        started = time.perf_counter()
+        index_results = [indexed(lat, lon) for lat, lon in centers]
+        index_ms = (time.perf_counter() - started) * 1000 / queries
+
+        started = time.perf_counter()
+        scan_results = [scanned(lat, lon) for lat, lon in centers]
+        scan_ms = (time.perf_counter() - started) * 1000 / queries
+
+        assert [[id_serial for _, id_serial in result] for result in index_results] == \
+            [[id_serial for _, id_serial in result] for result in scan_results]
+        logger.info(f"{name}: index {index_ms:.3f} ms/query, brute force {scan_ms:.3f} ms/query ({scan_ms / index_ms:.0f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark index spasial grid vs brute force")
+    parser.add_argument("--points", type=int, default=100_000, help="Jumlah titik sintetis")
+    parser.add_argument("--queries", type=int, default=20, help="Jumlah query per jenis")
+    parser.add_argument("--radius-km", type=float, default=10, help="Radius query")
+    parser.add_argument("--k", type=int, default=10, help="Jumlah titik terdekat")
+    args = parser.parse_args()
+    benchmark(args.points, args.queries, args.radius_km, args.k)
@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+from app.services import asset_gc
+from app.services.image_variants import variant_paths
+
+@pytest.fixture
+def asset_tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = "app/asset/display_image"
+    os.makedirs(folder)
+    monkeypatch.setattr(asset_gc, "SOURCE_FOLDERS", (folder, "app/asset/detail_image", "app/asset/sha256"))
+    return folder
+
+def _touch(path: str, age_seconds: float = 0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as output:
+        output.write(b"x" * 10)
+    moment = time.time() - age_seconds
+    os.utime(path, (moment, moment))
+
+def test_find_orphans_skips_referenced_files_and_their_variants(asset_tree):
+    kept = f"{asset_tree}/kept.jpg"
+    orphan = f"{asset_tree}/orphan.jpg"
+    _touch(kept, age_seconds=7200)
+    _touch(orphan, age_seconds=7200)
+    for path in variant_paths(kept) + variant_paths(orphan)[:1]:
+        _touch(path, age_seconds=7200)
+
+    result = asset_gc.find_orphans({kept}, grace_seconds=3600)
+
+    assert sorted(path for path, _ in result["orphans"]) == sorted([orphan, variant_paths(orphan)[0]])
+    assert result["scanned_files"] == 2 + len(variant_paths(kept)) + 1
+
+def test_find_orphans_respects_grace_period(asset_tree):
+    _touch(f"{asset_tree}/fresh.jpg", age_seconds=10)
+    _touch(f"{asset_tree}/old.jpg", age_seconds=7200)
+
+    result = asset_gc.find_orphans(set(), grace_seconds=3600)
+
+    assert [path for path, _ in result["orphans"]] == [f"{asset_tree}/old.jpg"]
+    assert result["skipped_recent"] == 1
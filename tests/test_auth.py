@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.schemas import UserLogin, UserRegister
+from app.services import auth, tokens
+from app.services.auth import REGISTER_USER, user_login_async, user_register_async
+from app.services.passwords import _hash, is_bcrypt_hash, password_hasher
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def fetchone(self):
+        return self._row
+
+class RegisterSession:
+    """
+    AsyncSession palsu yang mencatat parameter INSERT registrasi
+    """
+
+    def __init__(self):
+        self.params = []
+        self.committed = False
+
+    async def execute(self, statement, params=None):
+        self.params.append(params)
+        return _Result((1, params["username"], "user", None))
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+def test_register_ignores_requested_roles():
+    register_data = UserRegister.model_validate({"username": "budi", "password": "rahasia", "roles": "admin"})
+    db = RegisterSession()
+
+    result = asyncio.run(user_register_async(db, register_data))
+
+    assert not hasattr(register_data, "roles")
+    assert result["roles"] == "user"
+    assert all("roles" not in params for params in db.params)
+    assert ":roles" not in str(REGISTER_USER) and "'user'" in str(REGISTER_USER)
+    assert db.committed
+
+class _User:
+    def __init__(self, password_hash):
+        self.id = 7
+        self.username = "budi"
+        self.password = password_hash
+        self.roles = "user"
+
+class LoginSession:
+    """
+    AsyncSession palsu yang mencatat urutan query, rollback dan commit
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.events = []
+
+    async def execute(self, statement, params=None):
+        self.events.append("execute")
+        return _Result(self.user)
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.events.append("rollback")
+
+def _record_verify(monkeypatch, events):
+    verify_async = password_hasher.verify_async
+    hashes = []
+
+    async def recording_verify(password, hashed):
+        events.append("verify")
+        hashes.append(hashed)
+        return await verify_async(password, hashed)
+
+    monkeypatch.setattr(password_hasher, "verify_async", recording_verify)
+    return hashes
+
+def test_login_releases_connection_before_bcrypt(monkeypatch):
+    db = LoginSession(_User(_hash("rahasia", password_hasher.rounds)))
+    _record_verify(monkeypatch, db.events)
+
+    result = asyncio.run(user_login_async(db, UserLogin(username="budi", password="rahasia")))
+
+    assert result["username"] == "budi" and result["access_token"]
+    assert db.events == ["execute", "rollback", "verify"]
+
+def test_unknown_username_still_verifies_a_bcrypt_hash(monkeypatch):
+    db = LoginSession(user=None)
+    hashes = _record_verify(monkeypatch, db.events)
+
+    first = asyncio.run(user_login_async(db, UserLogin(username="tidak-ada", password="rahasia")))
+    second = asyncio.run(user_login_async(db, UserLogin(username="tidak-ada", password="rahasia")))
+
+    assert first is None and second is None
+    assert db.events == ["execute", "rollback", "verify"] * 2
+    # Hash dummy dibuat sekali dengan cost yang sama dengan hash pengguna
+    assert hashes[0] == hashes[1] == auth._dummy_hash
+    assert is_bcrypt_hash(hashes[0]) and int(hashes[0].split("$")[2]) == password_hasher.rounds
+
+def test_missing_signing_key_fails_unless_ephemeral_keys_are_allowed(monkeypatch):
+    monkeypatch.delenv("ACCESS_TOKEN_KEYS", raising=False)
+    monkeypatch.delenv("ACCESS_TOKEN_SECRET", raising=False)
+    monkeypatch.setattr(tokens, "ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY", False)
+    with pytest.raises(ValueError):
+        tokens._load_keys()
+
+    monkeypatch.setattr(tokens, "ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY", True)
+    keys, active_kid = tokens._load_keys()
+    assert active_kid == "ephemeral" and keys["ephemeral"]
+
+def test_token_service_defers_missing_key_error_to_load_keys(monkeypatch):
+    monkeypatch.delenv("ACCESS_TOKEN_KEYS", raising=False)
+    monkeypatch.delenv("ACCESS_TOKEN_SECRET", raising=False)
+    monkeypatch.setattr(tokens, "ACCESS_TOKEN_ALLOW_EPHEMERAL_KEY", False)
+
+    service = tokens.TokenService()
+    with pytest.raises(ValueError, match="ACCESS_TOKEN_SECRET"):
+        service.load_keys()
+
+def _metrics_client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.routes import metrics
+
+    app = FastAPI()
+    app.include_router(metrics.router, prefix="/metrics")
+    return TestClient(app)
+
+def _bearer(roles):
+    token = tokens.token_service.issue(1, "budi", roles)["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_token_metrics_require_metrics_role():
+    client = _metrics_client()
+
+    assert client.get("/metrics/tokens").status_code == 401
+    assert client.get("/metrics/tokens", headers=_bearer(["user"])).status_code == 403
+    response = client.get("/metrics/tokens", headers=_bearer(["admin"]))
+    assert response.status_code == 200 and "kids" in response.json()["data"]
+
+def test_password_metrics_require_metrics_role():
+    client = _metrics_client()
+
+    assert client.get("/metrics/passwords").status_code == 401
+    assert client.get("/metrics/passwords", headers=_bearer(["user"])).status_code == 403
+    assert client.get("/metrics/passwords", headers=_bearer(["admin"])).status_code == 200
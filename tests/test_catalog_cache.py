@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import products
+from app.services.catalog_cache import CatalogCache, catalog_cache
+
+class _Row:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+class CatalogSession:
+    """
+    Session palsu yang menjawab get_all_products dan query gambar dari katalog sintetis
+    """
+
+    def __init__(self, count: int):
+        self.products = [
+            {
+                "id_serial": f"P{number}", "user_id": 1, "place_name": f"Tempat {number}", "category": "Alam",
+                "rating": 4.0, "price": 10000, "stock": 5, "description": "", "location": "",
+                "latitude": -6.9 + number * 0.0001, "longitude": 107.6, "kab_kota": "Bandung",
+            }
+            for number in range(count)
+        ]
+        self.catalog_loads = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "get_all_products" in sql:
+            self.catalog_loads += 1
+            return _Result([_Row(dict(product)) for product in self.products])
+        return _Result([])
+
+@pytest.fixture
+def small_cache(monkeypatch):
+    cache = CatalogCache(max_size=50)
+    monkeypatch.setattr(products, "catalog_cache", cache)
+    return cache
+
+def test_catalog_larger_than_cache_stays_cached(small_cache):
+    db = CatalogSession(200)
+
+    first = products.load_catalog(db)
+    second = products.load_catalog(db)
+
+    assert len(first) == len(second) == 200
+    assert db.catalog_loads == 1
+    assert small_cache.is_warm()
+    assert small_cache.max_size >= 200
+
+def test_index_queries_do_not_reload_large_catalog(small_cache):
+    db = CatalogSession(200)
+    products.load_catalog(db)
+
+    for _ in range(5):
+        entries = products.get_catalog_entries(db, ["P0", "P199", "P100"])
+        assert [entry["product"]["id_serial"] for entry in entries] == ["P0", "P199", "P100"]
+
+    assert db.catalog_loads == 1
+
+def test_catalog_snapshot_survives_new_product_after_growth():
+    cache = CatalogCache(max_size=10)
+    rows = [{"id_serial": f"P{number}"} for number in range(100)]
+    cache.load_catalog(rows, {row["id_serial"]: {} for row in rows}, cache.generation)
+
+    cache.put_images({"NEW": {}}, cache.generation)
+
+    assert cache.get_catalog() is not None
+
+@pytest.fixture(autouse=True)
+def reset_global_cache():
+    yield
+    catalog_cache.invalidate()
+
+class LoopThreadAsyncSession:
+    """
+    AsyncSession palsu: seperti AsyncSession asli, fungsi run_sync berjalan di thread event loop
+    """
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    async def run_sync(self, function, *args, **kwargs):
+        return function(self.sync_session, *args, **kwargs)
+
+class _Scalar:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar(self):
+        return self._value
+
+class WriteSession:
+    def __init__(self):
+        self.committed = False
+
+    def execute(self, statement, params=None):
+        return _Scalar(True)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+def test_async_write_runs_post_commit_side_effects_off_the_event_loop(monkeypatch):
+    threads = {}
+    monkeypatch.setattr(products, "on_catalog_changed", lambda *args: threads.setdefault("catalog", threading.get_ident()))
+    monkeypatch.setattr(products, "schedule_release", lambda paths: threads.setdefault("release", threading.get_ident()))
+
+    async def update():
+        threads["loop"] = threading.get_ident()
+        return await products.update_product_async(
+            LoopThreadAsyncSession(WriteSession()), id_serial="P1", user_id=1, category="Alam", place_name="A",
+            rating=4, price=0, stock=1, description="", open_time="08:00", close_time="17:00", location="",
+            latitude=-6.9, longitude=107.6, kab_kota="Bandung", detail_images=[], display_images=[],
+            old_detail_images=["app/asset/detail_image/a.jpg"]
+        )
+
+    assert asyncio.run(update()) is True
+    assert threads["catalog"] != threads["loop"]
+    assert threads["release"] != threads["loop"]
+
+def test_async_reads_rebuild_indexes_off_the_event_loop(small_cache, monkeypatch):
+    db = CatalogSession(20)
+    products.load_catalog(db)
+    small_cache.invalidate("P1")
+    threads = {}
+    build = products.build_catalog_indexes
+
+    def record_build(catalog):
+        threads["build"] = threading.get_ident()
+        build(catalog)
+
+    monkeypatch.setattr(products, "build_catalog_indexes", record_build)
+
+    async def read():
+        threads["loop"] = threading.get_ident()
+        return await products.get_nearby_products_async(LoopThreadAsyncSession(db), -6.9, 107.6, 5, "http://testserver/")
+
+    asyncio.run(read())
+
+    assert db.catalog_loads == 2
+    assert threads["build"] != threads["loop"]
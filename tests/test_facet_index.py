@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.facet_index import FacetIndex
+
+CATALOG = [
+    {"id_serial": "P1", "category": "Alam", "kab_kota": "Toba", "price": 10000, "rating": 4.5},
+    {"id_serial": "P2", "category": "Alam", "kab_kota": "Karo", "price": 0, "rating": 4.0},
+    {"id_serial": "P3", "category": "Kuliner", "kab_kota": "Toba", "price": 25000, "rating": 3.5},
+    {"id_serial": "P4", "category": "Budaya", "kab_kota": "Medan", "price": 5000, "rating": 5.0},
+    {"id_serial": "P5", "category": "Alam", "kab_kota": "Toba", "price": 30000, "rating": 3.0},
+]
+
+@pytest.fixture
+def index():
+    index = FacetIndex()
+    index.build(CATALOG)
+    return index
+
+def _bucket(facets, field, value):
+    return next(bucket for bucket in facets[field] if bucket["value"] == value)
+
+def test_unfiltered_counts_and_ranges(index):
+    facets = index.facets()
+
+    assert facets["total"] == {"count": 5, "price": {"min": 0, "max": 30000}, "rating": {"min": 3.0, "max": 5.0}}
+    assert [(bucket["value"], bucket["count"]) for bucket in facets["category"]] == [("Alam", 3), ("Budaya", 1), ("Kuliner", 1)]
+    assert _bucket(facets, "kab_kota", "Toba")["count"] == 3
+
+def test_combined_filters(index):
+    facets = index.facets(categories=["Alam"], kab_kotas=["Toba"])
+
+    assert facets["total"]["count"] == 2
+    assert facets["total"]["price"] == {"min": 10000, "max": 30000}
+    # Facet category hanya dibatasi filter kab_kota, dan sebaliknya
+    assert {bucket["value"]: bucket["count"] for bucket in facets["category"]} == {"Alam": 2, "Kuliner": 1}
+    assert {bucket["value"]: bucket["count"] for bucket in facets["kab_kota"]} == {"Toba": 2, "Karo": 1}
+    assert _bucket(facets, "category", "Alam")["selected"] and not _bucket(facets, "category", "Kuliner")["selected"]
+
+def test_multiple_values_in_one_filter_are_combined_with_or(index):
+    facets = index.facets(categories=["Kuliner", "Budaya"])
+
+    assert facets["total"]["count"] == 2
+    assert {bucket["value"] for bucket in facets["kab_kota"]} == {"Toba", "Medan"}
+
+def test_values_are_matched_exactly_like_the_category_route(index):
+    index.upsert({"id_serial": "P6", "category": "alam ", "kab_kota": "Toba", "price": 1, "rating": 1})
+
+    assert index.facets(categories=["alam"])["total"]["count"] == 0
+    assert index.facets(categories=["Alam"])["total"]["count"] == 3
+    assert _bucket(index.facets(), "category", "alam ")["count"] == 1
+
+def test_min_max_stay_exact_after_upsert_and_remove(index):
+    index.remove("P2")
+    facets = index.facets(categories=["Alam"])
+    assert facets["total"]["price"] == {"min": 10000, "max": 30000}
+    assert facets["total"]["rating"] == {"min": 3.0, "max": 4.5}
+
+    # Produk pindah kategori: rentang kategori lama dan baru ikut berubah
+    index.upsert({**CATALOG[4], "category": "Kuliner", "price": 500})
+    alam = index.facets(categories=["Alam"])["total"]
+    assert alam == {"count": 1, "price": {"min": 10000, "max": 10000}, "rating": {"min": 4.5, "max": 4.5}}
+    kuliner = index.facets(categories=["Kuliner"])["total"]
+    assert kuliner["price"] == {"min": 500, "max": 25000} and kuliner["rating"] == {"min": 3.0, "max": 3.5}
+
+    index.remove("P1")
+    assert all(bucket["value"] != "Alam" for bucket in index.facets()["category"])
+    assert index.facets(categories=["Alam"])["total"] == {"count": 0, "price": {"min": None, "max": None}, "rating": {"min": None, "max": None}}
+
+def test_cached_result_is_invalidated_on_change(index):
+    assert index.facets(kab_kotas=["Medan"])["total"]["count"] == 1
+
+    index.upsert({"id_serial": "P7", "category": "Alam", "kab_kota": "Medan", "price": 0, "rating": 2})
+
+    assert index.facets(kab_kotas=["Medan"])["total"]["count"] == 2
@@ -0,0 +1,311 @@
+import asyncio
+import math
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.services import products
+from app.services.catalog_cache import catalog_cache
+from app.services.geo_engine import GeoEngine, GeoParity, geo_engine, geo_parity, haversine_km_vectorized
+from app.services.single_flight import single_flight
+from app.services.spatial_index import haversine_km
+
+CATEGORIES = ["Alam", "Budaya", "Kuliner"]
+
+def _catalog(count: int, seed: int = 11):
+    generator = random.Random(seed)
+    return [
+        {
+            "id_serial": f"P{number:04d}", "user_id": 1, "place_name": f"Tempat {number}",
+            "category": generator.choice(CATEGORIES), "rating": round(generator.uniform(1, 5), 1),
+            "price": Decimal(generator.randrange(0, 100000, 500)), "stock": generator.randrange(0, 50),
+            "description": "", "location": "",
+            "latitude": Decimal(str(round(generator.uniform(-7.5, -6.0), 6))),
+            "longitude": Decimal(str(round(generator.uniform(106.5, 108.5), 6))),
+            "kab_kota": generator.choice(["Bandung", "Bogor", "Garut"]),
+        }
+        for number in range(count)
+    ]
+
+# Referensi di bawah ini sintetis: bentuk dan rumus stored function yang asli tidak tersedia
+# di sini, jadi test ini membuktikan mekanisme pemeriksaan kesetaraan terhadap referensi buatan
+# (jarak 2 desimal, waktu tempuh 30 km/jam), bukan terhadap SQL asli. Kesetaraan dengan stored
+# function yang sebenarnya diperiksa saat runtime oleh GeoParity dan diulang secara berkala.
+
+def _stored_distance_km(lat1, lon1, lat2, lon2):
+    # Rumus spherical law of cosines, seperti yang umum dipakai di fungsi PL/pgSQL
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    cosine = math.sin(phi1) * math.sin(phi2) + math.cos(phi1) * math.cos(phi2) * math.cos(math.radians(lon2 - lon1))
+    return 6371 * math.acos(max(-1.0, min(1.0, cosine)))
+
+def stored_products_by_category(catalog, category, lat, lon, sortby=None, location=None):
+    """
+    Referensi sintetis (bukan SQL asli) untuk get_products_by_category: jarak (km, 2 desimal) dan
+    waktu tempuh (menit, bilangan bulat) dengan kecepatan 30 km/jam
+    """
+    rows = []
+    for product in catalog:
+        if product["category"] != category or (location and product["kab_kota"] != location):
+            continue
+        distance = _stored_distance_km(lat, lon, float(product["latitude"]), float(product["longitude"]))
+        rows.append({**product, "jarak": Decimal(str(round(distance, 2))), "waktu_tempuh": round(distance / 30 * 60)})
+    rows.sort(key=lambda row: row["jarak"])
+    return rows
+
+def stored_top_rated(catalog, lat, lon, category, limit):
+    """
+    Referensi sintetis (bukan SQL asli) untuk get_top_rated_products_by_location: rating tertinggi,
+    seri diurutkan jarak terdekat
+    """
+    rows = stored_products_by_category(catalog, category, lat, lon) if category else [
+        row for name in CATEGORIES for row in stored_products_by_category(catalog, name, lat, lon)
+    ]
+    rows.sort(key=lambda row: (-row["rating"], row["jarak"]))
+    return rows[:limit]
+
+class _Row:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+class StoredFunctionSession:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.stored_calls = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "get_all_products" in sql:
+            return _Result([_Row(dict(product)) for product in self.catalog])
+        if "get_products_by_category" in sql:
+            self.stored_calls += 1
+            rows = stored_products_by_category(
+                self.catalog, params["category"], params["user_lat"], params["user_long"], params["p_sortby"], params["p_location"]
+            )
+            return _Result([_Row(row) for row in rows])
+        if "get_top_rated_products_by_location" in sql:
+            self.stored_calls += 1
+            rows = stored_top_rated(self.catalog, params["user_lat"], params["user_long"], params["category"], params["limit"])
+            return _Result([_Row(row) for row in rows])
+        return _Result([])
+
+class AsyncStoredFunctionSession:
+    """
+    AsyncSession palsu: run_sync memberi kesempatan request lain berjalan lebih dulu,
+    seperti saat menunggu database
+    """
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    async def run_sync(self, function, *args, **kwargs):
+        await asyncio.sleep(0)
+        return function(self.sync_session, *args, **kwargs)
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    catalog_cache.invalidate()
+    geo_parity.reset()
+    yield
+    catalog_cache.invalidate()
+    geo_parity.reset()
+    geo_engine.ready = False
+
+def test_vectorized_haversine_matches_scalar():
+    generator = random.Random(3)
+    lats = np.array([generator.uniform(-11, 6) for _ in range(1000)])
+    lons = np.array([generator.uniform(95, 141) for _ in range(1000)])
+
+    distances = haversine_km_vectorized(-6.9, 107.6, lats, lons)
+
+    expected = [haversine_km(-6.9, 107.6, lat, lon) for lat, lon in zip(lats, lons)]
+    assert np.allclose(distances, expected, rtol=1e-12, atol=1e-9)
+
+def test_engine_distances_within_tolerance_of_stored_function():
+    catalog = _catalog(500)
+    engine = GeoEngine()
+    engine.build(catalog)
+
+    stored = stored_products_by_category(catalog, "Alam", -6.9, 107.6)
+    matches = engine.search(-6.9, 107.6, category="Alam")
+
+    assert [row["id_serial"] for row in stored] == [id_serial for id_serial, _ in matches]
+    for row, (_, distance) in zip(stored, matches):
+        assert float(row["jarak"]) == pytest.approx(distance, abs=0.01)
+
+def test_category_filter_is_exact_like_stored_function():
+    engine = GeoEngine()
+    engine.build(_catalog(50))
+
+    assert engine.search(-6.9, 107.6, category="alam") == []
+    assert engine.search(-6.9, 107.6, category="Alam")
+
+def test_parity_learns_stored_columns_and_reproduces_rows():
+    catalog = _catalog(400)
+    engine = GeoEngine()
+    engine.build(catalog)
+    parity = GeoParity()
+
+    stored = stored_products_by_category(catalog, "Budaya", -6.9, 107.6)
+    fields = parity.check("category", stored, engine.search(-6.9, 107.6, category="Budaya"), catalog[0].keys())
+    assert fields is not None
+
+    by_id = {product["id_serial"]: product for product in catalog}
+    for lat, lon in [(-7.2, 107.9), (-6.3, 106.8), (-7.0, 108.2)]:
+        expected = stored_products_by_category(catalog, "Budaya", lat, lon)
+        rows = [fields.row(by_id[id_serial], distance) for id_serial, distance in engine.search(lat, lon, category="Budaya")]
+        assert [list(row) for row in rows] == [list(row) for row in expected]
+        for row, reference in zip(rows, expected):
+            assert float(row["jarak"]) == pytest.approx(float(reference["jarak"]), abs=0.02)
+            assert abs(row["waktu_tempuh"] - reference["waktu_tempuh"]) <= 1
+
+def test_parity_expires_and_is_checked_again():
+    catalog = _catalog(200)
+    engine = GeoEngine()
+    engine.build(catalog)
+    now = [0.0]
+    parity = GeoParity(resample_seconds=60, clock=lambda: now[0])
+    matches = engine.search(-6.9, 107.6, category="Alam")
+    stored = stored_products_by_category(catalog, "Alam", -6.9, 107.6)
+
+    assert parity.check("category", stored, matches, catalog[0].keys()) is not None
+    now[0] = 59
+    assert parity.fields("category") is not None and not parity.pending("category")
+
+    now[0] = 60
+    assert parity.fields("category") is None and parity.pending("category")
+    # Sampel baru yang berbeda mematikan engine untuk key ini
+    assert parity.check("category", list(reversed(stored)), matches, catalog[0].keys()) is None
+    assert parity.fields("category") is None and not parity.pending("category")
+    assert parity.stats()["resampled"] == 1
+
+def test_parity_rejects_different_order_or_unknown_columns():
+    catalog = _catalog(200)
+    engine = GeoEngine()
+    engine.build(catalog)
+    matches = engine.search(-6.9, 107.6, category="Alam")
+    stored = stored_products_by_category(catalog, "Alam", -6.9, 107.6)
+
+    assert GeoParity().check("order", list(reversed(stored)), matches, catalog[0].keys()) is None
+    labelled = [{**row, "label": "dekat"} for row in stored]
+    assert GeoParity().check("label", labelled, matches, catalog[0].keys()) is None
+    constant = [{**row, "peringkat": 1} for row in stored]
+    assert GeoParity().check("constant", constant, matches, catalog[0].keys()) is None
+
+def test_category_route_switches_to_engine_only_after_parity():
+    catalog = _catalog(300)
+    db = StoredFunctionSession(catalog)
+    products.load_catalog(db)
+
+    first = products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 1
+
+    second = products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 1
+    assert [product["id_serial"] for product in second] == [product["id_serial"] for product in first]
+    assert [list(product) for product in second] == [list(product) for product in first]
+    for engine_row, stored_row in zip(second, first):
+        assert float(engine_row["jarak"]) == pytest.approx(float(stored_row["jarak"]), abs=0.02)
+        assert abs(engine_row["waktu_tempuh"] - stored_row["waktu_tempuh"]) <= 1
+
+def test_category_route_checks_location_filter_separately():
+    catalog = _catalog(300)
+    db = StoredFunctionSession(catalog)
+    products.load_catalog(db)
+
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 1
+
+    # Kesetaraan tanpa lokasi tidak berlaku untuk filter p_location
+    with_location = products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/", location="Bogor")
+    assert db.stored_calls == 2
+    assert all(product["kab_kota"] == "Bogor" for product in with_location)
+
+def test_each_category_is_verified_separately():
+    catalog = _catalog(300)
+    db = StoredFunctionSession(catalog)
+    products.load_catalog(db)
+
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 1
+
+    # Kesetaraan untuk Kuliner tidak berlaku untuk kategori lain, termasuk penulisan berbeda
+    for category in ("Alam", "kuliner", "Alam"):
+        products.get_products_by_category(db, category, -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 3
+
+    products.get_top_rated_products_by_location(db, -6.9, 107.6, "Alam", 5, "http://testserver/")
+    products.get_top_rated_products_by_location(db, -6.9, 107.6, "Budaya", 5, "http://testserver/")
+    assert db.stored_calls == 5
+
+def test_parity_keys_are_bounded():
+    catalog = _catalog(200)
+    engine = GeoEngine()
+    engine.build(catalog)
+    parity = GeoParity(max_keys=2)
+    matches = engine.search(-6.9, 107.6, category="Alam")
+    stored = stored_products_by_category(catalog, "Alam", -6.9, 107.6)
+
+    for key in ("a", "b", "c"):
+        parity.check(key, stored, matches, catalog[0].keys())
+
+    assert parity.pending("a")
+    assert not parity.pending("b") and not parity.pending("c")
+
+def test_category_route_resamples_stored_function(monkeypatch):
+    catalog = _catalog(300)
+    db = StoredFunctionSession(catalog)
+    products.load_catalog(db)
+    now = [0.0]
+    monkeypatch.setattr(geo_parity, "_clock", lambda: now[0])
+
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 1
+
+    now[0] = geo_parity.resample_seconds
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 2
+    products.get_products_by_category(db, "Kuliner", -6.9, 107.6, "http://testserver/")
+    assert db.stored_calls == 2
+
+def test_top_rated_coalesces_candidates_across_locations():
+    catalog = _catalog(300)
+    db = StoredFunctionSession(catalog)
+    products.load_catalog(db)
+    # Permintaan pertama dilayani stored function dan memverifikasi engine
+    products.get_top_rated_products_by_location(db, -6.9, 107.6, "Alam", 5, "http://testserver/")
+    assert db.stored_calls == 1
+
+    locations = [(-6.9 + offset / 1000, 107.6 - offset / 700) for offset in range(20)] + [(-7.4, 108.3)]
+    before = single_flight.stats().get("get_top_rated_candidates", {"executions": 0})["executions"]
+
+    async def requests():
+        async_db = AsyncStoredFunctionSession(db)
+        return await asyncio.gather(*[
+            products.get_top_rated_products_by_location_async(async_db, lat, lon, "Alam", 5, "http://testserver/")
+            for lat, lon in locations
+        ])
+
+    results = asyncio.run(requests())
+
+    assert db.stored_calls == 1
+    assert single_flight.stats()["get_top_rated_candidates"]["executions"] - before == 1
+    for (lat, lon), result in zip(locations, results):
+        expected = stored_top_rated(catalog, lat, lon, "Alam", 5)
+        assert [product["id_serial"] for product in result] == [row["id_serial"] for row in expected]
+        for product, row in zip(result, expected):
+            assert float(product["jarak"]) == pytest.approx(float(row["jarak"]), abs=0.02)
+    # Setiap pemanggil menerima baris sendiri; entri katalog bersama tidak diubah
+    assert results[0][0] is not results[1][0]
+    assert "jarak" not in catalog_cache.get_product(results[0][0]["id_serial"])["product"]
@@ -0,0 +1,72 @@
+import io
+import os
+import asyncio
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.services import image_store
+from app.services.image_store import (
+    ImageTooLargeError, UploadBudget, remove_files, run_release_job, schedule_release, store_upload_async
+)
+from app.services.image_variants import variant_paths
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def _touch(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+def test_remove_files_skips_missing_paths_and_duplicates(workdir):
+    path = "app/asset/display_image/a.jpg"
+    _touch(path)
+    _touch(variant_paths(path)[0])
+
+    remove_files([None, path, "", path, None])
+
+    assert not os.path.exists(path)
+    assert not os.path.exists(variant_paths(path)[0])
+
+def test_remove_files_with_only_null_entries(workdir):
+    remove_files([None])
+
+def test_schedule_release_drops_empty_paths(monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(image_store.job_queue, "enqueue", lambda kind, payload: enqueued.append((kind, payload)))
+
+    schedule_release([None, "app/asset/a.jpg", "", "app/asset/a.jpg"])
+    schedule_release([None])
+
+    assert enqueued == [("release_images", {"paths": ["app/asset/a.jpg"]})]
+
+def test_release_job_skips_null_paths_from_old_journal(monkeypatch):
+    released = []
+    monkeypatch.setattr(image_store, "SessionLocal", lambda: pytest.fail("session tidak perlu dibuka"))
+
+    run_release_job({"paths": [None, None]})
+
+    class _Session:
+        def close(self):
+            pass
+
+    monkeypatch.setattr(image_store, "SessionLocal", _Session)
+    monkeypatch.setattr(image_store, "release_images", lambda db, paths: released.append(paths))
+    run_release_job({"paths": [None, "app/asset/b.jpg"]})
+
+    assert released == [["app/asset/b.jpg"]]
+
+def test_upload_over_request_budget_stops_and_discards_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_store, "BLOB_ROOT", str(tmp_path))
+    monkeypatch.setattr(image_store, "CHUNK_SIZE", 4)
+    budget = UploadBudget(max_file_bytes=100, max_request_bytes=10)
+
+    path, created = asyncio.run(store_upload_async(UploadFile(io.BytesIO(b"x" * 6), filename="a.jpg"), ".jpg", budget))
+    assert created and os.path.exists(path)
+
+    with pytest.raises(ImageTooLargeError):
+        asyncio.run(store_upload_async(UploadFile(io.BytesIO(b"y" * 6), filename="b.jpg"), ".jpg", budget))
+
+    assert budget.used_bytes == 12
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
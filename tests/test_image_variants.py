@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from app.services import image_variants
+from app.services.image_variants import VariantIndex, variant_path, variant_urls
+
+SOURCE = "app/asset/display_image/sample.jpg"
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    index = VariantIndex(ttl_seconds=0)
+    monkeypatch.setattr(image_variants, "variant_index", index)
+    return index
+
+def _create(size_name: str, format_name: str):
+    path = variant_path(SOURCE, size_name, format_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+def test_no_variant_urls_before_generation(workdir):
+    assert variant_urls("http://testserver/", SOURCE) == {}
+
+def test_only_existing_variants_are_listed(workdir):
+    _create("thumb", "webp")
+    _create("large", "jpeg")
+
+    urls = variant_urls("http://testserver/", SOURCE)
+
+    assert urls == {
+        "thumb": {"webp": "http://testserver/static/variants/display_image/sample_thumb.webp"},
+        "large": {"jpeg": "http://testserver/static/variants/display_image/sample_large.jpg"},
+    }
+
+def test_complete_variants_are_cached_until_forgotten(workdir, monkeypatch):
+    for size_name in image_variants.VARIANT_SIZES:
+        for format_name in image_variants.VARIANT_FORMATS:
+            _create(size_name, format_name)
+    workdir.mark_generated(SOURCE)
+
+    checks = []
+    monkeypatch.setattr(image_variants.os.path, "exists", lambda path: checks.append(path) or True)
+    for _ in range(3):
+        assert len(variant_urls("http://testserver/", SOURCE)) == len(image_variants.VARIANT_SIZES)
+    assert checks == []
+
+    workdir.forget(SOURCE)
+    variant_urls("http://testserver/", SOURCE)
+    assert len(checks) == len(image_variants.VARIANT_SIZES) * len(image_variants.VARIANT_FORMATS)
+
+def test_incomplete_variants_are_rechecked_after_ttl(workdir):
+    assert variant_urls("http://testserver/", SOURCE) == {}
+
+    _create("medium", "jpeg")
+
+    assert variant_urls("http://testserver/", SOURCE) == {
+        "medium": {"jpeg": "http://testserver/static/variants/display_image/sample_medium.jpg"}
+    }
@@ -0,0 +1,89 @@
+import pytest
+
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(job_queue_module, "JOB_MAX_ATTEMPTS", 3)
+    return JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=1)
+
+def test_successful_job_runs_once_and_leaves_journal(queue):
+    seen = []
+    queue.register("echo", seen.append)
+
+    queue.enqueue("echo", {"value": 1})
+    queue.enqueue("echo", {"value": 2})
+
+    assert queue.run_pending() == 2
+    assert seen == [{"value": 1}, {"value": 2}]
+    assert queue.stats()["jobs"] == {}
+    assert queue.run_pending() == 0
+
+def test_failing_job_is_retried_then_marked_failed(queue):
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        raise RuntimeError("gagal")
+
+    queue.register("flaky", flaky)
+    queue.enqueue("flaky", {})
+
+    for _ in range(5):
+        queue.run_pending()
+
+    assert len(attempts) == 3
+    stats = queue.stats()
+    assert stats["jobs"] == {"failed": 1}
+    assert stats["retried"] == 2 and stats["failed"] == 1
+
+def test_job_recovers_after_transient_failure(queue):
+    attempts = []
+
+    def transient(payload):
+        attempts.append(payload)
+        if len(attempts) == 1:
+            raise RuntimeError("sementara")
+
+    queue.register("transient", transient)
+    queue.enqueue("transient", {"id": 7})
+    queue.run_pending()
+    queue.run_pending()
+
+    assert len(attempts) == 2
+    assert queue.stats()["jobs"] == {}
+
+def test_delayed_job_waits_until_due(queue):
+    queue.register("later", lambda payload: None)
+    queue.enqueue("later", {}, delay_seconds=3600)
+
+    assert queue.run_pending() == 0
+    assert queue.stats()["jobs"] == {"pending": 1}
+
+def test_enqueue_unique_skips_while_pending(queue):
+    queue.register("gc", lambda payload: None)
+
+    assert queue.enqueue_unique("gc", {}) is not None
+    assert queue.enqueue_unique("gc", {}) is None
+    queue.run_pending()
+    assert queue.enqueue_unique("gc", {}) is not None
+
+def test_journal_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    JobQueue(path=path).enqueue("echo", {"value": "persisted"})
+
+    seen = []
+    restarted = JobQueue(path=path)
+    restarted.register("echo", seen.append)
+
+    assert restarted.run_pending() == 1
+    assert seen == [{"value": "persisted"}]
+
+def test_journal_directory_is_created(tmp_path):
+    path = tmp_path / "data" / "jobs.sqlite3"
+    queue = JobQueue(path=str(path), workers=1)
+
+    assert queue.stats()["jobs"] == {}
+    assert path.exists()
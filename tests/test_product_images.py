@@ -0,0 +1,131 @@
+import re
+
+import pytest
+
+from app.services.catalog_cache import catalog_cache
+from app.services.products import fetch_product_images, hydrate_product_images, iter_product_batches
+
+class _Row:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+class CountingSession:
+    """
+    Session palsu yang menghitung statement dan menjawab query gambar dari data di memori
+    """
+
+    def __init__(self, images_per_product: int = 2):
+        self.images_per_product = images_per_product
+        self.statements = []
+        self.requested_ids = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        self.requested_ids.append(list(params["ids"]))
+        function_name = re.search(r"JOIN LATERAL (\w+)\(", sql).group(1)
+        rows = [
+            _Row({
+                "hydrate_product_id": product_id,
+                "id": f"{function_name}-{product_id}-{number}",
+                "filename_path": f"app/asset/{function_name}/{product_id}-{number}.jpg",
+            })
+            for product_id in params["ids"]
+            for number in range(self.images_per_product)
+        ]
+        return _Result(rows)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    catalog_cache.invalidate()
+    yield
+    catalog_cache.invalidate()
+
+@pytest.mark.parametrize("product_count", [1, 10, 500])
+def test_fetch_product_images_runs_one_statement_per_image_kind(product_count):
+    db = CountingSession()
+    ids = [f"P{number}" for number in range(product_count)]
+
+    images = fetch_product_images(db, ids)
+
+    assert len(db.statements) == 2
+    assert set(images) == set(ids)
+    assert all(len(images[product_id]["detail_images"]) == 2 for product_id in ids)
+    assert all(len(images[product_id]["display_images"]) == 2 for product_id in ids)
+
+def test_hydrate_product_images_statement_count_does_not_grow_with_products():
+    counts = []
+    for product_count in (5, 50, 500):
+        catalog_cache.invalidate()
+        db = CountingSession()
+        products = [{"id_serial": f"P{number}"} for number in range(product_count)]
+        hydrated = hydrate_product_images(db, products, "http://testserver/")
+        counts.append(len(db.statements))
+        assert hydrated[0]["display_images"][0]["file_url"].startswith("http://testserver/static/")
+
+    assert counts == [2, 2, 2]
+
+def test_fetch_product_images_queries_only_uncached_products():
+    fetch_product_images(CountingSession(), ["P1", "P2"])
+
+    db = CountingSession()
+    images = fetch_product_images(db, ["P1", "P2", "P3"])
+
+    assert len(db.statements) == 2
+    assert set(images) == {"P1", "P2", "P3"}
+    assert db.requested_ids == [["P3"], ["P3"]]
+
+    db = CountingSession()
+    fetch_product_images(db, ["P1", "P3", "P1"])
+    assert db.statements == []
+
+class _StreamedResult:
+    def __init__(self, rows, batch_size):
+        self._rows = rows
+        self._batch_size = batch_size
+        self.closed = False
+
+    def partitions(self):
+        for start in range(0, len(self._rows), self._batch_size):
+            yield self._rows[start:start + self._batch_size]
+
+    def close(self):
+        self.closed = True
+
+class ExportSession(CountingSession):
+    """
+    Session palsu yang juga menjawab get_all_products() sebagai hasil streaming
+    """
+
+    def __init__(self, product_count: int, batch_size: int):
+        super().__init__()
+        self.products = [{"id_serial": f"P{number}", "place_name": f"Tempat {number}"} for number in range(product_count)]
+        self.batch_size = batch_size
+        self.queries = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "JOIN LATERAL" in sql:
+            return super().execute(statement, params)
+        self.queries.append(sql)
+        self.result = _StreamedResult([_Row(product) for product in self.products], self.batch_size)
+        return self.result
+
+def test_export_reads_get_all_products_without_filling_the_cache():
+    db = ExportSession(product_count=25, batch_size=10)
+
+    batches = list(iter_product_batches(db, "http://testserver/", batch_size=10))
+
+    assert db.queries == ["SELECT * FROM get_all_products()"]
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert batches[0][0]["display_images"][0]["file_url"].startswith("http://testserver/static/")
+    assert db.result.closed
+    _, missing = catalog_cache.get_images([f"P{number}" for number in range(25)])
+    assert len(missing) == 25
@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+
+import pytest
+
+from app.services import product_import
+from app.services.image_store import ImageTooLargeError, UploadBudget
+from app.services.product_import import (
+    STAGING_COLUMNS, ImportFormatError, _BudgetedReader, import_products, merge_staging, store_archive_images, validate_rows,
+)
+
+def _row(number: int, place_name: str = None, **overrides):
+    row = {
+        "user_id": 1, "category": "Alam", "place_name": place_name or f"Tempat {number}", "rating": 4.5,
+        "price": 15000, "stock": 3, "description": "Air terjun", "open_time": "08:00", "close_time": "17:00",
+        "location": "Jl. Contoh", "latitude": -6.9, "longitude": 107.6, "kab_kota": "Bandung",
+        "detail_images": ["a.jpg"], "display_images": ["b.jpg"],
+    }
+    row.update(overrides)
+    return row
+
+def _jsonl(rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+def _zip(files) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+class _Result:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+    def __iter__(self):
+        return iter(self._rows)
+
+class _Psycopg2Cursor:
+    def __init__(self, session):
+        self.session = session
+
+    def copy_expert(self, statement, buffer):
+        self.session.copy(statement, buffer.read())
+
+    def close(self):
+        pass
+
+class _Psycopg3Cursor:
+    def __init__(self, session):
+        self.session = session
+
+    @contextmanager
+    def copy(self, statement):
+        chunks = []
+
+        class _Copy:
+            def write(self, data):
+                chunks.append(data)
+
+        yield _Copy()
+        self.session.copy(statement, "".join(chunks))
+
+    def close(self):
+        pass
+
+class StagingSession:
+    """
+    Session palsu yang menyimpan isi COPY sebagai tabel staging dan menjawab query merge
+    dengan membaca ulang CSV tersebut
+    """
+
+    def __init__(self, cursor_class=_Psycopg2Cursor, existing=()):
+        self.cursor_class = cursor_class
+        self.existing = set(existing)
+        self.staging = []
+        self.copy_statements = []
+        self.insert_params = None
+        self.committed = False
+
+    def connection(self):
+        session = self
+
+        class _DriverConnection:
+            def cursor(self):
+                return session.cursor_class(session)
+
+        class _PoolConnection:
+            driver_connection = _DriverConnection()
+
+        class _Connection:
+            connection = _PoolConnection()
+
+        return _Connection()
+
+    def copy(self, statement, data):
+        self.copy_statements.append(statement)
+        header = ["row_number"] + STAGING_COLUMNS
+        self.staging = [dict(zip(header, values)) for values in csv.reader(io.StringIO(data))]
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "CREATE TEMP TABLE" in sql:
+            return _Result()
+        if "occurrence > 1" in sql:
+            seen, duplicates = set(), []
+            for row in self.staging:
+                key = (row["category"], row["place_name"])
+                if key in seen:
+                    duplicates.append(int(row["row_number"]))
+                seen.add(key)
+            return _Result(duplicates)
+        if "check_product_exists" in sql:
+            return _Result([int(row["row_number"]) for row in self.staging if row["place_name"] in self.existing])
+        if "pg_proc" in sql:
+            return _Result(scalar=["integer"] + ["text"] * (len(STAGING_COLUMNS) - 1))
+        if "insert_product" in sql:
+            self.insert_params = params
+            rows = [
+                type("Row", (), {"row_number": int(row["row_number"]), "id_serial": f"NEW{row['row_number']}"})
+                for row in self.staging if int(row["row_number"]) not in params["conflicts"]
+            ]
+            return _Result(rows)
+        raise AssertionError(f"Query tidak terduga: {sql}")
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_import, "schedule_variants", lambda paths: None)
+    monkeypatch.setattr(product_import, "on_catalog_changed", lambda id_serial, product=None: None)
+
+@pytest.mark.parametrize("cursor_class", [_Psycopg2Cursor, _Psycopg3Cursor])
+def test_copy_and_merge_reports_conflicts_and_inserts(cursor_class):
+    rows = [_row(1), _row(2, place_name="Sudah Ada"), _row(3), _row(4, place_name="Tempat 1")]
+    valid, errors = validate_rows(rows)
+    assert errors == {}
+    db = StagingSession(cursor_class, existing={"Sudah Ada"})
+
+    inserted, conflicts = merge_staging(db, valid, dry_run=False)
+
+    assert len(db.copy_statements) == 1
+    assert db.copy_statements[0].startswith("COPY import_staging (row_number, user_id, category")
+    assert [row["place_name"] for row in db.staging] == ["Tempat 1", "Sudah Ada", "Tempat 3", "Tempat 1"]
+    assert db.staging[0]["open_time"] == "08:00:00"
+    assert json.loads(db.staging[0]["detail_images"]) == ["a.jpg"]
+    assert conflicts == {1: "Produk/Tempat sudah ada", 3: "Duplikat (category, place_name) di dalam file import"}
+    assert sorted(db.insert_params["conflicts"]) == [2, 4]
+    assert inserted == {0: "NEW1", 2: "NEW3"}
+
+def test_dry_run_stops_before_insert():
+    valid, _ = validate_rows([_row(1)])
+    db = StagingSession()
+
+    inserted, conflicts = merge_staging(db, valid, dry_run=True)
+
+    assert (inserted, conflicts) == ({}, {})
+    assert db.insert_params is None
+
+def test_import_products_end_to_end_with_archive():
+    db = StagingSession()
+    archive = _zip({"a.jpg": b"detail", "b.jpg": b"display"})
+
+    report = import_products(db, _jsonl([_row(1), _row(2, detail_images=["missing.jpg"])]), "jsonl", archive)
+
+    assert db.committed
+    assert [row["status"] for row in report["rows"]] == ["inserted", "invalid"]
+    stored = json.loads(db.staging[0]["detail_images"])
+    assert stored[0]["filename"] == "a.jpg" and stored[0]["filename_path"].startswith("app/asset/sha256/")
+
+def test_oversized_member_marks_row_invalid():
+    valid, errors = validate_rows([_row(1), _row(2, detail_images=["big.jpg"])])
+    archive = _zip({"a.jpg": b"x" * 10, "b.jpg": b"x" * 10, "big.jpg": b"x" * 5000})
+
+    store_archive_images(archive, valid, errors, budget=UploadBudget(max_file_bytes=1000, max_request_bytes=10_000))
+
+    assert list(valid) == [0]
+    assert "big.jpg" in errors[1][0]
+
+def test_archive_total_over_budget_is_rejected():
+    valid, errors = validate_rows([_row(1), _row(2, detail_images=["c.jpg"], display_images=["d.jpg"])])
+    archive = _zip({name: b"x" * 800 for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg")})
+
+    with pytest.raises(ImportFormatError):
+        store_archive_images(archive, valid, errors, store=False, budget=UploadBudget(max_file_bytes=1000, max_request_bytes=2000))
+
+def test_bytes_read_are_checked_against_budget():
+    reader = _BudgetedReader(io.BytesIO(b"x" * 3000), "lie.jpg", UploadBudget(max_file_bytes=1000, max_request_bytes=10_000))
+
+    reader.read(800)
+    with pytest.raises(ImageTooLargeError):
+        reader.read(800)
@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_async_db
+from app.routes import products as product_routes
+from app.services import image_store, products
+from app.services.tokens import require_product_writer
+
+FORM = {
+    "category": "Alam", "place_name": "Air Terjun", "rating": "4.5", "price": "10000", "stock": "5",
+    "description": "Deskripsi", "open_time": "08:00", "close_time": "17:00", "location": "Jl. Contoh",
+    "latitude": "-6.9", "longitude": "107.6", "kab_kota": "Bandung",
+}
+
+@pytest.fixture
+def client(monkeypatch):
+    created = []
+
+    async def no_db():
+        yield None
+
+    async def not_exists(db, category, place_name):
+        return False
+
+    async def saved(image_files, budget=None):
+        return []
+
+    async def create(db, **product_data):
+        created.append(product_data)
+        return "P1"
+
+    monkeypatch.setattr(product_routes, "check_product_exists_async", not_exists)
+    monkeypatch.setattr(product_routes, "save_images_async", saved)
+    monkeypatch.setattr(product_routes, "create_product_async", create)
+
+    app = FastAPI()
+    app.include_router(product_routes.router, prefix="/products")
+    app.dependency_overrides[get_async_db] = no_db
+    app.dependency_overrides[require_product_writer] = lambda: {"sub": "7", "username": "admin", "roles": ["admin"]}
+    client = TestClient(app)
+    client.created = created
+    return client
+
+def test_create_takes_owner_from_token_not_form(client):
+    files = [("detail_images", ("a.jpg", b"x", "image/jpeg")), ("display_images", ("b.jpg", b"x", "image/jpeg"))]
+
+    response = client.post("/products/create", data={**FORM, "user_id": "99"}, files=files)
+
+    assert response.status_code == 201
+    assert client.created[0]["user_id"] == 7
+
+def test_create_rejects_oversized_image_with_413(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(image_store, "BLOB_ROOT", str(tmp_path / "sha256"))
+    monkeypatch.setattr(product_routes, "save_images_async", products.save_images_async)
+    monkeypatch.setattr(product_routes, "UploadBudget", lambda: image_store.UploadBudget(max_file_bytes=8, max_request_bytes=64))
+    files = [("detail_images", ("a.jpg", b"x" * 9, "image/jpeg")), ("display_images", ("b.jpg", b"x", "image/jpeg"))]
+
+    response = client.post("/products/create", data=FORM, files=files)
+
+    assert response.status_code == 413
+    assert "a.jpg" in response.json()["detail"]
+    assert client.created == []
+    assert not [path for path in (tmp_path / "sha256").iterdir() if path.name.endswith(".tmp")]
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import rate_limit
+from app.rate_limit import Budget, LocalBucketStore, RateLimiter, RateLimitMiddleware, _forwarded_client, route_group
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_route_groups():
+    assert route_group("POST", "/auth/login") == "auth"
+    assert route_group("GET", "/products/nearme/1,2") == "product_read"
+    assert route_group("POST", "/products/") == "upload"
+    assert route_group("DELETE", "/products/P1") == "product_write"
+    assert route_group("OPTIONS", "/products/") is None
+    assert route_group("GET", "/metrics") is None
+
+def test_bucket_allows_burst_then_refills(clock):
+    store = LocalBucketStore(shards=4)
+    budget = Budget(3, 3)
+
+    decisions = [asyncio.run(store.take("k", budget)) for _ in range(4)]
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert decisions[-1].retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert asyncio.run(store.take("k", budget)).allowed
+    assert not asyncio.run(store.take("k", budget)).allowed
+
+def test_buckets_are_independent_per_key(clock):
+    store = LocalBucketStore(shards=4)
+    budget = Budget(1, 60)
+
+    assert asyncio.run(store.take("a", budget)).allowed
+    assert asyncio.run(store.take("b", budget)).allowed
+    assert not asyncio.run(store.take("a", budget)).allowed
+
+def test_full_buckets_are_swept(clock):
+    store = LocalBucketStore(shards=1)
+    budget = Budget(2, 2)
+    for number in range(10):
+        asyncio.run(store.take(f"k{number}", budget))
+
+    clock.now += rate_limit.RATE_LIMIT_SWEEP_SECONDS + 1
+    asyncio.run(store.take("new", budget))
+
+    assert store.size() == 1
+
+def test_bucket_store_caps_keys_per_shard(clock):
+    store = LocalBucketStore(shards=1, max_keys_per_shard=5)
+    budget = Budget(10, 60)
+    for number in range(20):
+        asyncio.run(store.take(f"k{number}", budget))
+
+    assert store.size() <= 6
+
+def test_bucket_store_evicts_least_recently_used_key(clock):
+    store = LocalBucketStore(shards=1, max_keys_per_shard=3)
+    budget = Budget(2, 60)
+    asyncio.run(store.take("active", budget))
+    for number in range(3):
+        asyncio.run(store.take(f"k{number}", budget))
+        # Klien aktif terus memakai bucket-nya sehingga tidak menjadi yang tertua
+        decision = asyncio.run(store.take("active", budget))
+
+    assert not decision.allowed
+    assert not asyncio.run(store.take("active", budget)).allowed
+
+def _client(limiter: RateLimiter) -> TestClient:
+    async def endpoint(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/products/", endpoint), Route("/metrics", endpoint)])
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return TestClient(app)
+
+def test_middleware_answers_429_with_retry_after(clock):
+    limiter = RateLimiter(store=LocalBucketStore(shards=1), budgets={"product_read": Budget(2, 60)}, enabled=True)
+    client = _client(limiter)
+
+    first = client.get("/products/")
+    client.get("/products/")
+    limited = client.get("/products/")
+
+    assert first.status_code == 200 and first.headers["x-ratelimit-remaining"] == "1"
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "30"
+    assert limited.json() == {"detail": "Terlalu banyak permintaan, silakan coba lagi nanti"}
+    assert client.get("/metrics").status_code == 200
+    assert limiter.stats()["limited"] == 1
+
+def _forwarded_headers(*values):
+    return Headers(raw=[(b"x-forwarded-for", value.encode()) for value in values])
+
+def test_forwarded_client_uses_right_most_trusted_entry():
+    # Entri paling kiri dikirim klien sendiri dan bisa dipalsukan
+    headers = _forwarded_headers("1.1.1.1, 203.0.113.7")
+    assert _forwarded_client(headers, trusted_hops=1) == "203.0.113.7"
+
+    headers = _forwarded_headers("1.1.1.1, 203.0.113.7", "10.0.0.2")
+    assert _forwarded_client(headers, trusted_hops=2) == "203.0.113.7"
+    assert _forwarded_client(headers, trusted_hops=5) == "1.1.1.1"
+    assert _forwarded_client(_forwarded_headers(" , "), trusted_hops=1) is None
+
+def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_HOPS", 1)
+    limiter = RateLimiter(store=LocalBucketStore(shards=1), budgets={"product_read": Budget(1, 60)}, enabled=True)
+    client = _client(limiter)
+
+    first = client.get("/products/", headers={"x-forwarded-for": "1.1.1.1, 203.0.113.7"})
+    spoofed = client.get("/products/", headers={"x-forwarded-for": "9.9.9.9, 203.0.113.7"})
+    other = client.get("/products/", headers={"x-forwarded-for": "1.1.1.1, 203.0.113.8"})
+
+    assert first.status_code == 200
+    assert spoofed.status_code == 429
+    assert other.status_code == 200
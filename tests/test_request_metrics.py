@@ -0,0 +1,35 @@
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.request_metrics import RequestMetrics, RequestMetricsMiddleware
+
+def test_unknown_methods_share_one_series():
+    metrics = RequestMetrics()
+    for number in range(50):
+        metrics.observe(f"FOO{number}", "unmatched", 405, 0.001, 10)
+    metrics.observe("GET", "/products", 200, 0.002, 100)
+
+    text = metrics.render_prometheus()
+
+    assert 'http_requests_total{method="other",route="unmatched",status="405"} 50' in text
+    assert 'http_requests_total{method="GET",route="/products",status="200"} 1' in text
+    assert "FOO" not in text
+
+def test_middleware_records_route_template():
+    async def endpoint(request):
+        return PlainTextResponse("ok")
+
+    metrics = RequestMetrics()
+    app = Starlette(routes=[Route("/products/{id_serial}", endpoint)])
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+    client = TestClient(app)
+
+    client.get("/products/P1")
+    client.get("/products/P2")
+    client.request("BREW", "/products/P3")
+
+    summary = {(item["method"], item["route"]): item["count"] for item in metrics.latency_summary()}
+    assert summary[("GET", "/products/{id_serial}")] == 2
+    assert summary[("other", "/products/{id_serial}")] == 1
@@ -0,0 +1,31 @@
+from datetime import time
+from decimal import Decimal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.responses import ProductJSONResponse, dumps_json_line
+
+def test_product_json_matches_default_encoder():
+    content = {
+        "message": "ok",
+        "data": [{
+            "id_serial": "P1", "price": Decimal("25000.00"), "stock": Decimal("3"),
+            "latitude": Decimal("-6.914744"), "open_time": time(8, 0), "close_time": time(17, 30, 15),
+            "rating": 4.5, "detail_images": [],
+        }],
+    }
+
+    fast = orjson.loads(ProductJSONResponse(content).body)
+    default = orjson.loads(JSONResponse(jsonable_encoder(content)).body)
+
+    assert fast == default
+    assert fast["data"][0]["stock"] == 3 and isinstance(fast["data"][0]["stock"], int)
+    assert fast["data"][0]["open_time"] == "08:00:00"
+
+def test_json_line_ends_with_newline():
+    line = dumps_json_line({"price": Decimal("1.50")})
+
+    assert line.endswith(b"\n")
+    assert orjson.loads(line) == {"price": 1.5}
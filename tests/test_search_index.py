@@ -0,0 +1,80 @@
+import pytest
+
+from app.services import products
+from app.services.search_index import SearchIndex, search_index
+
+CATALOG = [
+    {"id_serial": "P1", "place_name": "Danau Toba", "kab_kota": "Toba", "location": "Parapat", "description": "Danau vulkanik terbesar"},
+    {"id_serial": "P2", "place_name": "Air Terjun Sipiso-piso", "kab_kota": "Karo", "location": "Tongging", "description": "Air terjun di tepi danau"},
+    {"id_serial": "P3", "place_name": "Café Kopi Sidikalang", "kab_kota": "Dairi", "location": "Sidikalang", "description": "Kopi lokal"},
+    {"id_serial": "P4", "place_name": "Pantai Cermin", "kab_kota": "Serdang Bedagai", "location": "Pantai Cermin", "description": "Pantai berpasir"},
+]
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.build(CATALOG)
+    return index
+
+def _ids(results):
+    return [id_serial for id_serial, _ in results]
+
+def test_place_name_match_ranks_above_description_match(index):
+    results = index.search("danau")
+
+    assert _ids(results) == ["P1", "P2"]
+    assert results[0][1] > results[1][1]
+
+def test_documents_matching_more_terms_rank_first(index):
+    assert _ids(index.search("air danau"))[0] == "P2"
+
+def test_typos_and_diacritics_are_tolerated(index):
+    assert _ids(index.search("danua toba"))[0] == "P1"
+    assert _ids(index.search("sidikalnag")) == ["P3"]
+    assert _ids(index.search("cafe")) == ["P3"]
+
+def test_last_term_matches_as_prefix(index):
+    assert _ids(index.search("pant")) == ["P4"]
+    assert index.search("") == []
+    assert index.search("zzzz") == []
+
+def test_upsert_replaces_terms_of_updated_product(index):
+    index.upsert({**CATALOG[3], "place_name": "Pulau Berhala", "location": "Selat Malaka", "description": "Pulau kecil"})
+
+    assert _ids(index.search("berhala")) == ["P4"]
+    assert index.search("cermin") == []
+    # Term lama tidak tersisa di kosakata, sehingga juga tidak muncul lewat pencocokan fuzzy atau prefix
+    assert "cermin" not in index._postings and "cermin" not in index._vocabulary
+    assert index.search("cermni") == [] and index.search("cer") == []
+
+def test_remove_drops_document_and_stale_terms(index):
+    index.remove("P3")
+
+    assert index.search("sidikalang") == []
+    assert index.search("kopi") == []
+    assert len(index) == 3
+    for term in ("sidikalang", "kopi", "cafe", "dairi"):
+        assert term not in index._postings and term not in index._vocabulary
+    assert not any("sidikalang" in members for members in index._trigram_terms.values())
+
+def test_new_product_is_searchable_after_upsert(index):
+    index.upsert({"id_serial": "P5", "place_name": "Bukit Lawang", "kab_kota": "Langkat", "location": "Bahorok", "description": ""})
+
+    assert _ids(index.search("lawang")) == ["P5"]
+    assert len(index) == 5
+
+def test_catalog_changes_update_shared_index():
+    search_index.build(CATALOG)
+    try:
+        products.on_catalog_changed("P6", {
+            "id_serial": "P6", "place_name": "Taman Simalem", "kab_kota": "Karo", "location": "Merek",
+            "description": "", "latitude": 2.9, "longitude": 98.5, "category": "Alam", "rating": 4.5,
+            "price": 0, "stock": 1,
+        })
+        assert _ids(search_index.search("simalem")) == ["P6"]
+
+        products.on_catalog_changed("P6")
+        assert search_index.search("simalem") == []
+    finally:
+        search_index.build([])
+        search_index.ready = False
@@ -0,0 +1,59 @@
+import inspect
+import threading
+
+from app.services.products import get_products_by_category, get_products_by_category_page
+from app.services.single_flight import _key, coalesce
+
+def _category_key(function, db, **kwargs):
+    signature = inspect.signature(function.__wrapped__)
+    return _key(function.__name__, signature, (), {"db": db, **kwargs})
+
+def test_key_ignores_session_passed_as_keyword():
+    arguments = dict(category="Wisata", latitude=3.59, longitude=98.67, base_url="http://testserver/", location=None)
+
+    assert _category_key(get_products_by_category, object(), sortby=None, **arguments) == \
+        _category_key(get_products_by_category, object(), sortby=None, **arguments)
+    assert _category_key(get_products_by_category_page, object(), limit=20, **arguments) == \
+        _category_key(get_products_by_category_page, object(), limit=20, **arguments)
+
+def test_key_is_the_same_for_positional_and_keyword_calls():
+    signature = inspect.signature(get_products_by_category.__wrapped__)
+    positional = _key("get_products_by_category", signature, (object(), "Wisata", 3.59, 98.67, "http://testserver/"), {})
+    keyword = _key("get_products_by_category", signature, (), {
+        "db": object(), "category": "Wisata", "latitude": 3.59, "longitude": 98.67, "base_url": "http://testserver/",
+    })
+
+    assert positional == keyword
+
+def test_key_differs_when_arguments_differ():
+    arguments = dict(latitude=3.59, longitude=98.67, base_url="http://testserver/")
+
+    assert _category_key(get_products_by_category, object(), category="Wisata", **arguments) != \
+        _category_key(get_products_by_category, object(), category="Kuliner", **arguments)
+
+def test_concurrent_keyword_calls_with_different_sessions_coalesce():
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    @coalesce("test_keyword_calls")
+    def read(db, category: str):
+        executions.append(category)
+        started.set()
+        release.wait(5)
+        return [category]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(read(db=object(), category="Wisata")))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(read(db=object(), category="Wisata")))
+    follower.start()
+    # Beri waktu follower untuk mendaftar sebagai penunggu sebelum pemimpin selesai
+    follower.join(0.2)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert executions == ["Wisata"]
+    assert results == [["Wisata"], ["Wisata"]]
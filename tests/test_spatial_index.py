@@ -0,0 +1,52 @@
+import random
+
+from app.services.spatial_index import GridSpatialIndex, haversine_km
+
+def _points(count: int, seed: int = 7):
+    generator = random.Random(seed)
+    return [(f"P{number}", generator.uniform(-8, -5), generator.uniform(105, 112)) for number in range(count)]
+
+def _brute_force(points, lat, lon):
+    return sorted((haversine_km(lat, lon, point_lat, point_lon), id_serial) for id_serial, point_lat, point_lon in points)
+
+def test_radius_matches_brute_force():
+    points = _points(3000)
+    index = GridSpatialIndex()
+    index.build(points)
+
+    generator = random.Random(1)
+    for _ in range(25):
+        lat, lon = generator.uniform(-8, -5), generator.uniform(105, 112)
+        radius_km = generator.choice([0.5, 5, 25, 80])
+        expected = [id_serial for distance, id_serial in _brute_force(points, lat, lon) if distance <= radius_km]
+        assert [id_serial for _, id_serial in index.radius(lat, lon, radius_km)] == expected
+
+def test_nearest_matches_brute_force():
+    points = _points(3000)
+    index = GridSpatialIndex()
+    index.build(points)
+
+    generator = random.Random(2)
+    for _ in range(25):
+        lat, lon = generator.uniform(-9, -4), generator.uniform(104, 113)
+        k = generator.choice([1, 5, 20])
+        expected = [id_serial for _, id_serial in _brute_force(points, lat, lon)[:k]]
+        assert [id_serial for _, id_serial in index.nearest(lat, lon, k)] == expected
+
+def test_upsert_and_remove_keep_index_current():
+    index = GridSpatialIndex()
+    index.build([("A", -6.2, 106.8), ("B", -7.8, 110.4)])
+
+    index.upsert("A", -7.79, 110.41)
+    index.remove("B")
+    index.upsert("C", -6.2, 106.8)
+
+    assert [id_serial for _, id_serial in index.radius(-7.8, 110.4, 5)] == ["A"]
+    assert [id_serial for _, id_serial in index.radius(-6.2, 106.8, 5)] == ["C"]
+    assert len(index) == 2
+
+def test_radius_across_antimeridian():
+    index = GridSpatialIndex()
+    index.build([("E", 0.0, 179.99), ("W", 0.0, -179.99), ("far", 0.0, 170.0)])
+
+    assert sorted(id_serial for _, id_serial in index.radius(0.0, 180.0, 5)) == ["E", "W"]
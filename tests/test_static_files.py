@@ -0,0 +1,72 @@
+import os
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.static_files import STATIC_CACHE_CONTROL, CachedStaticFiles
+
+BLOB = b"isi gambar"
+DIGEST = hashlib.sha256(BLOB).hexdigest()
+
+def _write(root, relative_path: str, content: bytes):
+    path = root / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+@pytest.fixture
+def assets(tmp_path):
+    _write(tmp_path, f"sha256/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg", BLOB)
+    _write(tmp_path, "display_image/a.jpg", b"lama")
+    _write(tmp_path, "sha256/.upload_x.tmp", b"")
+    return tmp_path
+
+@pytest.fixture
+def static(assets):
+    return CachedStaticFiles(directory=str(assets))
+
+@pytest.fixture
+def client(static):
+    app = FastAPI()
+    app.mount("/static", static, name="static")
+    return TestClient(app)
+
+def test_blob_is_served_immutable_with_content_hash_etag(client):
+    response = client.get(f"/static/sha256/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg")
+
+    assert response.status_code == 200
+    assert response.content == BLOB
+    assert response.headers["cache-control"] == STATIC_CACHE_CONTROL
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == f'"{DIGEST}"'
+
+def test_matching_if_none_match_returns_304(client):
+    first = client.get("/static/display_image/a.jpg")
+
+    response = client.get("/static/display_image/a.jpg", headers={"If-None-Match": first.headers["etag"]})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["cache-control"] == STATIC_CACHE_CONTROL
+
+def test_repeat_requests_are_served_from_index(client, static):
+    client.get("/static/display_image/a.jpg")
+    client.get("/static/display_image/a.jpg")
+
+    assert static.stats()["misses"] == 1
+    assert static.stats()["hits"] == 1
+
+def test_preload_indexes_files_but_skips_temp_uploads(client, static):
+    assert static.preload() == 2
+
+    assert client.get("/static/display_image/a.jpg").status_code == 200
+    assert static.stats()["misses"] == 0
+
+def test_forgotten_file_is_looked_up_again(client, static, assets):
+    static.preload()
+    os.remove(assets / "display_image/a.jpg")
+    static.forget("app/asset/display_image/a.jpg")
+
+    assert client.get("/static/display_image/a.jpg").status_code == 404
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from app.services.search_index import tokenize
+from app.services.suggest_index import SUGGEST_TYPES, SuggestIndex
+
+NAMES = ["Alam", "Alam Indah", "Taman Alam", "Alamanda", "Ab", "Ab Cd", "Danau Toba", "Toba", "Pantai Alam Sari"]
+
+def _product(id_serial, rng):
+    return {
+        "id_serial": id_serial,
+        "place_name": rng.choice(NAMES),
+        "category": rng.choice(["Alam", "Taman", "Ab"]),
+        "kab_kota": rng.choice(["Toba", "Ab Cd", "Alam Raya"]),
+        "rating": rng.choice([1, 2.5, 3, 4, 4.5, 5]),
+    }
+
+def _brute_force(products, prefix, suggestion_type=None):
+    """
+    Saran yang diharapkan: setiap awal kata dari teks yang dinormalisasi diawali prefix,
+    dan bila prefix diakhiri spasi, awal kata yang sama persis dengan kata lengkapnya
+    """
+    normalized = " ".join(tokenize(prefix)) + (" " if prefix[-1:].isspace() else "")
+    weights = {}
+    for product in products.values():
+        for kind in SUGGEST_TYPES:
+            text = " ".join(tokenize(product[kind]))
+            words = text.split(" ")
+            keys = [" ".join(words[index:]) for index in range(len(words))]
+            if not any(key.startswith(normalized) or key + " " == normalized for key in keys):
+                continue
+            if suggestion_type is not None and kind != suggestion_type:
+                continue
+            ratings = weights.setdefault((kind, text), [])
+            ratings.append(float(product["rating"]))
+    return {
+        suggestion: round(max(ratings) if suggestion[0] == "place_name" else sum(ratings), 2)
+        for suggestion, ratings in weights.items()
+    }
+
+def _suggested(index, prefix, suggestion_type=None):
+    return {
+        (item["type"], " ".join(tokenize(item["text"]))): item["weight"]
+        for item in index.suggest(prefix, limit=100, suggestion_type=suggestion_type)
+    }
+
+PREFIXES = ["a", "al", "alam", "alam ", "alam i", "ab", "ab ", "ab c", "toba", "toba ", "taman alam "]
+
+def test_trailing_space_includes_the_completed_word():
+    index = SuggestIndex()
+    index.build([
+        {"id_serial": "P1", "place_name": "Alam", "category": "", "kab_kota": "", "rating": 4},
+        {"id_serial": "P2", "place_name": "Alam Indah", "category": "", "kab_kota": "", "rating": 5},
+        {"id_serial": "P3", "place_name": "Alamanda", "category": "", "kab_kota": "", "rating": 3},
+    ])
+
+    texts = [item["text"] for item in index.suggest("alam ")]
+
+    assert texts == ["Alam Indah", "Alam"]
+    assert [item["text"] for item in index.suggest("alam")] == ["Alam Indah", "Alam", "Alamanda"]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force_after_incremental_updates(seed):
+    rng = random.Random(seed)
+    products = {f"P{number}": _product(f"P{number}", rng) for number in range(40)}
+    index = SuggestIndex()
+    index.build(list(products.values()))
+
+    for _ in range(60):
+        # Isi cache dulu agar perubahan berikutnya harus memperbarui atau membuangnya
+        for prefix in PREFIXES:
+            for suggestion_type in (None, "place_name", "kab_kota"):
+                assert _suggested(index, prefix, suggestion_type) == _brute_force(products, prefix, suggestion_type)
+
+        id_serial = f"P{rng.randrange(50)}"
+        if id_serial in products and rng.random() < 0.3:
+            del products[id_serial]
+            index.remove(id_serial)
+        else:
+            products[id_serial] = _product(id_serial, rng)
+            index.upsert(products[id_serial])